@@ -1,27 +1,100 @@
-from flask import Flask, request, jsonify, session, redirect, url_for
+from flask import Blueprint, Flask, current_app, request, jsonify, session, redirect, url_for, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_cors import CORS
+from sqlalchemy import MetaData, and_, case, delete, event, exists, func, insert, inspect, literal, or_, select, union_all, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import contains_eager, joinedload, load_only
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import click
+import csv
+import functools
+import hashlib
+import hmac
+import io
+import itertools
+import json
 import os
 import secrets
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = secrets.token_hex(16)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///capstone.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
-CORS(app, supports_credentials=True)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+import threading
+import time
+
+from assets import build_assets, init_frontend
+import ical
+from group_commit import GroupCommitWriter
+from jobs import JobRunner
+from ratelimit import Limit, init_rate_limits
+from recommender import SkillIndex
+from response_cache import crn_cached, init_response_cache, invalidate_crn
+from shards import MAIN_SCHEMA, ShardedSession, caller_shard, current_shard, init_shards, set_shard, use_shard
+from reminders import Deadline, FileSink, ReminderScheduler
+from teams import InsufficientCapacity, preference_benefit, solve_assignment
+import numpy as np
+from responses import compress_chunks, dumps_bytes, init_responses, stream_format, stream_rows
+
+# Static-serving mode: run `flask --app app build-frontend`, then set SERVE_FRONTEND=1
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+
+def default_config():
+    """Settings read from the environment; create_app(config) overrides any of them."""
+    return {
+        'SECRET_KEY': secrets.token_hex(16),
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///capstone.db',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'MESSAGE_RETENTION_DAYS': int(os.environ.get('MESSAGE_RETENTION_DAYS', 120)),
+        'SYNC_TOMBSTONE_DAYS': int(os.environ.get('SYNC_TOMBSTONE_DAYS', 30)),  # older watermarks get a full sync
+        'MESSAGE_GROUP_COMMIT': os.environ.get('MESSAGE_GROUP_COMMIT', '0') == '1',
+        'GROUP_COMMIT_WINDOW_MS': float(os.environ.get('GROUP_COMMIT_WINDOW_MS', 5)),
+        'GROUP_COMMIT_MAX_BATCH': int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 256)),
+        'JOB_WORKERS': int(os.environ.get('JOB_WORKERS', 2)),
+        'JOB_VISIBILITY_TIMEOUT': int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 300)),
+        'REMINDER_LEAD_HOURS': float(os.environ.get('REMINDER_LEAD_HOURS', 24)),
+        'REMINDER_INTERVAL': float(os.environ.get('REMINDER_INTERVAL', 60)),
+        'REMINDER_SINK': os.environ.get('REMINDER_SINK', 'outbox'),  # 'outbox' or a .jsonl file path
+
+        # Token-bucket limits, per signed-in user or else per client IP, and for
+        # auth also per submitted username. Keyed by endpoint name; only the
+        # listed methods are limited.
+        'RATE_LIMITS': {
+            'api.login': (
+                Limit(30, 60),                                # shared campus IPs log in together
+                Limit(10, 300, key='username'),               # one account, from any number of IPs
+            ),
+            'api.register': (Limit(30, 3600), Limit(5, 3600, key='username')),
+            'api.project_messages': Limit(60, 60, burst=20),  # POST only; reading is not limited
+            'api.join_project': Limit(10, 60),
+        },
+        'RATE_LIMIT_ENABLED': os.environ.get('RATE_LIMIT_ENABLED', '1') == '1',
+        'RATE_LIMIT_BACKEND': os.environ.get('RATE_LIMIT_BACKEND', 'memory'),  # or 'sqlite' for multiple workers
+
+        # Class-wide lists cached per CRN; 'sqlite' shares the cache between workers
+        'RESPONSE_CACHE_ENABLED': os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1',
+        'RESPONSE_CACHE_BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'memory'),
+        'RESPONSE_CACHE_MAX_MB': float(os.environ.get('RESPONSE_CACHE_MAX_MB', 32)),
+
+        # One SQLite file per class for projects and their contents; see shards.py
+        'SHARD_BY_CRN': os.environ.get('SHARD_BY_CRN', '0') == '1',
+        'SHARD_DIR': os.environ.get('SHARD_DIR'),  # default: instance/shards
+
+        'SERVE_FRONTEND': os.environ.get('SERVE_FRONTEND', '0') == '1',
+        'FRONTEND_BUILD_DIR': os.environ.get('FRONTEND_BUILD_DIR', os.path.join(FRONTEND_DIR, 'dist')),
+    }
+
+# Extensions are bound to an application in create_app(); routes and CLI
+# commands are collected on the api blueprint.
+db = SQLAlchemy(session_options={'class_': ShardedSession})
+login_manager = LoginManager()
+login_manager.login_view = 'api.login'
+api = Blueprint('api', __name__, cli_group=None)
 
 @login_manager.unauthorized_handler
 def unauthorized():
     if request.path.startswith('/api/'):
         return jsonify({'error': 'Authentication required'}), 401
-    return redirect(url_for('login'))
+    return redirect(url_for('api.login'))
 
 # Database Models
 class User(UserMixin, db.Model):
@@ -32,7 +105,7 @@ class User(UserMixin, db.Model):
     first_name = db.Column(db.String(80), nullable=False)
     last_name = db.Column(db.String(80), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # 'student' or 'faculty'
-    crn = db.Column(db.String(20))
+    crn = db.Column(db.String(20))  # Current class; memberships are Enrollment rows
     title = db.Column(db.String(50))
     biography = db.Column(db.Text)
     skills = db.Column(db.Text)
@@ -54,21 +127,45 @@ class Project(db.Model):
     course = db.Column(db.String(100), nullable=False)
     creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     status = db.Column(db.String(20), default='open')  # 'open' or 'full'
+    # Bumped with every write to the project, its team, tasks, milestones or
+    # messages; the ETags of their GET endpoints are derived from it
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    crn_id = db.Column(db.Integer, db.ForeignKey('crn.id'))  # The class the project belongs to
     
     # Relationships
+    crn = db.relationship('CRN', backref='projects', lazy=True)
     team_members = db.relationship('TeamMember', backref='project', lazy=True, cascade='all, delete-orphan')
+    preferences = db.relationship('ProjectPreference', backref='project', lazy=True, cascade='all, delete-orphan')
+    read_cursors = db.relationship('ReadCursor', backref='project', lazy=True, cascade='all, delete-orphan')
     messages = db.relationship('Message', backref='project', lazy=True, cascade='all, delete-orphan')
+    archived_messages = db.relationship('ArchivedMessage', backref='project', lazy=True, cascade='all, delete-orphan')
     tasks = db.relationship('Task', backref='project', lazy=True, cascade='all, delete-orphan')
     milestones = db.relationship('Milestone', backref='project', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_project_crn', 'crn_id', 'id'),
+        db.Index('ix_project_crn_updated', 'crn_id', 'updated_at'),
+    )
+
+    @property
+    def crn_code(self):
+        return self.crn.crn_code if self.crn else None
+
 class TeamMember(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     status = db.Column(db.String(20), default='active')
 
+    __table_args__ = (
+        db.Index('ix_team_member_project_student', 'project_id', 'student_id'),
+        db.Index('ix_team_member_updated', 'updated_at'),
+    )
+
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
@@ -77,6 +174,47 @@ class Message(db.Model):
     content = db.Column(db.Text, nullable=False)
     message_type = db.Column(db.String(20), default='group')  # 'group' or 'direct'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_message_project_created', 'project_id', 'created_at'),
+        db.Index('ix_message_updated', 'updated_at'),
+        # Direct messages only: one conversation is a project plus an unordered user pair
+        db.Index('ix_message_conversation', project_id, func.min(sender_id, recipient_id),
+                 func.max(sender_id, recipient_id), id, sqlite_where=recipient_id.isnot(None)),
+        db.Index('ix_message_direct_sender', sender_id, id, sqlite_where=recipient_id.isnot(None)),
+        db.Index('ix_message_recipient', recipient_id, id),
+        # Ids must keep growing once the newest messages are archived, or new
+        # ones would collide with (and sort before) archived ones
+        {'sqlite_autoincrement': True},
+    )
+
+class ArchivedMessage(db.Model):
+    """Cold storage for old messages, moved out of Message by archive_messages().
+
+    Rows keep their original ids, so "load older" pages continue seamlessly
+    from the oldest message still in the hot table.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    content = db.Column(db.Text, nullable=False)
+    message_type = db.Column(db.String(20), default='group')
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_archived_message_project_id', 'project_id', 'id'),
+        # The direct message indexes of Message, for conversations reaching into the archive
+        db.Index('ix_archived_message_conversation', project_id, func.min(sender_id, recipient_id),
+                 func.max(sender_id, recipient_id), id, sqlite_where=recipient_id.isnot(None)),
+        db.Index('ix_archived_message_direct_sender', sender_id, id, sqlite_where=recipient_id.isnot(None)),
+        db.Index('ix_archived_message_recipient', recipient_id, id),
+    )
+
+    sender = db.relationship('User', foreign_keys=[sender_id], lazy=True)
+    recipient = db.relationship('User', foreign_keys=[recipient_id], lazy=True)
 
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -87,6 +225,18 @@ class Task(db.Model):
     status = db.Column(db.String(20), default='pending')  # 'pending', 'in_progress', 'completed'
     due_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by the ORM on every UPDATE; clients send it back for optimistic concurrency
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+    __table_args__ = (
+        db.Index('ix_task_assignee_due', 'assignee_id', 'due_date'),
+        db.Index('ix_task_project_due', 'project_id', 'due_date'),
+        # Range scans for the reminder scheduler
+        db.Index('ix_task_due', 'due_date'),
+        db.Index('ix_task_updated', 'updated_at'),
+    )
 
 class Milestone(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -96,6 +246,13 @@ class Milestone(db.Model):
     due_date = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default='upcoming')  # 'upcoming', 'completed'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_milestone_project_due', 'project_id', 'due_date'),
+        db.Index('ix_milestone_due', 'due_date'),
+        db.Index('ix_milestone_updated', 'updated_at'),
+    )
 
 class CustomProject(db.Model):
     """Student-proposed projects that require faculty approval before becoming live."""
@@ -105,7 +262,7 @@ class CustomProject(db.Model):
     capacity = db.Column(db.Integer, nullable=False)
     course = db.Column(db.String(100), nullable=False)
     proposer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    # 'pending', 'approved', 'denied'
+    # 'pending', 'approving' (queued with ?async=1), 'approved', 'denied'
     approval_status = db.Column(db.String(20), default='pending')
     faculty_feedback = db.Column(db.Text)          # Optional note from faculty on denial/approval
     approved_project_id = db.Column(db.Integer, db.ForeignKey('project.id'))  # Set when approved
@@ -127,6 +284,20 @@ class CRN(db.Model):
     # Relationship
     faculty = db.relationship('User', backref='crns_created', lazy=True)
 
+class Enrollment(db.Model):
+    """A user's membership in a class, as a student or faculty; a user may be in several."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    crn_id = db.Column(db.Integer, db.ForeignKey('crn.id'), nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # 'student' or 'faculty'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'crn_id'),
+        # Class rosters: one index range per (class, role)
+        db.Index('ix_enrollment_crn_role', 'crn_id', 'role', 'user_id'),
+    )
+
 class UserStory(db.Model):
     """User Story/Announcement model for dashboard"""
     id = db.Column(db.Integer, primary_key=True)
@@ -143,13 +314,401 @@ class UserStory(db.Model):
     author = db.relationship('User', backref='user_stories', lazy=True)
     project = db.relationship('Project', backref='announcements', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_user_story_project', 'project_id'),
+        db.Index('ix_user_story_updated', 'updated_at'),
+    )
+
+class CalendarToken(db.Model):
+    """Secret token that lets calendar apps fetch a user's .ics feed without a session."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True, nullable=False)
+    token = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('calendar_token', uselist=False), lazy=True)
+
+class ProjectPreference(db.Model):
+    """A student's ranked project choices, used by the team formation solver."""
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)  # 1 = first choice
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'project_id'),
+        db.Index('ix_project_preference_project', 'project_id'),
+    )
+
+class ReadCursor(db.Model):
+    """How far a user has read a project's chat, with a running unread count.
+
+    unread_count is incremented when a message is posted, so badges never
+    count Message rows. A cursor is created by the first message posted
+    after the user joined; earlier history counts as read.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'project_id'),
+        db.Index('ix_read_cursor_project', 'project_id'),
+    )
+
+class Tombstone(db.Model):
+    """A deleted project, team membership, task, milestone, message or story, for delta syncs."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # table name of the deleted row
+    row_id = db.Column(db.Integer, nullable=False)
+    project_id = db.Column(db.Integer)  # the row's project, if any
+    crn_id = db.Column(db.Integer)  # a CRN-wide story gets one tombstone per class of its author
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_tombstone_crn_deleted', 'crn_id', 'deleted_at'),)
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by job_runner's worker threads."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # also a running job's visibility deadline
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),)
+
+class ReminderOutbox(db.Model):
+    """One batch of due-date reminders for a user, written by the reminder scheduler."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    items = db.Column(db.Text, nullable=False)  # JSON list of tasks and milestones
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_reminder_outbox_user', 'user_id', 'id'),)
+
+class ReminderState(db.Model):
+    """Single row: how far the reminder scheduler has emitted and scanned changes."""
+    id = db.Column(db.Integer, primary_key=True)
+    sent_until = db.Column(db.DateTime, nullable=False)
+    changed_since = db.Column(db.DateTime, nullable=False)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# Class membership
+# Rosters and class project lists come from Enrollment and Project.crn_id,
+# both integer-keyed and indexed. User.crn is the class a user is currently
+# working in, which is what the UI shows and class-wide endpoints default to.
+def crn_id_of(crn_code):
+    """Id of the class with this code (unique index lookup), or None."""
+    if not crn_code:
+        return None
+    return db.session.scalar(select(CRN.id).where(CRN.crn_code == crn_code))
+
+def class_members(crn_code, role=None):
+    """Select of the ids of users enrolled in a class, optionally only one role."""
+    query = select(Enrollment.user_id).join(CRN, Enrollment.crn_id == CRN.id).where(CRN.crn_code == crn_code)
+    if role is not None:
+        query = query.where(Enrollment.role == role)
+    return query
+
+def class_projects(crn_code):
+    """Select of the ids of a class's projects."""
+    return select(Project.id).join(CRN, Project.crn_id == CRN.id).where(CRN.crn_code == crn_code)
+
+def enrolled_crn_codes(user_id):
+    """Codes of a user's classes, oldest enrollment first."""
+    return db.session.scalars(select(CRN.crn_code).join(Enrollment, Enrollment.crn_id == CRN.id).where(
+        Enrollment.user_id == user_id
+    ).order_by(Enrollment.id)).all()
+
+def is_enrolled(user_id, crn_code, role=None):
+    """Whether a user is enrolled in a class; one probe of the (user_id, crn_id) index."""
+    query = select(Enrollment.id).join(CRN, Enrollment.crn_id == CRN.id).where(
+        Enrollment.user_id == user_id, CRN.crn_code == crn_code
+    )
+    if role is not None:
+        query = query.where(Enrollment.role == role)
+    return db.session.scalar(select(query.exists()))
+
+def count_enrolled(crn_id, role):
+    return db.session.scalar(select(func.count()).select_from(Enrollment).where(
+        Enrollment.crn_id == crn_id, Enrollment.role == role
+    ))
+
+def enroll(user, crn):
+    """Enroll user in crn if not already, and make it their current class; the caller commits."""
+    db.session.execute(sqlite_insert(Enrollment).values(
+        user_id=user.id, crn_id=crn.id, role=user.role, created_at=datetime.utcnow()
+    ).on_conflict_do_nothing())
+    user.crn = crn.crn_code
+
+# Sparse fieldsets
+# Each list endpoint maps its public field names to a serializer and to the
+# columns that serializer reads, so ?fields= narrows both the JSON and the SELECT.
+PROJECT_LIST_FIELDS = {
+    'id': (lambda p: p.id, ()),
+    'name': (lambda p: p.name, ('name',)),
+    'description': (lambda p: p.description, ('description',)),
+    'capacity': (lambda p: p.capacity, ('capacity',)),
+    'course': (lambda p: p.course, ('course',)),
+    'status': (lambda p: p.status, ('status',)),
+    'current_members': (lambda p: len(p.team_members), ()),
+    'creator': (lambda p: {
+        'name': f"{p.creator.first_name} {p.creator.last_name}",
+        'title': p.creator.title
+    }, ('creator_id',)),
+    'created_at': (lambda p: p.created_at.isoformat(), ('created_at',)),
+}
+
+STUDENT_LIST_FIELDS = {
+    'id': (lambda s: s.id, ()),
+    'username': (lambda s: s.username, ('username',)),
+    'first_name': (lambda s: s.first_name, ('first_name',)),
+    'last_name': (lambda s: s.last_name, ('last_name',)),
+    'name': (lambda s: f"{s.first_name} {s.last_name}", ('first_name', 'last_name')),
+    'skills': (lambda s: s.skills, ('skills',)),
+    'interests': (lambda s: s.interests, ('interests',)),
+    'biography': (lambda s: s.biography, ('biography',)),
+}
+
+def parse_fields(field_map):
+    """Read ?fields=a,b,c and return the requested names (all fields when absent).
+
+    Raises ValueError naming any field the endpoint does not know about.
+    """
+    raw = request.args.get('fields', '')
+    if not raw.strip():
+        return list(field_map)
+
+    fields = []
+    for name in raw.split(','):
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+
+    unknown = [name for name in fields if name not in field_map]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+def load_fields(model, field_map, fields):
+    """Build a load_only() option covering only the columns the fields need."""
+    columns = {'id'}
+    for name in fields:
+        columns.update(field_map[name][1])
+    return load_only(*[getattr(model, column) for column in sorted(columns)])
+
+def serialize_fields(obj, field_map, fields):
+    return {name: field_map[name][0](obj) for name in fields}
+
+# Streaming
+# List endpoints accept ?stream=json|ndjson to emit rows as they are read
+# instead of materializing the whole collection before serializing it.
+STREAM_BATCH_SIZE = 500
+
+def serialize_message(m):
+    return {
+        'id': m.id,
+        'project_id': m.project_id,
+        'sender': {
+            'id': m.sender.id,
+            'name': f"{m.sender.first_name} {m.sender.last_name}"
+        },
+        'recipient_id': m.recipient_id,
+        'content': m.content,
+        'message_type': m.message_type,
+        'created_at': m.created_at.isoformat()
+    }
+
+def serialize_story(story):
+    return {
+        'id': story.id,
+        'author_id': story.author_id,
+        'author_name': f"{story.author.first_name} {story.author.last_name}",
+        'author_role': story.author.role,
+        'title': story.title,
+        'content': story.content,
+        'story_type': story.story_type,
+        'priority': story.priority,
+        'project_id': story.project_id,
+        'created_at': story.created_at.isoformat(),
+        'updated_at': story.updated_at.isoformat()
+    }
+
+def serialize_task(t):
+    return {
+        'id': t.id,
+        'project_id': t.project_id,
+        'title': t.title,
+        'description': t.description,
+        'status': t.status,
+        'assignee': {
+            'id': t.assignee.id,
+            'name': f"{t.assignee.first_name} {t.assignee.last_name}"
+        } if t.assignee else None,
+        'due_date': t.due_date.isoformat() if t.due_date else None,
+        'created_at': t.created_at.isoformat(),
+        'version': t.version
+    }
+
+def serialize_milestone(m):
+    return {
+        'id': m.id,
+        'project_id': m.project_id,
+        'title': m.title,
+        'description': m.description,
+        'due_date': m.due_date.isoformat(),
+        'status': m.status,
+        'created_at': m.created_at.isoformat()
+    }
+
+def list_response(query, serialize):
+    """Return query rows as a buffered JSON list, or streamed when ?stream= is set."""
+    mode = stream_format()
+    if mode:
+        return stream_rows(query.yield_per(STREAM_BATCH_SIZE), serialize, mode)
+    return jsonify([serialize(row) for row in query.all()]), 200
+
+# Skill matching
+# One TF-IDF index per CRN, built from the database on first use and kept
+# current by the write endpoints below.
+skill_indexes_lock = threading.Lock()
+
+def loaded_skill_indexes():
+    """This application's indexes built so far, by CRN code."""
+    return current_app.extensions.setdefault('skill_indexes', {})
+
+def get_skill_index(crn_code):
+    skill_indexes = loaded_skill_indexes()
+    index = skill_indexes.get(crn_code)
+    if index is not None:
+        return index
+    
+    # The global lock only hands out per-class build locks, so loading one
+    # class from the database never holds up requests for another
+    with skill_indexes_lock:
+        build_lock = current_app.extensions.setdefault('skill_index_locks', {}).setdefault(
+            crn_code, threading.Lock()
+        )
+    with build_lock:
+        index = skill_indexes.get(crn_code)
+        if index is None:
+            index = skill_indexes[crn_code] = build_skill_index(crn_code)
+        return index
+
+def build_skill_index(crn_code):
+    index = SkillIndex()
+    students = db.session.query(
+        User.id, User.first_name, User.last_name, User.skills, User.interests
+    ).filter(User.id.in_(class_members(crn_code, 'student')))
+    for s in students:
+        index.put_student(s.id, s.skills, s.interests, {'name': f"{s.first_name} {s.last_name}"})
+    
+    projects = db.session.query(Project.id, Project.name, Project.description, Project.course).join(
+        CRN, Project.crn_id == CRN.id
+    ).filter(CRN.crn_code == crn_code)
+    for p in projects:
+        index.put_project(p.id, p.name, p.description, {'name': p.name, 'course': p.course})
+    return index
+
+def reindex_student(user):
+    """Refresh a student's vector in the already-built indexes of their classes after a change."""
+    if user.role != 'student':
+        return
+    skill_indexes = loaded_skill_indexes()
+    for crn_code in enrolled_crn_codes(user.id):
+        if crn_code in skill_indexes:
+            skill_indexes[crn_code].put_student(
+                user.id, user.skills, user.interests, {'name': f"{user.first_name} {user.last_name}"}
+            )
+
+def reindex_project(project, crn_code, removed=False):
+    index = loaded_skill_indexes().get(crn_code)
+    if index is None:
+        return
+    if removed:
+        index.remove_project(project.id)
+    else:
+        index.put_project(project.id, project.name, project.description,
+                          {'name': project.name, 'course': project.course})
+
+# Project change versions
+# Polled project resources answer 304 Not Modified from one primary-key
+# lookup of Project.version instead of re-querying and re-serializing.
+def bump_project_versions(execute, project_ids):
+    """Advance the version of projects (ids or a select of ids) in the caller's transaction.
+
+    execute is db.session.execute or a Connection's execute. Bumping inside
+    the write's transaction means no GET can pair new data with an old ETag.
+    """
+    execute(update(Project).where(Project.id.in_(project_ids)).values(
+        version=Project.version + 1
+    ).execution_options(synchronize_session=False))
+
+def project_etag(project_id):
+    """ETag of a project GET for the caller and query string, or None if no such project."""
+    version = db.session.scalar(select(Project.version).where(Project.id == project_id))
+    if version is None:
+        return None
+    params = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    # Keyed by shard too: a split without --prune leaves a copy of each project in the main database
+    key = f"{request.endpoint}|{current_shard()}|{project_id}|{version}|{current_user.id}|{params}"
+    # Keyed with SECRET_KEY so an ETag can't be guessed to probe a project's version
+    return hmac.new(current_app.config['SECRET_KEY'].encode(), key.encode(), hashlib.sha1).hexdigest()
+
+def can_view_project(project_id):
+    """Whether the caller is on the project's team or created it."""
+    return db.session.scalar(select(or_(
+        exists().where(TeamMember.project_id == project_id, TeamMember.student_id == current_user.id),
+        exists().where(Project.id == project_id, Project.creator_id == current_user.id)
+    )))
+
+def project_versioned(view=None, *, members_only=False):
+    """Serve a project view's GETs with a weak ETag and answer 304 when it still matches.
+
+    Streamed bodies (?stream=) get one too: the version is read before any
+    row, so the ETag is never newer than the data it is sent with. With
+    members_only a 304 is only sent to the team and creator; anyone else
+    falls through to the view and its 403.
+    """
+    if view is None:
+        return functools.partial(project_versioned, members_only=members_only)
+
+    @functools.wraps(view)
+    def wrapper(project_id, *args, **kwargs):
+        if request.method != 'GET':
+            return view(project_id, *args, **kwargs)
+
+        etag = project_etag(project_id)
+        if etag is not None and request.if_none_match.contains_weak(etag) and (
+                not members_only or can_view_project(project_id)):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(view(project_id, *args, **kwargs))
+            if etag is None or response.status_code != 200:
+                return response
+
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
+
 # API Routes
 
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def register():
     data = request.json
     
@@ -160,6 +719,8 @@ def register():
     if User.query.filter_by(email=data.get('email')).first():
         return jsonify({'error': 'Email already registered'}), 400
     
+    crn = CRN.query.filter_by(crn_code=data['crn']).first() if data.get('crn') else None
+    
     # Create new user
     user = User(
         username=data['username'],
@@ -176,11 +737,16 @@ def register():
     )
     
     db.session.add(user)
+    if crn is not None:
+        db.session.flush()  # user.id for the enrollment
+        enroll(user, crn)
     db.session.commit()
+    reindex_student(user)
+    invalidate_crn(user.crn)
     
     return jsonify({'message': 'Registration successful', 'user_id': user.id}), 201
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     data = request.json
     user = User.query.filter_by(username=data.get('username')).first()
@@ -201,13 +767,13 @@ def login():
     
     return jsonify({'error': 'Invalid credentials'}), 401
 
-@app.route('/api/logout', methods=['POST'])
+@api.route('/api/logout', methods=['POST'])
 @login_required
 def logout():
     logout_user()
     return jsonify({'message': 'Logout successful'}), 200
 
-@app.route('/api/user/profile', methods=['GET', 'PUT'])
+@api.route('/api/user/profile', methods=['GET', 'PUT'])
 @login_required
 def user_profile():
     if request.method == 'GET':
@@ -222,7 +788,16 @@ def user_profile():
             'skills': current_user.skills,
             'interests': current_user.interests,
             'crn': current_user.crn,
-            'title': current_user.title
+            'title': current_user.title,
+            'enrollments': [{
+                'crn_code': code,
+                'course_name': name,
+                'role': role
+            } for code, name, role in db.session.execute(
+                select(CRN.crn_code, CRN.course_name, Enrollment.role).join(
+                    Enrollment, Enrollment.crn_id == CRN.id
+                ).where(Enrollment.user_id == current_user.id).order_by(CRN.crn_code)
+            )]
         }
         
         # If faculty, include their created CRNs
@@ -242,19 +817,31 @@ def user_profile():
         current_user.biography = data.get('biography', current_user.biography)
         current_user.skills = data.get('skills', current_user.skills)
         current_user.interests = data.get('interests', current_user.interests)
+        # Team member skills are part of project details
+        bump_project_versions(db.session.execute, select(TeamMember.project_id).where(
+            TeamMember.student_id == current_user.id
+        ))
         db.session.commit()
+        reindex_student(current_user)
+        invalidate_crn(*enrolled_crn_codes(current_user.id))
         return jsonify({'message': 'Profile updated successfully'}), 200
 
-@app.route('/api/projects', methods=['GET', 'POST'])
+@api.route('/api/projects', methods=['GET', 'POST'])
 @login_required
+@crn_cached
 def projects():
     if request.method == 'GET':
         keyword = request.args.get('keyword', '')
         
-        # Filter projects by CRN - only show projects from faculty in the same class
-        base_query = Project.query.join(User, Project.creator_id == User.id).filter(
-            User.crn == current_user.crn
-        )
+        try:
+            fields = parse_fields(PROJECT_LIST_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Only projects of the user's current class
+        base_query = Project.query.join(CRN, Project.crn_id == CRN.id).filter(
+            CRN.crn_code == current_user.crn
+        ).options(load_fields(Project, PROJECT_LIST_FIELDS, fields))
         
         if keyword:
             projects_list = base_query.filter(
@@ -263,20 +850,9 @@ def projects():
         else:
             projects_list = base_query.all()
         
-        return jsonify([{
-            'id': p.id,
-            'name': p.name,
-            'description': p.description,
-            'capacity': p.capacity,
-            'course': p.course,
-            'status': p.status,
-            'current_members': len(p.team_members),
-            'creator': {
-                'name': f"{p.creator.first_name} {p.creator.last_name}",
-                'title': p.creator.title
-            },
-            'created_at': p.created_at.isoformat()
-        } for p in projects_list]), 200
+        return jsonify([
+            serialize_fields(p, PROJECT_LIST_FIELDS, fields) for p in projects_list
+        ]), 200
     
     elif request.method == 'POST':
         if current_user.role != 'faculty':
@@ -288,16 +864,20 @@ def projects():
             description=data['description'],
             capacity=data['capacity'],
             course=data['course'],
-            creator_id=current_user.id
+            creator_id=current_user.id,
+            crn_id=crn_id_of(current_user.crn)
         )
         
         db.session.add(project)
         db.session.commit()
+        reindex_project(project, current_user.crn)
+        invalidate_crn(current_user.crn)
         
         return jsonify({'message': 'Project created successfully', 'project_id': project.id}), 201
 
-@app.route('/api/projects/<int:project_id>', methods=['GET', 'PUT', 'DELETE'])
+@api.route('/api/projects/<int:project_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
+@project_versioned
 def project_detail(project_id):
     project = Project.query.get_or_404(project_id)
     
@@ -332,19 +912,26 @@ def project_detail(project_id):
         project.description = data.get('description', project.description)
         project.capacity = data.get('capacity', project.capacity)
         project.course = data.get('course', project.course)
+        bump_project_versions(db.session.execute, [project.id])
         
         db.session.commit()
+        reindex_project(project, project.crn_code)
+        invalidate_crn(project.crn_code)
         return jsonify({'message': 'Project updated successfully'}), 200
     
     elif request.method == 'DELETE':
         if current_user.role != 'faculty' or project.creator_id != current_user.id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        db.session.delete(project)
-        db.session.commit()
+        if wants_async():
+            job = job_runner.enqueue('delete_project', {'project_id': project.id, 'crn_code': project.crn_code},
+                                     created_by=current_user.id)
+            return job_accepted(job)
+        
+        delete_project(project)
         return jsonify({'message': 'Project deleted successfully'}), 200
 
-@app.route('/api/projects/<int:project_id>/join', methods=['POST'])
+@api.route('/api/projects/<int:project_id>/join', methods=['POST'])
 @login_required
 def join_project(project_id):
     if current_user.role != 'student':
@@ -376,12 +963,14 @@ def join_project(project_id):
     # Update project status if full
     if len(project.team_members) + 1 >= project.capacity:
         project.status = 'full'
+    bump_project_versions(db.session.execute, [project_id])
     
     db.session.commit()
+    invalidate_crn(project.crn_code)
     
     return jsonify({'message': 'Successfully joined project'}), 200
 
-@app.route('/api/projects/<int:project_id>/leave', methods=['POST'])
+@api.route('/api/projects/<int:project_id>/leave', methods=['POST'])
 @login_required
 def leave_project(project_id):
     team_member = TeamMember.query.filter_by(
@@ -394,18 +983,88 @@ def leave_project(project_id):
     
     project = Project.query.get_or_404(project_id)
     
+    record_tombstones(TeamMember, TeamMember.id == team_member.id)
     db.session.delete(team_member)
+    ReadCursor.query.filter_by(project_id=project_id, user_id=current_user.id).delete()
     
     # Update project status
     if project.status == 'full':
         project.status = 'open'
+    bump_project_versions(db.session.execute, [project_id])
     
     db.session.commit()
+    invalidate_crn(project.crn_code)
     
     return jsonify({'message': 'Successfully left project'}), 200
 
-@app.route('/api/projects/<int:project_id>/messages', methods=['GET', 'POST'])
+# Read cursors
+def project_participants(project_id):
+    """Select of the user ids that read a project's chat: its creator and team members."""
+    return select(TeamMember.student_id.label('user_id')).where(TeamMember.project_id == project_id).union(
+        select(Project.creator_id).where(Project.id == project_id)
+    )
+
+def visible_to(user_id):
+    """Messages a user has not written and may read: group messages and DMs to them."""
+    return and_(
+        Message.sender_id != user_id,
+        or_(Message.recipient_id.is_(None), Message.recipient_id == user_id)
+    )
+
+def count_unread(execute, message_id, project_id, sender_id, recipient_id=None):
+    """Bump the unread counters of everyone who can see a freshly inserted message.
+
+    Participants without a cursor get one that treats everything before this
+    message as read. Runs in the caller's transaction through execute.
+    """
+    participants = project_participants(project_id).subquery()
+    execute(insert(ReadCursor).prefix_with('OR IGNORE').from_select(
+        ['user_id', 'project_id', 'last_read_id', 'unread_count'],
+        select(participants.c.user_id, literal(project_id), literal(message_id - 1), literal(0))
+    ))
+    
+    readers = [
+        ReadCursor.project_id == project_id,
+        ReadCursor.user_id != sender_id,
+        ReadCursor.user_id.in_(project_participants(project_id))
+    ]
+    if recipient_id is not None:
+        readers.append(ReadCursor.user_id == recipient_id)
+    execute(update(ReadCursor).where(*readers).values(unread_count=ReadCursor.unread_count + 1))
+
+def insert_message(execute, values):
+    """Insert one message row and update unread counters; return the new id.
+
+    execute is db.session.execute or a Connection's execute, so the same
+    statements run in the request transaction or in a group-commit batch.
+    """
+    message_id = execute(insert(Message).values(**values)).inserted_primary_key[0]
+    count_unread(execute, message_id, values['project_id'], values['sender_id'], values['recipient_id'])
+    bump_project_versions(execute, [values['project_id']])
+    return message_id
+
+# Group commit
+# With MESSAGE_GROUP_COMMIT=1 chat inserts from concurrent requests share
+# transactions, so SQLite syncs its journal once per batch instead of per message.
+message_writer_lock = threading.Lock()
+
+def get_message_writer():
+    """The group-commit writer of the selected shard (or of the main database)."""
+    crn_code = current_shard()
+    with message_writer_lock:
+        writers = current_app.extensions.setdefault('message_writers', {})
+        writer = writers.get(crn_code)
+        if writer is None:
+            writer = writers[crn_code] = GroupCommitWriter(
+                db.session.get_bind(),
+                window=current_app.config['GROUP_COMMIT_WINDOW_MS'] / 1000,
+                max_batch=current_app.config['GROUP_COMMIT_MAX_BATCH']
+            )
+        return writer
+
+@api.route('/api/projects/<int:project_id>/messages', methods=['GET', 'POST'])
 @login_required
+@project_versioned(members_only=True)
 def project_messages(project_id):
     project = Project.query.get_or_404(project_id)
     
@@ -419,37 +1078,266 @@ def project_messages(project_id):
         return jsonify({'error': 'Not authorized to view messages'}), 403
     
     if request.method == 'GET':
-        messages = Message.query.filter_by(project_id=project_id).order_by(Message.created_at).all()
+        # Group chat plus the caller's own direct messages, never other people's
+        messages = Message.query.filter(
+            Message.project_id == project_id,
+            or_(
+                Message.recipient_id.is_(None),
+                Message.sender_id == current_user.id,
+                Message.recipient_id == current_user.id
+            )
+        ).options(joinedload(Message.sender)).order_by(Message.created_at)
         
-        return jsonify([{
-            'id': m.id,
-            'sender': {
-                'id': m.sender.id,
-                'name': f"{m.sender.first_name} {m.sender.last_name}"
-            },
-            'content': m.content,
-            'message_type': m.message_type,
-            'created_at': m.created_at.isoformat()
-        } for m in messages]), 200
+        return list_response(messages, serialize_message)
     
     elif request.method == 'POST':
         data = request.json
+        recipient_id = data.get('recipient_id')
         
-        message = Message(
-            project_id=project_id,
-            sender_id=current_user.id,
-            recipient_id=data.get('recipient_id'),
-            content=data['content'],
-            message_type=data.get('message_type', 'group')
-        )
+        if recipient_id is not None and recipient_id not in db.session.scalars(project_participants(project_id)).all():
+            return jsonify({'error': 'Recipient is not part of this project'}), 400
         
-        db.session.add(message)
-        db.session.commit()
+        values = {
+            'project_id': project_id,
+            'sender_id': current_user.id,
+            'recipient_id': recipient_id,
+            'content': data['content'],
+            'message_type': 'direct' if recipient_id is not None else 'group',
+            'created_at': datetime.utcnow()
+        }
         
-        return jsonify({'message': 'Message sent successfully'}), 201
+        if current_app.config['MESSAGE_GROUP_COMMIT']:
+            # End the request's own transaction so it holds no lock the writer
+            # waits for; submit() returns once the message's batch is committed
+            db.session.commit()
+            message_id = get_message_writer().submit(lambda connection: insert_message(connection.execute, values))
+        else:
+            message_id = insert_message(db.session.execute, values)
+            db.session.commit()
+        
+        return jsonify({'message': 'Message sent successfully', 'message_id': message_id}), 201
 
-@app.route('/api/projects/<int:project_id>/tasks', methods=['GET', 'POST'])
+@api.route('/api/projects/<int:project_id>/messages/read', methods=['POST'])
 @login_required
+def mark_messages_read(project_id):
+    """Move the caller's read cursor to {"message_id": id}, by default the latest message."""
+    project = Project.query.get_or_404(project_id)
+    
+    # Check if user is a team member or creator
+    is_member = TeamMember.query.filter_by(
+        project_id=project_id,
+        student_id=current_user.id
+    ).first() or project.creator_id == current_user.id
+    
+    if not is_member:
+        return jsonify({'error': 'Not authorized to view messages'}), 403
+    
+    latest = db.session.query(func.max(Message.id)).filter(Message.project_id == project_id).scalar() or 0
+    last_read_id = (request.get_json(silent=True) or {}).get('message_id', latest)
+    if not isinstance(last_read_id, int):
+        return jsonify({'error': 'message_id must be an integer'}), 400
+    last_read_id = min(last_read_id, latest)
+    
+    unread = 0
+    if last_read_id < latest:
+        unread = db.session.query(func.count(Message.id)).filter(
+            Message.project_id == project_id,
+            Message.id > last_read_id,
+            visible_to(current_user.id)
+        ).scalar()
+    
+    values = {'last_read_id': last_read_id, 'unread_count': unread}
+    db.session.execute(sqlite_insert(ReadCursor).values(
+        user_id=current_user.id, project_id=project_id, **values
+    ).on_conflict_do_update(index_elements=['user_id', 'project_id'], set_=values))
+    db.session.commit()
+    
+    return jsonify({'project_id': project_id, **values}), 200
+
+@api.route('/api/messages/unread', methods=['GET'])
+@login_required
+def unread_counts():
+    """Unread message counts for all of the caller's projects, read from the cursors only."""
+    is_member = select(TeamMember.id).where(
+        TeamMember.project_id == ReadCursor.project_id,
+        TeamMember.student_id == current_user.id
+    ).exists()
+    
+    cursors = db.session.query(
+        ReadCursor.project_id, ReadCursor.unread_count, ReadCursor.last_read_id
+    ).join(Project, Project.id == ReadCursor.project_id).filter(
+        ReadCursor.user_id == current_user.id,
+        or_(Project.creator_id == current_user.id, is_member)
+    ).all()
+    
+    return jsonify({
+        'total': sum(c.unread_count for c in cursors),
+        'projects': [{
+            'project_id': c.project_id,
+            'unread': c.unread_count,
+            'last_read_id': c.last_read_id
+        } for c in cursors]
+    }), 200
+
+# Direct message conversations
+# Archived messages keep their ids, which are older than every message
+# still in Message, so conversations and threads continue into
+# ArchivedMessage once the hot table runs out.
+CONVERSATION_PAGE_SIZE = 50
+
+def conversation_key(model=Message):
+    """The (lower user id, higher user id) pair of a direct message, as indexed."""
+    return (func.min(model.sender_id, model.recipient_id),
+            func.max(model.sender_id, model.recipient_id))
+
+def page_args():
+    before_id = request.args.get('before_id', type=int)
+    limit = max(1, min(request.args.get('limit', CONVERSATION_PAGE_SIZE, type=int), 200))
+    return before_id, limit
+
+def conversation_heads(model):
+    """Latest message id per conversation of the caller's direct messages in model."""
+    low, high = conversation_key(model)
+    # A UNION of the two per-user indexes; an OR here would scan every conversation
+    mine = union_all(
+        select(model.id).where(model.recipient_id.isnot(None), model.sender_id == current_user.id),
+        select(model.id).where(model.recipient_id == current_user.id)
+    )
+    return select(model.project_id, low.label('low'), high.label('high'), func.max(model.id).label('last_id')).where(
+        model.id.in_(mine)
+    ).group_by(model.project_id, low, high)
+
+@api.route('/api/conversations', methods=['GET'])
+@login_required
+def conversations():
+    """The caller's direct message conversations, most recent first, one page at a time.
+
+    Conversations are grouped by project and user pair from the caller's
+    messages_sent and messages_received, so other people's rows are never
+    read; conversations whose messages were all archived are included.
+    """
+    before_id, limit = page_args()
+    heads = union_all(conversation_heads(Message), conversation_heads(ArchivedMessage)).subquery()
+    last_id = func.max(heads.c.last_id)
+    query = select(last_id).group_by(heads.c.project_id, heads.c.low, heads.c.high)
+    if before_id:
+        query = query.having(last_id < before_id)
+    
+    # Fetch one extra row to learn whether another page exists
+    last_ids = db.session.scalars(query.order_by(last_id.desc()).limit(limit + 1)).all()
+    has_more = len(last_ids) > limit
+    last_ids = last_ids[:limit]
+    
+    latest = [
+        m for model in (Message, ArchivedMessage)
+        for m in model.query.filter(model.id.in_(last_ids)).options(
+            joinedload(model.sender), joinedload(model.recipient), joinedload(model.project)
+        )
+    ]
+    
+    result = []
+    for m in sorted(latest, key=lambda m: m.id, reverse=True):
+        other = m.recipient if m.sender_id == current_user.id else m.sender
+        result.append({
+            'project_id': m.project_id,
+            'project_name': m.project.name,
+            'user': {'id': other.id, 'name': f"{other.first_name} {other.last_name}"},
+            'last_message': serialize_message(m)
+        })
+    
+    return jsonify({
+        'conversations': result,
+        'has_more': has_more,
+        'next_before_id': last_ids[-1] if has_more else None
+    }), 200
+
+@api.route('/api/projects/<int:project_id>/conversations/<int:user_id>', methods=['GET'])
+@login_required
+def conversation_thread(project_id, user_id):
+    """Page backwards through the direct messages between the caller and user_id, archived ones included."""
+    project = Project.query.get_or_404(project_id)
+    
+    # Check if user is a team member or creator
+    is_member = TeamMember.query.filter_by(
+        project_id=project_id,
+        student_id=current_user.id
+    ).first() or project.creator_id == current_user.id
+    
+    if not is_member:
+        return jsonify({'error': 'Not authorized to view messages'}), 403
+    
+    before_id, limit = page_args()
+    
+    def older(model, before_id, limit):
+        low, high = conversation_key(model)
+        query = model.query.filter(
+            model.recipient_id.isnot(None),
+            model.project_id == project_id,
+            low == min(current_user.id, user_id),
+            high == max(current_user.id, user_id)
+        )
+        if before_id:
+            query = query.filter(model.id < before_id)
+        return query.options(joinedload(model.sender)).order_by(model.id.desc()).limit(limit).all()
+    
+    # Fetch one extra row to learn whether another page exists
+    page = older(Message, before_id, limit + 1)
+    if len(page) <= limit:
+        page += older(ArchivedMessage, page[-1].id if page else before_id, limit + 1 - len(page))
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    return jsonify({
+        'messages': [serialize_message(m) for m in reversed(page)],
+        'has_more': has_more,
+        'next_before_id': page[-1].id if has_more else None
+    }), 200
+
+@api.route('/api/projects/<int:project_id>/messages/archive', methods=['GET'])
+@login_required
+def project_archived_messages(project_id):
+    """Page backwards through archived messages older than ?before_id=."""
+    project = Project.query.get_or_404(project_id)
+    
+    # Check if user is a team member or creator
+    is_member = TeamMember.query.filter_by(
+        project_id=project_id,
+        student_id=current_user.id
+    ).first() or project.creator_id == current_user.id
+    
+    if not is_member:
+        return jsonify({'error': 'Not authorized to view messages'}), 403
+    
+    before_id = request.args.get('before_id', type=int)
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    
+    query = ArchivedMessage.query.filter(
+        ArchivedMessage.project_id == project_id,
+        or_(
+            ArchivedMessage.recipient_id.is_(None),
+            ArchivedMessage.sender_id == current_user.id,
+            ArchivedMessage.recipient_id == current_user.id
+        )
+    )
+    if before_id:
+        query = query.filter(ArchivedMessage.id < before_id)
+    
+    # Fetch one extra row to learn whether another page exists
+    page = query.options(joinedload(ArchivedMessage.sender)).order_by(
+        ArchivedMessage.id.desc()
+    ).limit(limit + 1).all()
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    return jsonify({
+        'messages': [serialize_message(m) for m in reversed(page)],
+        'has_more': has_more,
+        'next_before_id': page[-1].id if has_more else None
+    }), 200
+
+@api.route('/api/projects/<int:project_id>/tasks', methods=['GET', 'POST'])
+@login_required
+@project_versioned(members_only=True)
 def project_tasks(project_id):
     project = Project.query.get_or_404(project_id)
     
@@ -465,18 +1353,7 @@ def project_tasks(project_id):
     if request.method == 'GET':
         tasks = Task.query.filter_by(project_id=project_id).all()
         
-        return jsonify([{
-            'id': t.id,
-            'title': t.title,
-            'description': t.description,
-            'status': t.status,
-            'assignee': {
-                'id': t.assignee.id,
-                'name': f"{t.assignee.first_name} {t.assignee.last_name}"
-            } if t.assignee else None,
-            'due_date': t.due_date.isoformat() if t.due_date else None,
-            'created_at': t.created_at.isoformat()
-        } for t in tasks]), 200
+        return jsonify([serialize_task(t) for t in tasks]), 200
     
     elif request.method == 'POST':
         data = request.json
@@ -490,43 +1367,179 @@ def project_tasks(project_id):
         )
         
         db.session.add(task)
+        bump_project_versions(db.session.execute, [project_id])
         db.session.commit()
         
         return jsonify({'message': 'Task created successfully', 'task_id': task.id}), 201
 
-@app.route('/api/tasks/<int:task_id>', methods=['PUT'])
+BULK_TASK_FIELDS = ('status', 'title', 'description', 'assignee_id', 'due_date')
+TASK_STATUSES = ('pending', 'in_progress', 'completed')
+
+def editable_project_ids(project_ids):
+    """The ids among project_ids whose tasks the caller may edit: projects they belong to or created."""
+    member_of = {row.project_id for row in TeamMember.query.filter(
+        TeamMember.project_id.in_(project_ids),
+        TeamMember.student_id == current_user.id
+    ).with_entities(TeamMember.project_id)}
+    created = {row.id for row in Project.query.filter(
+        Project.id.in_(project_ids),
+        Project.creator_id == current_user.id
+    ).with_entities(Project.id)}
+    return member_of | created
+
+def project_people(project_ids):
+    """Per project id, the ids of the users a task can be assigned to: its team and its creator."""
+    people = {project_id: set() for project_id in project_ids}
+    for row in db.session.execute(select(Project.id, Project.creator_id).where(Project.id.in_(project_ids))):
+        people[row.id].add(row.creator_id)
+    for row in db.session.execute(select(TeamMember.project_id, TeamMember.student_id)
+                                  .where(TeamMember.project_id.in_(project_ids))):
+        people[row.project_id].add(row.student_id)
+    return people
+
+def apply_task_update(task, update, assignable):
+    """Apply one update entry to task; return an error string if it is invalid.
+
+    assignable holds the ids of the users the task may be assigned to.
+    """
+    if 'status' in update and update['status'] not in TASK_STATUSES:
+        return f"status must be one of: {', '.join(TASK_STATUSES)}"
+    if 'title' in update and (not isinstance(update['title'], str) or not update['title']):
+        return 'title must be a non-empty string'
+    if update.get('description') is not None and not isinstance(update['description'], str):
+        return 'description must be a string or null'
+    if update.get('assignee_id') is not None and (
+            not isinstance(update['assignee_id'], int) or update['assignee_id'] not in assignable):
+        return "assignee_id must be a member of the task's project or null"
+    
+    due_date = task.due_date
+    if 'due_date' in update:
+        try:
+            due_date = datetime.fromisoformat(update['due_date']) if update['due_date'] else None
+        except (TypeError, ValueError):
+            return 'due_date must be an ISO 8601 date'
+    
+    for field in ('status', 'title', 'description', 'assignee_id'):
+        if field in update:
+            setattr(task, field, update[field])
+    task.due_date = due_date
+    return None
+
+@api.route('/api/tasks/<int:task_id>', methods=['PUT'])
 @login_required
 def update_task(task_id):
     task = Task.query.get_or_404(task_id)
-    data = request.json
-    
-    task.status = data.get('status', task.status)
-    task.title = data.get('title', task.title)
-    task.description = data.get('description', task.description)
+    data = request.json or {}
     
-    if data.get('due_date'):
-        task.due_date = datetime.fromisoformat(data['due_date'])
+    if task.project_id not in editable_project_ids([task.project_id]):
+        return jsonify({'error': 'Not authorized'}), 403
+    if 'version' in data and data['version'] != task.version:
+        return jsonify({'error': 'Task was modified by someone else', 'version': task.version}), 409
+    
+    error = apply_task_update(task, {k: v for k, v in data.items() if k in BULK_TASK_FIELDS},
+                              project_people([task.project_id])[task.project_id])
+    if error:
+        db.session.rollback()
+        return jsonify({'error': error}), 400
+    
+    try:
+        bump_project_versions(db.session.execute, [task.project_id])
+        db.session.flush()
+        version = task.version
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Task was modified by someone else'}), 409
     
-    db.session.commit()
+    return jsonify({'message': 'Task updated successfully', 'version': version}), 200
+
+@api.route('/api/tasks/bulk', methods=['POST'])
+@login_required
+def bulk_update_tasks():
+    """
+    Apply many task edits (e.g. a kanban board reorganization) in one transaction.
+
+    Body: {"updates": [{"id", "version"?, "status"?, "title"?, "description"?,
+    "assignee_id"?, "due_date"?}, ...], "atomic": false}
+
+    Each entry is reported as updated, conflict (version mismatch), not_found,
+    forbidden or invalid. With atomic=true nothing is written unless every
+    entry succeeds. With sharding the request runs on the first task's
+    class, and tasks of other classes are not_found.
+    """
+    data = request.json or {}
+    updates = data.get('updates')
+    atomic = bool(data.get('atomic', False))
+    
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'error': 'updates must be a non-empty list'}), 400
+    if any(not isinstance(u, dict) or not isinstance(u.get('id'), int) for u in updates):
+        return jsonify({'error': 'Every update needs an integer id'}), 400
+    
+    if current_shard() is not None:
+        set_shard(located_shard(TaskShard, updates[0]['id']))
+    tasks = {t.id: t for t in Task.query.filter(Task.id.in_({u['id'] for u in updates})).all()}
+    
+    project_ids = {t.project_id for t in tasks.values()}
+    allowed = editable_project_ids(project_ids)
+    people = project_people(allowed)
+    
+    results = []
+    for update in updates:
+        task = tasks.get(update['id'])
+        result = {'id': update['id']}
+        
+        if task is None:
+            result.update(status='not_found')
+        elif task.project_id not in allowed:
+            result.update(status='forbidden')
+        elif 'version' in update and update['version'] != task.version:
+            result.update(status='conflict', version=task.version)
+        else:
+            error = apply_task_update(task, {k: v for k, v in update.items() if k in BULK_TASK_FIELDS},
+                                      people[task.project_id])
+            if error:
+                result.update(status='invalid', error=error)
+            else:
+                result.update(status='updated')
+        results.append(result)
+    
+    failed = [r for r in results if r['status'] != 'updated']
+    if atomic and failed:
+        db.session.rollback()
+        return jsonify({'error': 'No tasks were updated', 'results': results}), 409
+    
+    try:
+        changed = {tasks[r['id']].project_id for r in results if r['status'] == 'updated'}
+        if changed:
+            bump_project_versions(db.session.execute, changed)
+        # The ORM sets the new versions on flush; reading them after the
+        # commit would refresh every task
+        db.session.flush()
+        for result in results:
+            if result['status'] == 'updated':
+                result['version'] = tasks[result['id']].version
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Tasks were modified concurrently, please retry'}), 409
     
-    return jsonify({'message': 'Task updated successfully'}), 200
+    return jsonify({
+        'updated': len(results) - len(failed),
+        'failed': len(failed),
+        'results': results
+    }), 200
 
-@app.route('/api/projects/<int:project_id>/milestones', methods=['GET', 'POST'])
+@api.route('/api/projects/<int:project_id>/milestones', methods=['GET', 'POST'])
 @login_required
+@project_versioned
 def project_milestones(project_id):
     project = Project.query.get_or_404(project_id)
     
     if request.method == 'GET':
         milestones = Milestone.query.filter_by(project_id=project_id).order_by(Milestone.due_date).all()
         
-        return jsonify([{
-            'id': m.id,
-            'title': m.title,
-            'description': m.description,
-            'due_date': m.due_date.isoformat(),
-            'status': m.status,
-            'created_at': m.created_at.isoformat()
-        } for m in milestones]), 200
+        return jsonify([serialize_milestone(m) for m in milestones]), 200
     
     elif request.method == 'POST':
         if project.creator_id != current_user.id:
@@ -542,17 +1555,26 @@ def project_milestones(project_id):
         )
         
         db.session.add(milestone)
+        bump_project_versions(db.session.execute, [project_id])
         db.session.commit()
         
         return jsonify({'message': 'Milestone created successfully'}), 201
 
-@app.route('/api/students', methods=['GET'])
+@api.route('/api/students', methods=['GET'])
 @login_required
+@crn_cached
 def get_students():
     keyword = request.args.get('keyword', '')
     
-    # Filter students by CRN - only show students in the same class
-    query = User.query.filter_by(role='student', crn=current_user.crn)
+    try:
+        fields = parse_fields(STUDENT_LIST_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Only students enrolled in the same class
+    query = User.query.filter(User.id.in_(class_members(current_user.crn, 'student'))).options(
+        load_fields(User, STUDENT_LIST_FIELDS, fields)
+    )
     
     if keyword:
         query = query.filter(
@@ -563,24 +1585,54 @@ def get_students():
             (User.interests.contains(keyword))
         )
     
-    students = query.all()
+    return list_response(query, lambda s: serialize_fields(s, STUDENT_LIST_FIELDS, fields))
+
+@api.route('/api/recommended-projects', methods=['GET'])
+@login_required
+def recommended_projects():
+    """Projects in the student's class whose descriptions best match their skills and interests."""
+    if current_user.role != 'student':
+        return jsonify({'error': 'Only students can get project recommendations'}), 403
+    if not current_user.crn:
+        return jsonify({'error': 'No class assigned'}), 404
+    
+    k = max(1, min(request.args.get('k', 5, type=int), 50))
+    joined = {tm.project_id for tm in TeamMember.query.filter_by(student_id=current_user.id)}
+    
+    matches = get_skill_index(current_user.crn).projects_for_student(current_user.id, k, exclude=joined)
     
     return jsonify([{
-        'id': s.id,
-        'username': s.username,
-        'first_name': s.first_name,
-        'last_name': s.last_name,
-        'name': f"{s.first_name} {s.last_name}",
-        'skills': s.skills,
-        'interests': s.interests,
-        'biography': s.biography
-    } for s in students]), 200
-
-@app.route('/api/faculty', methods=['GET'])
+        'id': project_id,
+        'name': info['name'],
+        'course': info['course'],
+        'score': round(score, 4)
+    } for project_id, score, info in matches]), 200
+
+@api.route('/api/projects/<int:project_id>/recommended-students', methods=['GET'])
 @login_required
+def recommended_students(project_id):
+    """Students in the class whose profiles best match a project, excluding current members."""
+    project = Project.query.get_or_404(project_id)
+    
+    members = {tm.student_id for tm in TeamMember.query.filter_by(project_id=project_id)}
+    if project.creator_id != current_user.id and current_user.id not in members:
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    k = max(1, min(request.args.get('k', 10, type=int), 100))
+    matches = get_skill_index(project.crn_code).students_for_project(project_id, k, exclude=members)
+    
+    return jsonify([{
+        'id': student_id,
+        'name': info['name'],
+        'score': round(score, 4)
+    } for student_id, score, info in matches]), 200
+
+@api.route('/api/faculty', methods=['GET'])
+@login_required
+@crn_cached
 def get_faculty():
     """Get all faculty members in the same CRN"""
-    faculty_members = User.query.filter_by(role='faculty', crn=current_user.crn).all()
+    faculty_members = User.query.filter(User.id.in_(class_members(current_user.crn, 'faculty'))).all()
     
     return jsonify([{
         'id': f.id,
@@ -592,8 +1644,9 @@ def get_faculty():
         'email': f.email
     } for f in faculty_members]), 200
 
-@app.route('/api/class-info', methods=['GET'])
+@api.route('/api/class-info', methods=['GET'])
 @login_required
+@crn_cached
 def get_class_info():
     """Get information about the current user's class"""
     if not current_user.crn:
@@ -606,11 +1659,9 @@ def get_class_info():
         return jsonify({'error': 'Class not found'}), 404
     
     # Count students and faculty in this class
-    student_count = User.query.filter_by(role='student', crn=current_user.crn).count()
-    faculty_count = User.query.filter_by(role='faculty', crn=current_user.crn).count()
-    project_count = Project.query.join(User, Project.creator_id == User.id).filter(
-        User.crn == current_user.crn
-    ).count()
+    student_count = count_enrolled(crn.id, 'student')
+    faculty_count = count_enrolled(crn.id, 'faculty')
+    project_count = Project.query.filter_by(crn_id=crn.id).count()
     
     return jsonify({
         'crn_code': crn.crn_code,
@@ -622,56 +1673,34 @@ def get_class_info():
     }), 200
 
 # User Stories / Announcements
-@app.route('/api/user-stories', methods=['GET', 'POST'])
+def visible_stories(user):
+    """Query of the stories a user should see in their current class."""
+    # Faculty sees all announcements from students and faculty in their CRN
+    stories = UserStory.query.join(User, UserStory.author_id == User.id).filter(
+        User.id.in_(class_members(user.crn))
+    ).options(contains_eager(UserStory.author))
+    
+    if user.role != 'faculty':
+        # Students see:
+        # 1. Announcements from faculty in their CRN (project_id is NULL)
+        # 2. Announcements from teammates in their projects (project_id is set)
+        user_project_ids = db.session.query(TeamMember.project_id).filter_by(
+            student_id=user.id
+        )
+        
+        stories = stories.filter(
+            ((User.role == 'faculty') & UserStory.project_id.is_(None)) |
+            UserStory.project_id.in_(user_project_ids)
+        )
+    return stories
+
+@api.route('/api/user-stories', methods=['GET', 'POST'])
 @login_required
 def user_stories():
     """Get all user stories or create a new one"""
     if request.method == 'GET':
-        # Get all stories that the current user should see (filtered by CRN)
-        if current_user.role == 'faculty':
-            # Faculty sees all announcements from students and faculty in their CRN
-            stories = UserStory.query.join(User, UserStory.author_id == User.id).filter(
-                User.crn == current_user.crn
-            ).order_by(UserStory.created_at.desc()).all()
-        else:
-            # Students see:
-            # 1. Announcements from faculty in their CRN (project_id is NULL)
-            # 2. Announcements from teammates in their projects (project_id is set)
-            
-            # Get user's project IDs
-            team_memberships = TeamMember.query.filter_by(student_id=current_user.id).all()
-            user_project_ids = [tm.project_id for tm in team_memberships]
-            
-            # Get stories from faculty in same CRN (CRN-wide announcements)
-            faculty_stories = UserStory.query.join(User, UserStory.author_id == User.id).filter(
-                User.role == 'faculty',
-                User.crn == current_user.crn,
-                UserStory.project_id.is_(None)
-            ).all()
-            
-            # Get stories from project teammates (only from same CRN)
-            project_stories = UserStory.query.join(User, UserStory.author_id == User.id).filter(
-                UserStory.project_id.in_(user_project_ids),
-                User.crn == current_user.crn
-            ).all() if user_project_ids else []
-            
-            # Combine and remove duplicates
-            stories_dict = {s.id: s for s in faculty_stories + project_stories}
-            stories = sorted(stories_dict.values(), key=lambda x: x.created_at, reverse=True)
-        
-        return jsonify([{
-            'id': story.id,
-            'author_id': story.author_id,
-            'author_name': f"{story.author.first_name} {story.author.last_name}",
-            'author_role': story.author.role,
-            'title': story.title,
-            'content': story.content,
-            'story_type': story.story_type,
-            'priority': story.priority,
-            'project_id': story.project_id,
-            'created_at': story.created_at.isoformat(),
-            'updated_at': story.updated_at.isoformat()
-        } for story in stories]), 200
+        stories = visible_stories(current_user)
+        return list_response(stories.order_by(UserStory.created_at.desc()), serialize_story)
     
     # POST - Create new user story
     data = request.json
@@ -717,7 +1746,7 @@ def user_stories():
         'story_id': story.id
     }), 201
 
-@app.route('/api/user-stories/<int:story_id>', methods=['PUT', 'DELETE'])
+@api.route('/api/user-stories/<int:story_id>', methods=['PUT', 'DELETE'])
 @login_required
 def manage_user_story(story_id):
     """Update or delete a user story"""
@@ -745,13 +1774,14 @@ def manage_user_story(story_id):
         return jsonify({'message': 'User story updated successfully'}), 200
     
     # DELETE
+    record_tombstones(UserStory, UserStory.id == story.id)
     db.session.delete(story)
     db.session.commit()
     
     return jsonify({'message': 'User story deleted successfully'}), 200
 
 # CRN Management
-@app.route('/api/crns', methods=['GET', 'POST'])
+@api.route('/api/crns', methods=['GET', 'POST'])
 def manage_crns():
     """Get all CRNs or create a new one (faculty only for POST)"""
     if request.method == 'GET':
@@ -789,38 +1819,611 @@ def manage_crns():
             faculty_id=current_user.id
         )
         
-        # Assign faculty to this class
-        current_user.crn = data['crn_code']
-        
         db.session.add(crn)
+        db.session.flush()
+        
+        # Assign faculty to this class
+        enroll(current_user, crn)
         db.session.commit()
+        invalidate_crn(crn.crn_code)
         
         return jsonify({
             'message': 'Class created successfully',
             'crn_id': crn.id
         }), 201
 
-@app.route('/api/crns/<int:crn_id>', methods=['DELETE'])
+@api.route('/api/crns/<int:crn_id>', methods=['DELETE'])
 @login_required
 def delete_crn(crn_id):
-    """Delete a CRN (faculty only)"""
+    """Delete a CRN and its projects, teams, tasks and messages (faculty only)"""
     crn = CRN.query.get_or_404(crn_id)
     
     # Only the faculty who created it can delete
     if crn.faculty_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Check if any students are using this CRN
-    students_with_crn = User.query.filter_by(crn=crn.crn_code, role='student').count()
-    if students_with_crn > 0:
+    # Check if any students are enrolled in this CRN
+    if count_enrolled(crn.id, 'student') > 0:
         return jsonify({'error': 'Cannot delete class with enrolled students'}), 400
     
-    db.session.delete(crn)
-    db.session.commit()
+    if wants_async():
+        job = job_runner.enqueue('delete_crn', {'crn_id': crn.id}, created_by=current_user.id)
+        return job_accepted(job)
+    
+    purge_crn(crn)
     
     return jsonify({'message': 'Class deleted successfully'}), 200
 
-@app.route('/api/my-classes', methods=['GET'])
+# CRN Export
+# Tables are written in this order; a resumed export restarts at ?table= and
+# skips rows up to ?after_id= within it.
+EXPORT_TABLES = ('projects', 'team_members', 'milestones', 'tasks', 'messages', 'archived_messages',
+                 'announcements')
+EXPORT_BATCH_SIZE = 1000
+
+def export_statements(crn_code):
+    """Core SELECTs for every table in a CRN's archive, keyed by export name."""
+    project_ids = class_projects(crn_code)
+    stories = UserStory.__table__
+    return {
+        'projects': select(Project.__table__).where(Project.id.in_(project_ids)),
+        'team_members': select(TeamMember.__table__).where(TeamMember.project_id.in_(project_ids)),
+        'milestones': select(Milestone.__table__).where(Milestone.project_id.in_(project_ids)),
+        'tasks': select(Task.__table__).where(Task.project_id.in_(project_ids)),
+        'messages': select(Message.__table__).where(Message.project_id.in_(project_ids)),
+        'archived_messages': select(ArchivedMessage.__table__).where(
+            ArchivedMessage.project_id.in_(project_ids)
+        ),
+        # Project announcements plus CRN-wide ones posted by members of the class
+        'announcements': select(stories).where(
+            or_(
+                stories.c.project_id.in_(project_ids),
+                and_(stories.c.project_id.is_(None), stories.c.author_id.in_(class_members(crn_code)))
+            )
+        ),
+    }
+
+def export_rows(statement, after_id=0):
+    """Yield row mappings in id order, fetched in batches from a streaming cursor."""
+    table = statement.selected_columns
+    statement = statement.where(table.id > after_id).order_by(table.id)
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in result.mappings():
+        yield {key: value.isoformat() if isinstance(value, datetime) else value
+               for key, value in row.items()}
+
+def export_ndjson(statements, tables, after_id):
+    batch = []
+    for index, name in enumerate(tables):
+        for row in export_rows(statements[name], after_id if index == 0 else 0):
+            batch.append(dumps_bytes({'table': name, 'data': row}))
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield b'\n'.join(batch) + b'\n'
+                batch = []
+    if batch:
+        yield b'\n'.join(batch) + b'\n'
+
+def export_csv(statement, after_id):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(statement.selected_columns.keys())
+    for count, row in enumerate(export_rows(statement, after_id), 1):
+        writer.writerow(row.values())
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+@api.route('/api/crns/<int:crn_id>/export', methods=['GET'])
+@login_required
+def export_crn(crn_id):
+    """
+    Stream a gzip-compressed archive of a class's project history (faculty only).
+
+    format=ndjson (default) writes every table as {"table": ..., "data": {...}}
+    lines; format=csv writes the single table named by ?table=. To resume an
+    interrupted download pass the table and id of the last row received as
+    ?table=&after_id=.
+    """
+    crn = CRN.query.get_or_404(crn_id)
+
+    if crn.faculty_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    set_shard(crn.crn_code)
+    export_format = request.args.get('format', 'ndjson')
+    table = request.args.get('table')
+    after_id = request.args.get('after_id', 0, type=int)
+
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': "format must be 'ndjson' or 'csv'"}), 400
+    if table is not None and table not in EXPORT_TABLES:
+        return jsonify({'error': f"table must be one of: {', '.join(EXPORT_TABLES)}"}), 400
+    if export_format == 'csv' and table is None:
+        return jsonify({'error': 'CSV exports require a table'}), 400
+
+    statements = export_statements(crn.crn_code)
+
+    if export_format == 'csv':
+        chunks = export_csv(statements[table], after_id)
+        filename = f"crn-{crn.crn_code}-{table}.csv.gz"
+    else:
+        tables = EXPORT_TABLES[EXPORT_TABLES.index(table):] if table else EXPORT_TABLES
+        chunks = export_ndjson(statements, tables, after_id)
+        filename = f"crn-{crn.crn_code}.ndjson.gz"
+
+    return current_app.response_class(
+        stream_with_context(compress_chunks(chunks, 'gzip', current_app.config)),
+        mimetype='application/gzip',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@api.route('/api/crns/<int:crn_id>/overview', methods=['GET'])
+@login_required
+def crn_overview(crn_id):
+    """
+    Per-project progress for a whole class (faculty only): task counts by
+    status, overdue tasks, milestone completion, team size and last activity.
+
+    Each figure comes from one grouped aggregate over the class's projects,
+    so the cost does not grow with a query per team.
+    """
+    crn = CRN.query.get_or_404(crn_id)
+
+    if crn.faculty_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    set_shard(crn.crn_code)
+    now = datetime.utcnow()
+    projects_in_crn = db.session.query(
+        Project.id, Project.name, Project.capacity, Project.status
+    ).filter(Project.crn_id == crn.id).order_by(Project.name).all()
+    project_ids = [p.id for p in projects_in_crn]
+
+    task_counts = {}
+    for project_id, status, count in db.session.query(
+        Task.project_id, Task.status, func.count(Task.id)
+    ).filter(Task.project_id.in_(project_ids)).group_by(Task.project_id, Task.status):
+        task_counts.setdefault(project_id, {})[status] = count
+
+    overdue = dict(db.session.query(Task.project_id, func.count(Task.id)).filter(
+        Task.project_id.in_(project_ids),
+        Task.due_date < now,
+        Task.status != 'completed'
+    ).group_by(Task.project_id).all())
+
+    milestones = {row.project_id: row for row in db.session.query(
+        Milestone.project_id,
+        func.count(Milestone.id).label('total'),
+        func.sum(case((Milestone.status == 'completed', 1), else_=0)).label('completed'),
+        func.sum(case((and_(Milestone.due_date < now, Milestone.status != 'completed'), 1), else_=0)).label('overdue')
+    ).filter(Milestone.project_id.in_(project_ids)).group_by(Milestone.project_id)}
+
+    members = dict(db.session.query(TeamMember.project_id, func.count(TeamMember.id)).filter(
+        TeamMember.project_id.in_(project_ids)
+    ).group_by(TeamMember.project_id).all())
+
+    # Latest message, task or milestone creation per project
+    last_activity = {}
+    for model in (Message, Task, Milestone):
+        for project_id, latest in db.session.query(model.project_id, func.max(model.created_at)).filter(
+            model.project_id.in_(project_ids)
+        ).group_by(model.project_id):
+            if latest and (project_id not in last_activity or latest > last_activity[project_id]):
+                last_activity[project_id] = latest
+
+    result = []
+    for p in projects_in_crn:
+        counts = task_counts.get(p.id, {})
+        m = milestones.get(p.id)
+        result.append({
+            'id': p.id,
+            'name': p.name,
+            'status': p.status,
+            'capacity': p.capacity,
+            'current_members': members.get(p.id, 0),
+            'tasks': {
+                'total': sum(counts.values()),
+                'pending': counts.get('pending', 0),
+                'in_progress': counts.get('in_progress', 0),
+                'completed': counts.get('completed', 0),
+                'overdue': overdue.get(p.id, 0)
+            },
+            'milestones': {
+                'total': m.total if m else 0,
+                'completed': int(m.completed) if m else 0,
+                'overdue': int(m.overdue) if m else 0
+            },
+            'last_activity': last_activity[p.id].isoformat() if p.id in last_activity else None
+        })
+
+    return jsonify({
+        'crn_code': crn.crn_code,
+        'course_name': crn.course_name,
+        'projects': result
+    }), 200
+
+# Team Formation
+MAX_PREFERENCES = 10
+
+@api.route('/api/project-preferences', methods=['GET', 'PUT'])
+@login_required
+def project_preferences():
+    """
+    GET – The student's ranked project choices.
+    PUT – Replace them with {"project_ids": [first, second, ...]}.
+    """
+    if current_user.role != 'student':
+        return jsonify({'error': 'Only students can rank projects'}), 403
+    
+    if request.method == 'GET':
+        preferences = ProjectPreference.query.filter_by(student_id=current_user.id).order_by(
+            ProjectPreference.rank
+        ).all()
+        return jsonify([{'project_id': p.project_id, 'rank': p.rank} for p in preferences]), 200
+    
+    project_ids = (request.json or {}).get('project_ids')
+    if not isinstance(project_ids, list) or len(set(project_ids)) != len(project_ids):
+        return jsonify({'error': 'project_ids must be a list without duplicates'}), 400
+    if len(project_ids) > MAX_PREFERENCES:
+        return jsonify({'error': f'You can rank at most {MAX_PREFERENCES} projects'}), 400
+    
+    in_class = {pid for (pid,) in db.session.query(Project.id).join(CRN, Project.crn_id == CRN.id).filter(
+        Project.id.in_(project_ids),
+        CRN.crn_code == current_user.crn
+    )}
+    if len(in_class) != len(project_ids):
+        return jsonify({'error': 'Projects must belong to your class'}), 400
+    
+    ProjectPreference.query.filter_by(student_id=current_user.id).delete()
+    db.session.add_all([
+        ProjectPreference(student_id=current_user.id, project_id=pid, rank=rank)
+        for rank, pid in enumerate(project_ids, 1)
+    ])
+    db.session.commit()
+    
+    return jsonify({'message': 'Preferences saved'}), 200
+
+def team_benefit(crn_code, student_ids, project_ids, preference_weight, skill_weight):
+    """Students x projects benefit matrix from ranked preferences and skill similarity."""
+    student_row = {sid: i for i, sid in enumerate(student_ids)}
+    project_col = {pid: j for j, pid in enumerate(project_ids)}
+    benefit = np.zeros((len(student_ids), len(project_ids)))
+    
+    if preference_weight:
+        preferences = db.session.query(
+            ProjectPreference.student_id, ProjectPreference.project_id, ProjectPreference.rank
+        ).filter(ProjectPreference.project_id.in_(project_ids))
+        for student_id, project_id, rank in preferences:
+            if student_id in student_row:
+                benefit[student_row[student_id], project_col[project_id]] += (
+                    preference_weight * preference_benefit(rank, MAX_PREFERENCES)
+                )
+    
+    if skill_weight:
+        index_students, index_projects, similarity = get_skill_index(crn_code).similarity_matrix()
+        rows = np.array([student_row.get(sid, -1) for sid in index_students], dtype=np.int64)
+        cols = np.array([project_col.get(pid, -1) for pid in index_projects], dtype=np.int64)
+        keep_rows, keep_cols = np.flatnonzero(rows >= 0), np.flatnonzero(cols >= 0)
+        benefit[np.ix_(rows[keep_rows], cols[keep_cols])] += (
+            skill_weight * similarity[np.ix_(keep_rows, keep_cols)]
+        )
+    
+    return benefit
+
+@api.route('/api/crns/<int:crn_id>/form-teams', methods=['POST'])
+@login_required
+def form_teams(crn_id):
+    """
+    Assign students of a class to projects (faculty only, class owner).
+
+    Body: {"reset": false, "dry_run": false, "preference_weight": 1.0,
+    "skill_weight": 0.5}. By default students already on a team keep their
+    place and only the rest are assigned to the remaining capacity; with
+    reset=true every team in the class is rebuilt. The assignment maximizes
+    preference and skill-match benefit under project capacities and is
+    written in one transaction.
+    """
+    crn = CRN.query.get_or_404(crn_id)
+    
+    if crn.faculty_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    set_shard(crn.crn_code)
+    data = request.json or {}
+    reset = bool(data.get('reset', False))
+    dry_run = bool(data.get('dry_run', False))
+    try:
+        preference_weight = float(data.get('preference_weight', 1.0))
+        skill_weight = float(data.get('skill_weight', 0.5))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Weights must be numbers'}), 400
+    
+    projects_in_crn = db.session.query(Project.id, Project.capacity).filter(
+        Project.crn_id == crn.id
+    ).order_by(Project.id).all()
+    project_ids = [p.id for p in projects_in_crn]
+    
+    members = dict(db.session.query(TeamMember.project_id, func.count(TeamMember.id)).filter(
+        TeamMember.project_id.in_(project_ids)
+    ).group_by(TeamMember.project_id).all())
+    placed = set() if reset else {sid for (sid,) in db.session.query(TeamMember.student_id).filter(
+        TeamMember.project_id.in_(project_ids)
+    )}
+    
+    student_ids = [sid for (sid,) in db.session.query(Enrollment.user_id).filter(
+        Enrollment.crn_id == crn.id, Enrollment.role == 'student'
+    ).order_by(Enrollment.user_id) if sid not in placed]
+    capacity = np.array([
+        p.capacity if reset else p.capacity - members.get(p.id, 0) for p in projects_in_crn
+    ], dtype=np.int64)
+    
+    started = time.perf_counter()
+    benefit = team_benefit(crn.crn_code, student_ids, project_ids, preference_weight, skill_weight)
+    try:
+        choice = solve_assignment(benefit, capacity)
+    except InsufficientCapacity as e:
+        return jsonify({'error': f'Not enough room on teams: {e}'}), 400
+    solve_ms = (time.perf_counter() - started) * 1000
+    
+    assignments = [(sid, project_ids[j]) for sid, j in zip(student_ids, choice.tolist())]
+    
+    # How many students got one of their ranked choices
+    ranks = dict(((s, p), r) for s, p, r in db.session.query(
+        ProjectPreference.student_id, ProjectPreference.project_id, ProjectPreference.rank
+    ).filter(ProjectPreference.project_id.in_(project_ids)))
+    got_rank = [ranks.get(pair) for pair in assignments]
+    
+    if not dry_run and assignments:
+        if reset:
+            record_tombstones(TeamMember, TeamMember.project_id.in_(project_ids))
+            db.session.execute(delete(TeamMember).where(TeamMember.project_id.in_(project_ids)))
+            members = {}
+        db.session.execute(insert(TeamMember), [
+            {'project_id': pid, 'student_id': sid, 'joined_at': datetime.utcnow(), 'status': 'active'}
+            for sid, pid in assignments
+        ])
+        
+        for sid, pid in assignments:
+            members[pid] = members.get(pid, 0) + 1
+        full = [p.id for p in projects_in_crn if members.get(p.id, 0) >= p.capacity]
+        db.session.execute(update(Project).where(Project.id.in_(project_ids)).values(
+            status=case((Project.id.in_(full), 'full'), else_='open'),
+            version=Project.version + 1
+        ))
+        db.session.commit()
+        invalidate_crn(crn.crn_code)
+    
+    return jsonify({
+        'message': 'Dry run, nothing saved' if dry_run else f'Assigned {len(assignments)} students',
+        'assigned': len(assignments),
+        'solve_ms': round(solve_ms, 1),
+        'first_choice': sum(1 for r in got_rank if r == 1),
+        'ranked_choice': sum(1 for r in got_rank if r is not None),
+        'assignments': [{'student_id': sid, 'project_id': pid} for sid, pid in assignments]
+    }), 200
+
+# Message Retention
+ARCHIVE_BATCH_SIZE = 5000
+
+def archive_messages(condition):
+    """Move messages matching condition into ArchivedMessage, batch by batch.
+
+    Each batch is copied and deleted with set-based statements in its own
+    transaction, so the writer lock is never held for a whole class at once.
+    Returns the number of messages archived.
+    """
+    columns = ['id', 'project_id', 'sender_id', 'recipient_id', 'content', 'message_type', 'created_at']
+    total = 0
+    while True:
+        ids = db.session.execute(
+            select(Message.id).where(condition).order_by(Message.id).limit(ARCHIVE_BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            return total
+
+        db.session.execute(insert(ArchivedMessage).from_select(
+            columns + ['archived_at'],
+            select(*[getattr(Message, column) for column in columns], literal(datetime.utcnow())).where(
+                Message.id.in_(ids)
+            )
+        ))
+        bump_project_versions(db.session.execute, select(Message.project_id).where(Message.id.in_(ids)))
+        record_tombstones(Message, Message.id.in_(ids))
+        db.session.execute(delete(Message).where(Message.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
+
+def archive_expired_messages(max_age_days=None):
+    """Archive every message older than the retention window."""
+    if max_age_days is None:
+        max_age_days = current_app.config['MESSAGE_RETENTION_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    total = 0
+    for crn_code in shard_codes():
+        with use_shard(crn_code):
+            total += archive_messages(Message.created_at < cutoff)
+    return total
+
+def archive_crn(crn_code):
+    with use_shard(crn_code):
+        return archive_messages(Message.project_id.in_(class_projects(crn_code)))
+
+@api.cli.command('archive-messages')
+def archive_messages_command():
+    """Archive messages older than MESSAGE_RETENTION_DAYS (run from cron)."""
+    count = archive_expired_messages()
+    print(f"Archived {count} messages older than {current_app.config['MESSAGE_RETENTION_DAYS']} days")
+
+@api.route('/api/crns/<int:crn_id>/archive-messages', methods=['POST'])
+@login_required
+def archive_crn_messages(crn_id):
+    """Move every message of a finished class into the archive (faculty only)."""
+    crn = CRN.query.get_or_404(crn_id)
+
+    if crn.faculty_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    if wants_async():
+        job = job_runner.enqueue('archive_crn_messages', {'crn_code': crn.crn_code}, created_by=current_user.id)
+        return job_accepted(job)
+
+    count = archive_crn(crn.crn_code)
+
+    return jsonify({'message': f'Archived {count} messages', 'archived_count': count}), 200
+
+# Delta sync
+# GET /api/sync?updated_since= returns only the rows of the caller's class
+# changed since the client's watermark, plus tombstones for deleted ones, so
+# an offline cache is refreshed without re-downloading every view.
+# Watermarks are moved back by SYNC_OVERLAP so a write committed while a
+# sync was being read is seen by the next one; clients upsert by id.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+def parse_watermark(value):
+    """Parse an ISO 8601 watermark into naive UTC; raises ValueError."""
+    since = datetime.fromisoformat(value)
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+def serialize_team_member(m):
+    return {
+        'id': m.id,
+        'project_id': m.project_id,
+        'student_id': m.student_id,
+        'status': m.status,
+        'joined_at': m.joined_at.isoformat()
+    }
+
+def serialize_tombstone(t):
+    return {'type': t.kind, 'id': t.row_id, 'project_id': t.project_id}
+
+SYNC_SERIALIZERS = {
+    'projects': lambda p: serialize_fields(p, PROJECT_LIST_FIELDS, PROJECT_LIST_FIELDS),
+    'team_members': serialize_team_member,
+    'tasks': serialize_task,
+    'milestones': serialize_milestone,
+    'messages': serialize_message,
+    'user_stories': serialize_story,
+    'deleted': serialize_tombstone,
+}
+
+def sync_response(header, sources):
+    """Send a sync: header fields plus each source (name -> query or list) as a list.
+
+    With ?stream= nothing is materialized: the body is a {"type": "sync",
+    "row": header} entry followed by one {"type": name, "row": ...} entry per
+    row, read in STREAM_BATCH_SIZE batches.
+    """
+    mode = stream_format()
+    if not mode:
+        return jsonify({**header, **{name: [SYNC_SERIALIZERS[name](row) for row in rows]
+                                     for name, rows in sources.items()}}), 200
+    entries = itertools.chain([('sync', header)], (
+        (name, row) for name, rows in sources.items()
+        for row in (rows if isinstance(rows, list) else rows.yield_per(STREAM_BATCH_SIZE))
+    ))
+    return stream_rows(entries, lambda entry: {
+        'type': entry[0], 'row': entry[1] if entry[0] == 'sync' else SYNC_SERIALIZERS[entry[0]](entry[1])
+    }, mode)
+
+@api.route('/api/sync', methods=['GET'])
+@login_required
+def sync():
+    """Changes in the caller's current class since ?updated_since=, or everything without it.
+
+    ?crn_code= names the class the client's cache holds; a different class,
+    a missing watermark or one older than SYNC_TOMBSTONE_DAYS (whose
+    tombstones may have been pruned) answers with a full snapshot instead,
+    marked "full": true, which replaces the cache. Callers without a class
+    get an empty snapshot. ?stream=json|ndjson streams the rows; see
+    sync_response().
+    """
+    now = datetime.utcnow()
+    header = {'full': True, 'crn_code': current_user.crn, 'watermark': (now - SYNC_OVERLAP).isoformat()}
+    crn_id = crn_id_of(current_user.crn)
+    if crn_id is None:
+        return sync_response(header, {name: [] for name in SYNC_SERIALIZERS})
+
+    since = None
+    if request.args.get('updated_since'):
+        try:
+            since = parse_watermark(request.args['updated_since'])
+        except ValueError:
+            return jsonify({'error': 'updated_since must be an ISO 8601 timestamp'}), 400
+        retention = timedelta(days=current_app.config['SYNC_TOMBSTONE_DAYS'])
+        if since < now - retention or request.args.get('crn_code') != current_user.crn:
+            since = None
+    header['full'] = since is None
+
+    def changed(query, column):
+        return query if since is None else query.filter(column > since)
+
+    me = current_user.id
+    class_project_ids = select(Project.id).where(Project.crn_id == crn_id)
+    my_project_ids = select(Project.id).where(
+        Project.crn_id == crn_id,
+        or_(Project.creator_id == me,
+            Project.id.in_(select(TeamMember.project_id).where(TeamMember.student_id == me)))
+    )
+    # Projects joined since the watermark: their older tasks and messages are new to the client
+    fresh = []
+    if since is not None:
+        fresh = db.session.scalars(select(TeamMember.project_id).where(
+            TeamMember.student_id == me, TeamMember.updated_at > since
+        )).all()
+
+    def changed_in_mine(query, model):
+        if since is None:
+            return query
+        return query.filter(or_(model.updated_at > since, model.project_id.in_(fresh)))
+
+    deleted = []
+    if since is not None:
+        deleted = Tombstone.query.filter(
+            Tombstone.crn_id == crn_id, Tombstone.deleted_at > since
+        ).order_by(Tombstone.id)
+
+    return sync_response(header, {
+        'projects': changed(Project.query.filter(Project.id.in_(class_project_ids)), Project.updated_at).options(
+            load_fields(Project, PROJECT_LIST_FIELDS, PROJECT_LIST_FIELDS)
+        ),
+        'team_members': changed(TeamMember.query.filter(TeamMember.project_id.in_(class_project_ids)),
+                                TeamMember.updated_at),
+        'tasks': changed_in_mine(Task.query.filter(Task.project_id.in_(my_project_ids)), Task).options(
+            joinedload(Task.assignee)
+        ),
+        'milestones': changed(Milestone.query.filter(Milestone.project_id.in_(class_project_ids)),
+                              Milestone.updated_at),
+        'messages': changed_in_mine(Message.query.filter(
+            Message.project_id.in_(my_project_ids),
+            or_(Message.recipient_id.is_(None), Message.sender_id == me, Message.recipient_id == me)
+        ), Message).options(joinedload(Message.sender)),
+        'user_stories': changed(visible_stories(current_user), UserStory.updated_at),
+        'deleted': deleted,
+    })
+
+def prune_tombstones(max_age_days=None):
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS; clients that old resync in full."""
+    if max_age_days is None:
+        max_age_days = current_app.config['SYNC_TOMBSTONE_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    total = 0
+    for crn_code in shard_codes():
+        with use_shard(crn_code):
+            total += db.session.execute(delete(Tombstone).where(Tombstone.deleted_at < cutoff)).rowcount
+            db.session.commit()
+    return total
+
+@api.cli.command('prune-tombstones')
+def prune_tombstones_command():
+    """Delete sync tombstones older than SYNC_TOMBSTONE_DAYS (run from cron)."""
+    count = prune_tombstones()
+    print(f"Deleted {count} tombstones older than {current_app.config['SYNC_TOMBSTONE_DAYS']} days")
+
+@api.route('/api/my-classes', methods=['GET'])
 @login_required
 def get_my_classes():
     """Get all classes for the current faculty member"""
@@ -833,12 +2436,11 @@ def get_my_classes():
     result = []
     for cls in classes:
         # Count students in this class
-        student_count = User.query.filter_by(role='student', crn=cls.crn_code).count()
+        student_count = count_enrolled(cls.id, 'student')
         
         # Count projects in this class
-        project_count = Project.query.join(User, Project.creator_id == User.id).filter(
-            User.crn == cls.crn_code
-        ).count()
+        with use_shard(cls.crn_code):
+            project_count = Project.query.filter_by(crn_id=cls.id).count()
         
         result.append({
             'id': cls.id,
@@ -852,32 +2454,223 @@ def get_my_classes():
     return jsonify(result), 200
 
 # Assignment Calendar
-@app.route('/api/calendar/assignments', methods=['GET'])
+def parse_date_range():
+    """Read optional ?start=&end= ISO dates; end is exclusive. Raises ValueError."""
+    start = request.args.get('start')
+    end = request.args.get('end')
+    try:
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        raise ValueError('start and end must be ISO 8601 dates')
+    if start and end and end <= start:
+        raise ValueError('end must be after start')
+    return start, end
+
+@api.route('/api/calendar/assignments', methods=['GET'])
 @login_required
 def get_assignment_calendar():
-    """Get all assignments/tasks for calendar display"""
+    """Get assignments/tasks for calendar display, optionally within ?start=&end="""
     if current_user.role != 'student':
         return jsonify({'error': 'Only students can view assignment calendar'}), 403
     
-    # Get all tasks assigned to current student
-    tasks = Task.query.filter_by(assignee_id=current_user.id).all()
+    try:
+        start, end = parse_date_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Served by the (assignee_id, due_date) index, with the project name joined in
+    query = db.session.query(
+        Task.id, Task.title, Task.description, Task.due_date, Task.status,
+        Task.project_id, Project.name.label('project_name')
+    ).join(Project, Task.project_id == Project.id).filter(
+        Task.assignee_id == current_user.id,
+        Task.due_date.isnot(None)
+    )
+    if start:
+        query = query.filter(Task.due_date >= start)
+    if end:
+        query = query.filter(Task.due_date < end)
+    
+    return jsonify([{
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'due_date': task.due_date.isoformat(),
+        'status': task.status,
+        'project_id': task.project_id,
+        'project_name': task.project_name
+    } for task in query.order_by(Task.due_date)]), 200
+
+@api.route('/api/calendar/faculty', methods=['GET'])
+@login_required
+def get_faculty_calendar():
+    """
+    Every milestone and task due in ?start=&end= across the faculty member's
+    projects (?scope=created, the default) or every project in their class
+    (?scope=crn). One range query per table, regardless of project count.
+    """
+    if current_user.role != 'faculty':
+        return jsonify({'error': 'Only faculty can view the faculty calendar'}), 403
+    
+    try:
+        start, end = parse_date_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    scope = request.args.get('scope', 'created')
+    if scope == 'created':
+        project_ids = select(Project.id).where(Project.creator_id == current_user.id)
+    elif scope == 'crn':
+        if not current_user.crn:
+            return jsonify({'error': 'No class assigned'}), 404
+        project_ids = class_projects(current_user.crn)
+    else:
+        return jsonify({'error': "scope must be 'created' or 'crn'"}), 400
+    
+    def in_window(column):
+        conditions = [column.isnot(None)]
+        if start:
+            conditions.append(column >= start)
+        if end:
+            conditions.append(column < end)
+        return and_(*conditions)
+    
+    milestones = db.session.query(
+        Milestone.id, Milestone.title, Milestone.due_date, Milestone.status,
+        Milestone.project_id, Project.name.label('project_name')
+    ).join(Project, Milestone.project_id == Project.id).filter(
+        Milestone.project_id.in_(project_ids),
+        in_window(Milestone.due_date)
+    ).order_by(Milestone.due_date)
+    
+    tasks = db.session.query(
+        Task.id, Task.title, Task.due_date, Task.status, Task.project_id,
+        Project.name.label('project_name'),
+        (User.first_name + ' ' + User.last_name).label('assignee_name')
+    ).join(Project, Task.project_id == Project.id).outerjoin(
+        User, Task.assignee_id == User.id
+    ).filter(
+        Task.project_id.in_(project_ids),
+        in_window(Task.due_date)
+    ).order_by(Task.due_date)
+    
+    return jsonify({
+        'milestones': [{
+            'id': m.id,
+            'title': m.title,
+            'due_date': m.due_date.isoformat(),
+            'status': m.status,
+            'project_id': m.project_id,
+            'project_name': m.project_name
+        } for m in milestones],
+        'tasks': [{
+            'id': t.id,
+            'title': t.title,
+            'due_date': t.due_date.isoformat(),
+            'status': t.status,
+            'project_id': t.project_id,
+            'project_name': t.project_name,
+            'assignee_name': t.assignee_name
+        } for t in tasks]
+    }), 200
+
+@api.route('/api/calendar/feed-token', methods=['GET', 'POST'])
+@login_required
+def calendar_feed_token():
+    """
+    GET  – Return the user's calendar feed URL, creating a token on first use.
+    POST – Rotate the token, invalidating previously shared feed URLs.
+    """
+    calendar_token = CalendarToken.query.filter_by(user_id=current_user.id).first()
+    
+    if calendar_token is None:
+        calendar_token = CalendarToken(user_id=current_user.id, token=secrets.token_urlsafe(32))
+        db.session.add(calendar_token)
+    elif request.method == 'POST':
+        calendar_token.token = secrets.token_urlsafe(32)
+        calendar_token.created_at = datetime.utcnow()
+    
+    db.session.commit()
     
-    assignments = []
+    return jsonify({
+        'token': calendar_token.token,
+        'feed_url': url_for('api.calendar_feed', token=calendar_token.token, _external=True)
+    }), 200
+
+def calendar_project_ids(user_id):
+    """Projects whose milestones belong in a user's feed: joined or created."""
+    return select(TeamMember.project_id).where(TeamMember.student_id == user_id).union(
+        select(Project.id).where(Project.creator_id == user_id)
+    )
+
+def calendar_etag(user_id):
+    """Fingerprint the feed from index-only aggregates instead of rendering it.
+
+    Task versions and milestone updated_at change on every edit; counts and
+    max ids change when deadlines are added, removed or reassigned. Project
+    names are part of every SUMMARY, so those of the feed's projects are
+    hashed as well.
+    """
+    tasks = db.session.query(
+        func.count(Task.id), func.max(Task.id), func.sum(Task.version)
+    ).filter(Task.assignee_id == user_id, Task.due_date.isnot(None)).one()
+    milestones = db.session.query(
+        func.count(Milestone.id), func.max(Milestone.id), func.max(Milestone.updated_at)
+    ).filter(Milestone.project_id.in_(calendar_project_ids(user_id))).one()
+    projects = db.session.query(Project.id, Project.name).filter(
+        Project.id.in_(calendar_project_ids(user_id)) | Project.id.in_(
+            select(Task.project_id).where(Task.assignee_id == user_id, Task.due_date.isnot(None))
+        )
+    ).order_by(Project.id).all()
+    fingerprint = f"{tuple(tasks)}|{tuple(milestones)}|{[tuple(p) for p in projects]}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+def calendar_events(user):
+    stamp = datetime.utcnow()
+    yield from ical.calendar_header(f"Capstone deadlines - {user.first_name} {user.last_name}")
+
+    tasks = db.session.query(
+        Task.id, Task.title, Task.description, Task.due_date, Task.status, Project.name
+    ).join(Project, Task.project_id == Project.id).filter(
+        Task.assignee_id == user.id,
+        Task.due_date.isnot(None)
+    ).order_by(Task.due_date).yield_per(STREAM_BATCH_SIZE)
     for task in tasks:
-        if task.due_date:
-            assignments.append({
-                'id': task.id,
-                'title': task.title,
-                'description': task.description,
-                'due_date': task.due_date.isoformat(),
-                'status': task.status,
-                'project_id': task.project_id,
-                'project_name': task.project.name
-            })
-    
-    return jsonify(assignments), 200
-
-@app.route('/api/join-class', methods=['POST'])
+        yield ical.event(f"task-{task.id}", f"[{task.name}] {task.title}", task.due_date,
+                         task.description, stamp)
+
+    milestones = db.session.query(
+        Milestone.id, Milestone.title, Milestone.description, Milestone.due_date, Project.name
+    ).join(Project, Milestone.project_id == Project.id).filter(
+        Milestone.project_id.in_(calendar_project_ids(user.id))
+    ).order_by(Milestone.due_date).yield_per(STREAM_BATCH_SIZE)
+    for milestone in milestones:
+        yield ical.event(f"milestone-{milestone.id}", f"[{milestone.name}] Milestone: {milestone.title}",
+                         milestone.due_date, milestone.description, stamp)
+
+    yield from ical.calendar_footer()
+
+@api.route('/api/calendar/feed/<string:token>.ics', methods=['GET'])
+def calendar_feed(token):
+    """Streamed iCal feed of a user's task and milestone deadlines (token auth)."""
+    calendar_token = CalendarToken.query.filter_by(token=token).first()
+    if calendar_token is None:
+        return jsonify({'error': 'Unknown calendar feed'}), 404
+    
+    set_shard(calendar_token.user.crn)
+    etag = calendar_etag(calendar_token.user_id)
+    if etag in request.if_none_match:
+        return current_app.response_class(status=304, headers={'ETag': f'"{etag}"'})
+    
+    user = calendar_token.user
+    return current_app.response_class(
+        stream_with_context(chunk.encode('utf-8') for chunk in calendar_events(user)),
+        mimetype='text/calendar',
+        headers={'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+    )
+
+@api.route('/api/join-class', methods=['POST'])
 @login_required
 def join_class():
     """Allow a student to join a class by entering its CRN code"""
@@ -897,8 +2690,11 @@ def join_class():
     if current_user.crn == crn_code:
         return jsonify({'error': 'You are already enrolled in this class'}), 400
 
-    current_user.crn = crn_code
+    # Earlier classes keep the enrollment; joining one again switches back to it
+    enroll(current_user, crn)
     db.session.commit()
+    reindex_student(current_user)
+    invalidate_crn(crn_code)
 
     return jsonify({
         'message': f'Successfully joined {crn.course_name}',
@@ -906,11 +2702,62 @@ def join_class():
         'course_name': crn.course_name
     }), 200
 
+def leave_class_projects(user_id, crn_id):
+    """Take a student off their teams and drop their project preferences in a class; the caller commits."""
+    class_project_ids = select(Project.id).where(Project.crn_id == crn_id)
+    teams = db.session.scalars(select(TeamMember.project_id).where(
+        TeamMember.student_id == user_id, TeamMember.project_id.in_(class_project_ids)
+    )).all()
+    if teams:
+        memberships = and_(TeamMember.student_id == user_id, TeamMember.project_id.in_(teams))
+        record_tombstones(TeamMember, memberships)
+        db.session.execute(delete(TeamMember).where(memberships))
+        db.session.execute(delete(ReadCursor).where(ReadCursor.user_id == user_id, ReadCursor.project_id.in_(teams)))
+        db.session.execute(update(Project).where(Project.id.in_(teams), Project.status == 'full').values(
+            status='open'
+        ))
+        bump_project_versions(db.session.execute, teams)
+    db.session.execute(delete(ProjectPreference).where(
+        ProjectPreference.student_id == user_id, ProjectPreference.project_id.in_(class_project_ids)
+    ))
+
+@api.route('/api/leave-class', methods=['POST'])
+@login_required
+def leave_class():
+    """Drop a student's enrollment in a class; their current class moves to another enrollment"""
+    if current_user.role != 'student':
+        return jsonify({'error': 'Only students can leave classes'}), 403
+
+    crn_code = (request.json or {}).get('crn_code', '').strip()
+    crn = CRN.query.filter_by(crn_code=crn_code).first()
+    if not crn:
+        return jsonify({'error': 'Class not found'}), 404
+
+    # The class's teams and preferences live in its shard, which also sees the main database
+    with use_shard(crn_code):
+        removed = db.session.execute(delete(Enrollment).where(
+            Enrollment.user_id == current_user.id, Enrollment.crn_id == crn.id
+        )).rowcount
+        if not removed:
+            return jsonify({'error': 'You are not enrolled in this class'}), 400
+
+        leave_class_projects(current_user.id, crn.id)
+        if current_user.crn == crn_code:
+            remaining = enrolled_crn_codes(current_user.id)
+            current_user.crn = remaining[0] if remaining else None
+        db.session.commit()
+    index = loaded_skill_indexes().get(crn_code)
+    if index is not None:
+        index.remove_student(current_user.id)
+    invalidate_crn(crn_code)
+
+    return jsonify({'message': f'Left {crn.course_name}', 'crn_code': current_user.crn}), 200
+
 # ==========================================
 # CUSTOM PROJECT ENDPOINTS
 # ==========================================
 
-@app.route('/api/custom-projects', methods=['GET', 'POST'])
+@api.route('/api/custom-projects', methods=['GET', 'POST'])
 @login_required
 def custom_projects():
     """
@@ -923,8 +2770,7 @@ def custom_projects():
             # Show all proposals from students enrolled in this faculty's CRN
             proposals = (
                 CustomProject.query
-                .join(User, CustomProject.proposer_id == User.id)
-                .filter(User.crn == current_user.crn)
+                .filter(CustomProject.proposer_id.in_(class_members(current_user.crn, 'student')))
                 .order_by(CustomProject.created_at.desc())
                 .all()
             )
@@ -976,7 +2822,7 @@ def custom_projects():
     return jsonify({'message': 'Custom project submitted for faculty approval', 'proposal_id': proposal.id}), 201
 
 
-@app.route('/api/custom-projects/<int:proposal_id>/review', methods=['POST'])
+@api.route('/api/custom-projects/<int:proposal_id>/review', methods=['POST'])
 @login_required
 def review_custom_project(proposal_id):
     """Faculty accept or deny a student's custom project proposal."""
@@ -986,8 +2832,7 @@ def review_custom_project(proposal_id):
     proposal = CustomProject.query.get_or_404(proposal_id)
 
     # Make sure the proposer is in the same CRN as the faculty
-    proposer = User.query.get(proposal.proposer_id)
-    if proposer.crn != current_user.crn:
+    if not is_enrolled(proposal.proposer_id, current_user.crn, 'student'):
         return jsonify({'error': 'Unauthorized: proposal is not from your class'}), 403
 
     if proposal.approval_status != 'pending':
@@ -1003,21 +2848,24 @@ def review_custom_project(proposal_id):
     proposal.reviewed_at = datetime.utcnow()
 
     if action == 'approve':
-        proposal.approval_status = 'approved'
-
-        # Create the real project, credited to the faculty reviewer
-        new_project = Project(
-            name=proposal.name,
-            description=proposal.description,
-            capacity=proposal.capacity,
-            course=proposal.course,
-            creator_id=current_user.id
-        )
-        db.session.add(new_project)
-        db.session.flush()  # get new_project.id before commit
-
-        proposal.approved_project_id = new_project.id
-        db.session.commit()
+        if wants_async():
+            # Marked now so the proposal cannot be reviewed twice while queued;
+            # the job sets 'approved', or 'pending' again if it fails for good
+            proposal.approval_status = 'approving'
+            db.session.commit()
+            try:
+                job = job_runner.enqueue('approve_proposal', {
+                    'proposal_id': proposal.id,
+                    'reviewer_id': current_user.id,
+                    'crn_code': current_user.crn
+                }, created_by=current_user.id)
+            except Exception:
+                db.session.rollback()
+                reopen_proposal(proposal.id)
+                raise
+            return job_accepted(job)
+
+        new_project = approve_proposal(proposal, current_user)
 
         return jsonify({
             'message': 'Proposal approved and project created',
@@ -1030,9 +2878,646 @@ def review_custom_project(proposal_id):
         return jsonify({'message': 'Proposal denied'}), 200
 
 
-# Initialize database
-with app.app_context():
+def approve_proposal(proposal, reviewer):
+    """Create the real project for a proposal, credited to the faculty reviewer."""
+    proposal.approval_status = 'approved'
+
+    new_project = Project(
+        name=proposal.name,
+        description=proposal.description,
+        capacity=proposal.capacity,
+        course=proposal.course,
+        creator_id=reviewer.id,
+        crn_id=crn_id_of(reviewer.crn)
+    )
+    db.session.add(new_project)
+    db.session.flush()  # get new_project.id before commit
+
+    proposal.approved_project_id = new_project.id
+    db.session.commit()
+    reindex_project(new_project, reviewer.crn)
+    invalidate_crn(reviewer.crn)
+    return new_project
+
+def reopen_proposal(proposal_id):
+    """Put a proposal whose queued approval never ran back up for review."""
+    db.session.execute(update(CustomProject).where(
+        CustomProject.id == proposal_id, CustomProject.approval_status == 'approving'
+    ).values(approval_status='pending', reviewed_at=None))
+    db.session.commit()
+
+# Set-based deletes
+# Dependent rows are removed with one DELETE ... WHERE project_id IN (...)
+# per table (each served by a project_id index) instead of the ORM cascades,
+# which load every member, message, task and milestone into the session first.
+PROJECT_CHILD_MODELS = (TeamMember, ProjectPreference, ReadCursor, Message, ArchivedMessage, Task, Milestone,
+                        UserStory)
+
+def record_tombstones(model, condition):
+    """Keep a Tombstone for each row of model matching condition; call just before deleting them.
+
+    Rows deleted along with their project need none: the project's own
+    tombstone tells sync clients to drop everything in it.
+    """
+    project_id = Project.id if model is Project else model.project_id
+    crn_id = Project.crn_id
+    if model is UserStory:
+        # A CRN-wide story shows in every class of its author: one tombstone per class
+        crn_id = func.coalesce(Project.crn_id, Enrollment.crn_id)
+    rows = select(literal(model.__tablename__), model.id, project_id, crn_id, literal(datetime.utcnow()))
+    if model is not Project:
+        rows = rows.select_from(model).outerjoin(Project, model.project_id == Project.id)
+    if model is UserStory:
+        rows = rows.outerjoin(Enrollment, and_(model.project_id.is_(None), Enrollment.user_id == model.author_id))
+    db.session.execute(insert(Tombstone).from_select(
+        ['kind', 'row_id', 'project_id', 'crn_id', 'deleted_at'], rows.where(condition)
+    ))
+
+def delete_projects(project_ids):
+    """Delete projects (ids or a select of ids) and everything in them; the caller commits."""
+    record_tombstones(Project, Project.id.in_(project_ids))
+    db.session.execute(delete(TaskShard).where(TaskShard.id.in_(
+        select(Task.id).where(Task.project_id.in_(project_ids))
+    )), execution_options={'synchronize_session': False})
+    for model in PROJECT_CHILD_MODELS:
+        db.session.execute(delete(model).where(model.project_id.in_(project_ids)),
+                           execution_options={'synchronize_session': False})
+    # Proposals stay on record, without the project they became
+    db.session.execute(update(CustomProject).where(CustomProject.approved_project_id.in_(project_ids)).values(
+        approved_project_id=None
+    ), execution_options={'synchronize_session': False})
+    db.session.execute(delete(ProjectShard).where(ProjectShard.id.in_(project_ids)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(delete(Project).where(Project.id.in_(project_ids)),
+                       execution_options={'synchronize_session': False})
+
+def delete_project(project):
+    project_id, crn_code = project.id, project.crn_code
+    delete_projects([project_id])
+    db.session.commit()
+    index = loaded_skill_indexes().get(crn_code)
+    if index is not None:
+        index.remove_project(project_id)
+    invalidate_crn(crn_code)
+
+def purge_crn(crn):
+    """Delete a class and all of its content in one transaction.
+
+    Its projects go with everything in them, as do the enrollments and the
+    CRN-wide announcements of members not enrolled in another class. Users
+    whose current class it was switch to their oldest remaining enrollment,
+    or to none. With sharding the
+    class's shard file is emptied but left on disk.
+    """
+    crn_code = crn.crn_code
+    set_shard(crn_code)
+    only_here = select(Enrollment.user_id).where(Enrollment.crn_id == crn.id).except_(
+        select(Enrollment.user_id).where(Enrollment.crn_id != crn.id)
+    )
+    delete_projects(select(Project.id).where(Project.crn_id == crn.id))
+    db.session.execute(delete(Tombstone).where(Tombstone.crn_id == crn.id),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(delete(UserStory).where(UserStory.project_id.is_(None), UserStory.author_id.in_(only_here)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(delete(Enrollment).where(Enrollment.crn_id == crn.id),
+                       execution_options={'synchronize_session': False})
+    # Users whose current class this was fall back to their oldest other enrollment
+    other_class = select(CRN.crn_code).join(Enrollment, Enrollment.crn_id == CRN.id).where(
+        Enrollment.user_id == User.id
+    ).order_by(Enrollment.id).limit(1).scalar_subquery()
+    db.session.execute(update(User).where(User.crn == crn_code).values(crn=other_class),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(delete(CRN).where(CRN.crn_code == crn_code),
+                       execution_options={'synchronize_session': False})
+    db.session.commit()
+    loaded_skill_indexes().pop(crn_code, None)
+    invalidate_crn(crn_code)
+
+# Background jobs
+# Heavy operations accept ?async=1 and answer 202 with a job to poll at
+# GET /api/jobs/<id> instead of holding a request worker.
+job_runner = JobRunner(db, Job)
+
+def wants_async():
+    return request.args.get('async', '').lower() in ('1', 'true')
+
+def job_accepted(job):
+    return jsonify({
+        'message': 'Accepted',
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}'
+    }), 202, {'Location': f'/api/jobs/{job.id}'}
+
+def export_path(filename):
+    return os.path.join(current_app.instance_path, 'exports', filename)
+
+@job_runner.handler('delete_project')
+def delete_project_job(payload):
+    set_shard(payload.get('crn_code'))
+    project = db.session.get(Project, payload['project_id'])
+    if project is None:
+        return {'deleted': False}
+    delete_project(project)
+    return {'deleted': True}
+
+@job_runner.handler('delete_crn')
+def delete_crn_job(payload):
+    crn = db.session.get(CRN, payload['crn_id'])
+    if crn is None or count_enrolled(crn.id, 'student'):
+        # Gone already, or students enrolled while the job was queued
+        return {'deleted': False}
+    purge_crn(crn)
+    return {'deleted': True}
+
+@job_runner.handler('archive_crn_messages')
+def archive_crn_messages_job(payload):
+    return {'archived_count': archive_crn(payload['crn_code'])}
+
+def approve_proposal_failed(payload, error):
+    set_shard(payload.get('crn_code'))
+    reopen_proposal(payload['proposal_id'])
+
+@job_runner.handler('approve_proposal', on_failure=approve_proposal_failed)
+def approve_proposal_job(payload):
+    set_shard(payload.get('crn_code'))
+    proposal = db.session.get(CustomProject, payload['proposal_id'])
+    if proposal.approved_project_id:
+        # Already done by an earlier attempt
+        return {'project_id': proposal.approved_project_id}
+    new_project = approve_proposal(proposal, db.session.get(User, payload['reviewer_id']))
+    return {'project_id': new_project.id}
+
+@job_runner.handler('export_crn')
+def export_crn_job(payload):
+    """Write a class's NDJSON export to a gzip file in the instance folder."""
+    set_shard(payload['crn_code'])
+    path = export_path(payload['filename'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    chunks = export_ndjson(export_statements(payload['crn_code']), EXPORT_TABLES, 0)
+    with open(path, 'wb') as f:
+        for chunk in compress_chunks(chunks, 'gzip', current_app.config):
+            f.write(chunk)
+    return {'filename': payload['filename'], 'bytes': os.path.getsize(path)}
+
+@api.route('/api/crns/<int:crn_id>/export-jobs', methods=['POST'])
+@login_required
+def start_export_job(crn_id):
+    """Build a class's full NDJSON export in the background (faculty only)."""
+    crn = CRN.query.get_or_404(crn_id)
+
+    if crn.faculty_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    job = job_runner.enqueue('export_crn', {
+        'crn_code': crn.crn_code,
+        'filename': f"crn-{crn.crn_code}-{secrets.token_hex(8)}.ndjson.gz"
+    }, created_by=current_user.id)
+    return job_accepted(job)
+
+@api.route('/api/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    job = Job.query.get_or_404(job_id)
+
+    if job.created_by != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    result = json.loads(job.result) if job.result else None
+    response = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+    if job.kind == 'export_crn' and job.status == 'done':
+        response['download_url'] = f'/api/jobs/{job.id}/download'
+    return jsonify(response), 200
+
+@api.route('/api/jobs/<int:job_id>/download', methods=['GET'])
+@login_required
+def download_job_result(job_id):
+    job = Job.query.get_or_404(job_id)
+
+    if job.created_by != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if job.kind != 'export_crn' or job.status != 'done':
+        return jsonify({'error': 'No file for this job'}), 404
+
+    filename = json.loads(job.result)['filename']
+    return send_file(export_path(filename), mimetype='application/gzip',
+                     as_attachment=True, download_name=filename)
+
+@api.cli.command('run-jobs')
+def run_jobs_command():
+    """Run background job workers in the foreground (e.g. as a separate process)."""
+    job_runner.start()
+    print(f"Running {current_app.config['JOB_WORKERS']} job workers; press Ctrl+C to stop")
+    job_runner.join()
+
+
+# Due-date reminders
+# Run the scheduler as one process with `flask --app app run-reminders`.
+REMINDER_CHANGE_OVERLAP = timedelta(seconds=5)
+
+def shard_kind(kind, crn_code):
+    """Deadline kind qualified by shard ('task@CS101'), since ids repeat across shards."""
+    return f'{kind}@{crn_code}' if crn_code else kind
+
+def load_due_deadlines(after, until):
+    """Open tasks and milestones due in (after, until], via the due_date indexes."""
+    deadlines = []
+    for crn_code in shard_codes():
+        with use_shard(crn_code):
+            tasks = db.session.query(Task.id, Task.due_date).filter(
+                Task.due_date > after, Task.due_date <= until, Task.status != 'completed'
+            )
+            milestones = db.session.query(Milestone.id, Milestone.due_date).filter(
+                Milestone.due_date > after, Milestone.due_date <= until, Milestone.status != 'completed'
+            )
+            deadlines += [Deadline(shard_kind('task', crn_code), t.id, t.due_date) for t in tasks] + \
+                [Deadline(shard_kind('milestone', crn_code), m.id, m.due_date) for m in milestones]
+    return deadlines
+
+def load_changed_deadlines(since):
+    """Tasks and milestones created or edited since the last scan, via the updated_at indexes.
+
+    The scan overlaps the previous one a little so rows committed late with an
+    older timestamp are not missed; the scheduler ignores repeats.
+    """
+    until = datetime.utcnow()
+    cutoff = since - REMINDER_CHANGE_OVERLAP
+    deadlines = []
+    for crn_code in shard_codes():
+        with use_shard(crn_code):
+            tasks = db.session.query(Task.id, Task.due_date).filter(
+                Task.updated_at > cutoff, Task.status != 'completed'
+            )
+            milestones = db.session.query(Milestone.id, Milestone.due_date).filter(
+                Milestone.updated_at > cutoff, Milestone.status != 'completed'
+            )
+            deadlines += [Deadline(shard_kind('task', crn_code), t.id, t.due_date) for t in tasks] + \
+                [Deadline(shard_kind('milestone', crn_code), m.id, m.due_date) for m in milestones]
+    return deadlines, until
+
+def resolve_reminders(deadlines):
+    """(user_id, item) for every recipient of deadlines that are still open and unmoved."""
+    by_shard = {}
+    for d in deadlines:
+        kind, _, crn_code = d.kind.partition('@')
+        by_shard.setdefault(crn_code or None, []).append(d._replace(kind=kind))
+    reminders = []
+    for crn_code, shard_deadlines in by_shard.items():
+        with use_shard(crn_code):
+            reminders += resolve_shard_reminders(shard_deadlines)
+    return reminders
+
+def resolve_shard_reminders(deadlines):
+    expected = {(d.kind, d.id): d.due for d in deadlines}
+    task_ids = [d.id for d in deadlines if d.kind == 'task']
+    milestone_ids = [d.id for d in deadlines if d.kind == 'milestone']
+    reminders = []
+
+    tasks = db.session.query(
+        Task.id, Task.title, Task.status, Task.due_date, Task.assignee_id, Project.id.label('project_id'),
+        Project.name.label('project_name')
+    ).join(Project, Task.project_id == Project.id).filter(Task.id.in_(task_ids))
+    for t in tasks:
+        if t.status != 'completed' and t.assignee_id and expected[('task', t.id)] == t.due_date:
+            reminders.append((t.assignee_id, {
+                'type': 'task', 'id': t.id, 'title': t.title, 'project_id': t.project_id,
+                'project_name': t.project_name, 'due_date': t.due_date.isoformat()
+            }))
+
+    milestones = [m for m in db.session.query(
+        Milestone.id, Milestone.title, Milestone.status, Milestone.due_date, Project.id.label('project_id'),
+        Project.name.label('project_name')
+    ).join(Project, Milestone.project_id == Project.id).filter(Milestone.id.in_(milestone_ids))
+        if m.status != 'completed' and expected[('milestone', m.id)] == m.due_date]
+
+    members = {}
+    for project_id, student_id in db.session.query(TeamMember.project_id, TeamMember.student_id).filter(
+        TeamMember.project_id.in_({m.project_id for m in milestones})
+    ):
+        members.setdefault(project_id, []).append(student_id)
+
+    for m in milestones:
+        item = {
+            'type': 'milestone', 'id': m.id, 'title': m.title, 'project_id': m.project_id,
+            'project_name': m.project_name, 'due_date': m.due_date.isoformat()
+        }
+        reminders.extend((student_id, item) for student_id in members.get(m.project_id, ()))
+    return reminders
+
+class OutboxSink:
+    """Reminder sink writing to ReminderOutbox; committed together with the scheduler state."""
+
+    def emit(self, window_end, batches):
+        now = datetime.utcnow()
+        db.session.execute(insert(ReminderOutbox), [
+            {'user_id': user_id, 'window_end': window_end, 'items': json.dumps(items), 'created_at': now}
+            for user_id, items in batches.items()
+        ])
+
+def save_reminder_state(sent_until, changed_since):
+    db.session.merge(ReminderState(id=1, sent_until=sent_until, changed_since=changed_since))
+    db.session.commit()
+
+def create_reminder_scheduler():
+    sink_setting = current_app.config['REMINDER_SINK']
+    sink = OutboxSink() if sink_setting == 'outbox' else FileSink(sink_setting)
+    state = db.session.get(ReminderState, 1)
+
+    return ReminderScheduler(
+        load_due_deadlines, load_changed_deadlines, resolve_reminders, sink,
+        lead=timedelta(hours=current_app.config['REMINDER_LEAD_HOURS']),
+        sent_until=state.sent_until if state else None,
+        changed_since=state.changed_since if state else None,
+        on_emitted=save_reminder_state
+    )
+
+@api.cli.command('build-frontend')
+def build_frontend_command():
+    """Fingerprint and precompress frontend/ into FRONTEND_BUILD_DIR."""
+    manifest = build_assets(FRONTEND_DIR, current_app.config['FRONTEND_BUILD_DIR'])
+    for name, hashed in manifest.items():
+        print(f"{name} -> {hashed}")
+
+@api.cli.command('run-reminders')
+@click.option('--once', is_flag=True, help='Run a single tick and exit.')
+def run_reminders_command(once):
+    """Emit due-date reminders every REMINDER_INTERVAL seconds."""
+    scheduler = create_reminder_scheduler()
+    if once:
+        print(f"Emitted {scheduler.tick()} reminders")
+        return
+    print(f"Reminder scheduler running every {current_app.config['REMINDER_INTERVAL']:g}s; press Ctrl+C to stop")
+    scheduler.run(current_app.config['REMINDER_INTERVAL'])
+
+@api.route('/api/reminders', methods=['GET'])
+@login_required
+def get_reminders():
+    """The caller's latest reminder batches from the outbox, newest first."""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    batches = ReminderOutbox.query.filter_by(user_id=current_user.id).order_by(
+        ReminderOutbox.id.desc()
+    ).limit(limit).all()
+
+    return jsonify([{
+        'id': b.id,
+        'window_end': b.window_end.isoformat(),
+        'items': json.loads(b.items)
+    } for b in batches]), 200
+
+
+# Sharding
+# With SHARD_BY_CRN=1 these tables live in one SQLite file per class (see
+# shards.py); users, CRNs, enrollments, jobs and reminders stay in the main
+# database. Requests naming a project or task run on its shard (see
+# request_shard), others on the caller's current class; routes and jobs
+# working on some other class select its shard themselves.
+SHARDED_MODELS = (Project, TeamMember, ProjectPreference, ReadCursor, Message, ArchivedMessage, Task, Milestone,
+                  UserStory, CustomProject, Tombstone)
+
+class ProjectShard(db.Model):
+    """Which shard each project lives in (main database; NULL crn_code: the main database itself).
+
+    With sharding on, project ids are allocated here rather than by the
+    shard, so they are unique across classes and /api/projects/<id> URLs
+    can be routed to the project's shard whatever the caller's current class.
+    """
+    __tablename__ = 'project_shard'
+    __table_args__ = {'sqlite_autoincrement': True}  # never hand out a deleted project's id again
+    id = db.Column(db.Integer, primary_key=True)
+    crn_code = db.Column(db.String(20))
+
+class TaskShard(db.Model):
+    """Which shard each task lives in, for the /api/tasks/<id> routes; see ProjectShard."""
+    __tablename__ = 'task_shard'
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    crn_code = db.Column(db.String(20))
+
+SHARD_LOCATIONS = {Project: ProjectShard, Task: TaskShard}
+
+@event.listens_for(Project, 'before_insert')
+@event.listens_for(Task, 'before_insert')
+def allocate_global_id(mapper, connection, target):
+    """Take a new project's or task's id from its location table when sharded.
+
+    The insert goes through the shard connection to the attached main
+    database, so it commits or rolls back with the row itself.
+    """
+    crn_code = current_shard()
+    if crn_code and target.id is None:
+        location = SHARD_LOCATIONS[type(target)]
+        target.id = connection.execute(insert(location).values(crn_code=crn_code)).inserted_primary_key[0]
+
+def located_shard(location, item_id):
+    """CRN code of the shard holding a project or task, or the caller's class if it is not on record."""
+    row = db.session.execute(select(location.crn_code).where(location.id == item_id)).first()
+    return row.crn_code if row else caller_shard()
+
+def request_shard():
+    """Shard a request runs on: that of the project or task its URL names, else the caller's class."""
+    args = request.view_args or {}
+    if 'project_id' in args:
+        return located_shard(ProjectShard, args['project_id'])
+    if 'task_id' in args:
+        return located_shard(TaskShard, args['task_id'])
+    return caller_shard()
+
+def sharded_tables():
+    names = {model.__tablename__ for model in SHARDED_MODELS}
+    return [table for table in db.metadata.sorted_tables if table.name in names]
+
+def prepare_shard(engine):
+    """Create or upgrade the class tables of a shard file; safe to run from several processes."""
+    tables = sharded_tables()
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(CreateTable(table, if_not_exists=True))
+    upgrade_schema(engine, tables)
+
+def shard_codes():
+    """CRN codes to visit for work spanning every class; [None] (the main database) when not sharded."""
+    if 'shards' not in current_app.extensions:
+        return [None]
+    return db.session.scalars(select(CRN.crn_code).order_by(CRN.crn_code)).all()
+
+def class_rows(tables, crn):
+    """Per sharded table name, the condition selecting crn's rows from tables (name -> Table)."""
+    projects = tables['project']
+    project_ids = select(projects.c.id).where(projects.c.crn_id == crn.id)
+    members = select(Enrollment.user_id).where(Enrollment.crn_id == crn.id)
+    conditions = {name: table.c.project_id.in_(project_ids) for name, table in tables.items()
+                  if 'project_id' in table.c}
+    conditions['project'] = projects.c.crn_id == crn.id
+    # CRN-wide announcements and proposals belong to every class their author is in
+    stories = tables['user_story']
+    conditions['user_story'] = or_(stories.c.project_id.in_(project_ids),
+                                   and_(stories.c.project_id.is_(None), stories.c.author_id.in_(members)))
+    conditions['custom_project'] = tables['custom_project'].c.proposer_id.in_(
+        members.where(Enrollment.role == 'student')
+    )
+    conditions['tombstone'] = tables['tombstone'].c.crn_id == crn.id
+    return conditions
+
+def split_into_shards(prune=False):
+    """Copy every class's rows from the main database into its shard; return rows copied per CRN.
+
+    Rows keep their ids and rows already in a shard are skipped, so a split
+    can be re-run. Every project and task is recorded in ProjectShard and
+    TaskShard so requests naming them are routed to their shard. With prune
+    the copied rows are then deleted from the main database; projects whose
+    creator had no class stay there either way.
+    """
+    router = current_app.extensions['shards']
+    tables = sharded_tables()
+    # The main database's copies of the tables, as seen from a shard connection
+    sources = {table.name: table.to_metadata(MetaData(), schema=MAIN_SCHEMA) for table in tables}
+    crns = CRN.query.order_by(CRN.crn_code).all()
+
+    copied = {}
+    for crn in crns:
+        conditions = class_rows(sources, crn)
+        with router.engine(crn.crn_code).begin() as conn:
+            copied[crn.crn_code] = sum(conn.execute(
+                insert(table).prefix_with('OR IGNORE').from_select(
+                    table.c.keys(), select(*sources[table.name].c).where(conditions[table.name])
+                )
+            ).rowcount for table in tables)
+
+    with db.engine.begin() as conn:
+        conn.execute(insert(ProjectShard).prefix_with('OR IGNORE').from_select(
+            ['id', 'crn_code'], select(Project.id, CRN.crn_code).outerjoin(CRN, CRN.id == Project.crn_id)
+        ))
+        conn.execute(insert(TaskShard).prefix_with('OR IGNORE').from_select(
+            ['id', 'crn_code'], select(Task.id, CRN.crn_code).join(Project, Project.id == Task.project_id)
+            .outerjoin(CRN, CRN.id == Project.crn_id)
+        ))
+
+    if prune:
+        with db.engine.begin() as conn:
+            for crn in crns:
+                conditions = class_rows({table.name: table for table in tables}, crn)
+                for table in reversed(tables):
+                    conn.execute(delete(table).where(conditions[table.name]))
+    return copied
+
+@api.cli.command('split-shards')
+@click.option('--prune', is_flag=True, help='Delete the copied rows from the main database afterwards.')
+def split_shards_command(prune):
+    """Copy each class's projects and their contents into its shard (SHARD_BY_CRN=1)."""
+    if 'shards' not in current_app.extensions:
+        raise click.UsageError('Set SHARD_BY_CRN=1 to split the database into shards')
+    for crn_code, count in split_into_shards(prune).items():
+        print(f"{crn_code}: {count} rows")
+
+def upgrade_schema(engine=None, tables=None):
+    """Add columns and indexes introduced after a database was first created.
+
+    db.create_all() only creates missing tables, so existing capstone.db files
+    are brought up to date here. New columns must be nullable or have a
+    server_default. engine and tables default to the main database and
+    every table.
+    """
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        # Reflect through this connection: a second one would roll it back on
+        # return when they share a pool connection (in-memory databases)
+        inspector = inspect(conn)
+        for table in tables or db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}')
+            if table.dialect_options['sqlite']['autoincrement']:
+                add_autoincrement(conn, table)
+            # IF NOT EXISTS instead of checkfirst: reflection skips expression indexes
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+def add_autoincrement(conn, table):
+    """Rebuild a table created without AUTOINCREMENT (SQLite can't ALTER it in); its indexes are recreated after."""
+    ddl = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+    ).scalar()
+    if 'AUTOINCREMENT' in ddl.upper():
+        return
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{table.name}_rebuild"')
+    conn.execute(CreateTable(table))
+    conn.exec_driver_sql(f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM "{table.name}_rebuild"')
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}_rebuild"')
+
+def migrate_enrollments():
+    """Backfill Enrollment rows and Project.crn_id from the User.crn strings.
+
+    Databases created before enrollments existed only record a user's class
+    in User.crn and a project's class through its creator. Rows that are
+    already there are left alone, so this can run on every init-db.
+    """
+    now = literal(datetime.utcnow())
+    with db.engine.begin() as conn:
+        conn.execute(insert(Enrollment).prefix_with('OR IGNORE').from_select(
+            ['user_id', 'crn_id', 'role', 'created_at'],
+            select(User.id, CRN.id, User.role, now).join(CRN, CRN.crn_code == User.crn)
+        ))
+        conn.execute(insert(Enrollment).prefix_with('OR IGNORE').from_select(
+            ['user_id', 'crn_id', 'role', 'created_at'],
+            select(CRN.faculty_id, CRN.id, literal('faculty'), now)
+        ))
+        conn.execute(update(Project).where(Project.crn_id.is_(None)).values(crn_id=(
+            select(CRN.id).join(User, User.crn == CRN.crn_code)
+            .where(User.id == Project.creator_id).limit(1).scalar_subquery()
+        )))
+
+def init_db():
+    """Create missing tables and bring existing ones up to date; safe to re-run."""
     db.create_all()
+    upgrade_schema()
+    migrate_enrollments()
+
+@api.cli.command('init-db')
+def init_db_command():
+    """Create the database schema and apply upgrades (run after deploying)."""
+    init_db()
+    print(f"Database schema up to date: {db.engine.url}")
+
+def create_app(config=None):
+    """Build the application; config (a dict) overrides default_config().
+
+    Nothing here touches the database, so importing the module and starting
+    a worker is cheap: connections are opened on the first query and the
+    schema is only created by `flask --app app init-db` (or init_db()).
+    Tests can pass {'SQLALCHEMY_DATABASE_URI': 'sqlite://'} for a private
+    in-memory database and call init_db() inside app.app_context().
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(default_config())
+    app.config.update(config or {})
+
+    db.init_app(app)
+    with app.app_context():
+        init_shards(app, db.engine, prepare_shard, request_shard)
+    CORS(app, supports_credentials=True)
+    init_responses(app)
+    init_rate_limits(app)
+    init_response_cache(app)
+    if app.config['SERVE_FRONTEND']:
+        init_frontend(app, app.config['FRONTEND_BUILD_DIR'])
+    login_manager.init_app(app)
+    job_runner.init_app(app)
+    app.register_blueprint(api)
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,113 @@
+"""
+Frontend assets - fingerprinted, precompressed static files served by Flask.
+
+build_assets() copies frontend/ into a build directory, renaming app.js and
+styles.css to content-hashed names (app.3f2a9c1d04be.js), pointing
+index.html at them and writing .gz and .br variants of every file next to
+the original. Because a hashed name never changes content, those files are
+served with a one-year immutable Cache-Control; only index.html is
+revalidated (ETag + no-cache), so a deploy is picked up on the next load.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from flask import abort, request, send_file
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+FINGERPRINTED = ('app.js', 'styles.css')
+ASSET_PREFIX = '/assets/'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+MIMETYPES = {
+    '.html': 'text/html',
+    '.js': 'application/javascript',
+    '.css': 'text/css',
+}
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    # mtime=0 keeps .gz output byte-identical between builds of the same file
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build_assets(source_dir, build_dir):
+    """Write the fingerprinted, precompressed frontend to build_dir; return the manifest."""
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    manifest = {}
+    for name in FINGERPRINTED:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            data = f.read()
+        manifest[name] = fingerprint(name, data)
+        _write(os.path.join(build_dir, manifest[name]), data)
+
+    with open(os.path.join(source_dir, 'index.html'), encoding='utf-8') as f:
+        html = f.read()
+    for name, hashed in manifest.items():
+        html = re.sub(rf'((?:src|href)=")(?:\./)?{re.escape(name)}"', rf'\g<1>{ASSET_PREFIX}{hashed}"', html)
+    _write(os.path.join(build_dir, 'index.html'), html.encode('utf-8'))
+
+    with open(os.path.join(build_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _send_precompressed(path, cache_control):
+    """Send path, or its .br/.gz sibling when the client accepts that encoding."""
+    mimetype = MIMETYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
+    encodings = [e for e in ('br', 'gzip') if os.path.exists(path + ('.br' if e == 'br' else '.gz'))]
+    encoding = request.accept_encodings.best_match(encodings) if encodings else None
+
+    if encoding:
+        response = send_file(path + ('.br' if encoding == 'br' else '.gz'), mimetype=mimetype,
+                             conditional=True, etag=True)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def init_frontend(app, build_dir):
+    """Serve a build_assets() output: index.html at / and hashed files under /assets/."""
+
+    def index():
+        path = os.path.join(build_dir, 'index.html')
+        if not os.path.exists(path):
+            return {'error': 'Frontend not built; run "flask --app app build-frontend"'}, 404
+        return _send_precompressed(path, 'no-cache')
+
+    def asset(filename):
+        path = os.path.join(build_dir, filename)
+        # Only the fingerprinted files; index.html and the manifest are not immutable
+        if '/' in filename or os.path.splitext(filename)[1] not in ('.js', '.css') or not os.path.isfile(path):
+            abort(404)
+        return _send_precompressed(path, IMMUTABLE)
+
+    app.add_url_rule('/', 'frontend_index', index)
+    app.add_url_rule(f'{ASSET_PREFIX}<path:filename>', 'frontend_asset', asset)
@@ -0,0 +1,94 @@
+"""
+Group commit - share one transaction (and one fsync) among concurrent writes.
+
+Request threads submit small units of work; a single writer thread collects
+whatever arrives within a short window (or until the batch is full), runs it
+all in one transaction and wakes every submitter once the commit returned.
+submit() therefore still returns only after the write is durable, but a busy
+SQLite database pays for one journal sync per batch instead of per row.
+"""
+
+import queue
+import threading
+import time
+
+
+class _Pending:
+    __slots__ = ('work', 'done', 'result', 'error')
+
+    def __init__(self, work):
+        self.work = work
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GroupCommitWriter:
+    """Batch work(connection) callables from many threads into shared transactions.
+
+    engine is a SQLAlchemy engine. A batch is closed after window seconds
+    or max_batch items, whichever comes first. If a batch fails, its items
+    are retried one transaction each so a single bad write cannot fail the
+    others.
+    """
+
+    def __init__(self, engine, window=0.005, max_batch=256):
+        self.engine = engine
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        # Started lazily so forking servers get a writer in each worker
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self._thread.start()
+
+    def submit(self, work, timeout=30):
+        """Run work(connection) in the next batch and return its result once committed."""
+        self._ensure_started()
+        pending = _Pending(work)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError('Group commit did not finish in time')
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                with self.engine.begin() as connection:
+                    results = [pending.work(connection) for pending in batch]
+            except Exception:
+                self._run_singly(batch)
+            else:
+                for pending, result in zip(batch, results):
+                    pending.result = result
+                    pending.done.set()
+
+    def _run_singly(self, batch):
+        for pending in batch:
+            try:
+                with self.engine.begin() as connection:
+                    pending.result = pending.work(connection)
+            except Exception as e:
+                pending.error = e
+            pending.done.set()
@@ -0,0 +1,70 @@
+"""
+Minimal iCalendar (RFC 5545) writer for the deadline feed.
+
+Only what the feed needs: VEVENTs with a summary, description and a single
+due date-time, emitted line by line so the calendar can be streamed.
+"""
+
+from datetime import datetime
+
+PRODID = '-//CopiumCoders//Capstone Project Management System//EN'
+UID_DOMAIN = 'capstone-pms'
+
+
+def escape_text(value):
+    # Any line break (CRLF, LF or a lone CR) becomes an escaped \n; a raw CR would end the content line
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\n').replace('\r', '\n').replace('\n', '\\n')
+
+
+def fold(line):
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def calendar_header(name):
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield fold(f'PRODID:{PRODID}')
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield fold(f'X-WR-CALNAME:{escape_text(name)}')
+
+
+def calendar_footer():
+    yield 'END:VCALENDAR\r\n'
+
+
+def event(uid, summary, due, description=None, stamp=None):
+    """Return one VEVENT block for a deadline at due (a naive datetime)."""
+    stamp = stamp or datetime.utcnow()
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{UID_DOMAIN}',
+        f'DTSTAMP:{format_datetime(stamp)}Z',
+        # No DTEND: a DTSTART-only date-time event is an instant (RFC 5545
+        # 3.6.1), while a DTEND equal to DTSTART is invalid
+        f'DTSTART:{format_datetime(due)}',
+        f'SUMMARY:{escape_text(summary)}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{escape_text(description)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
@@ -0,0 +1,159 @@
+"""
+Background jobs - a small durable queue stored in the application database.
+
+Jobs are rows of a table (the Job model in app.py); a pool of worker threads
+claims them one at a time with a single UPDATE ... RETURNING, so two workers
+never run the same job. A claimed job is hidden until its visibility timeout
+passes: if the process dies mid-job, another worker picks it up again after
+that. Failures are retried with exponential backoff up to max_attempts;
+a handler can register an on_failure hook to undo its side effects once the
+job has failed for good.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+
+
+class _Workers:
+    """Worker threads of one application."""
+
+    def __init__(self):
+        self.threads = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+
+
+class JobRunner:
+    """Worker thread pool for jobs stored in model (a Flask-SQLAlchemy model).
+
+    Handlers are registered per job kind with @runner.handler('kind'); they
+    receive the job payload dict inside an app context and return a
+    JSON-serializable result. Like other extensions the runner is bound with
+    init_app(); every application gets its own workers, sized by its
+    JOB_WORKERS and JOB_VISIBILITY_TIMEOUT settings.
+    """
+
+    def __init__(self, db, model, app=None, poll_interval=2.0, retry_delay=5.0):
+        self.db = db
+        self.model = model
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.handlers = {}
+        self.failure_handlers = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOB_WORKERS', 2)
+        app.config.setdefault('JOB_VISIBILITY_TIMEOUT', 300)
+        app.extensions['job_runner'] = _Workers()
+
+    def handler(self, kind, on_failure=None):
+        """Register the handler of a job kind.
+
+        on_failure(payload, error) is called, in an app context, when a job
+        of this kind runs out of attempts.
+        """
+        def register(func):
+            self.handlers[kind] = func
+            if on_failure is not None:
+                self.failure_handlers[kind] = on_failure
+            return func
+        return register
+
+    def enqueue(self, kind, payload, created_by=None, max_attempts=3):
+        """Store a job and commit it; workers are started if needed."""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler for job kind '{kind}'")
+        job = self.model(kind=kind, payload=json.dumps(payload), created_by=created_by, max_attempts=max_attempts)
+        self.db.session.add(job)
+        self.db.session.commit()
+        self.start()
+        current_app.extensions['job_runner'].wake.set()
+        return job
+
+    def start(self):
+        # Started lazily so forking servers get their own workers after the fork
+        app = current_app._get_current_object()
+        workers = app.extensions['job_runner']
+        with workers.lock:
+            workers.threads = [t for t in workers.threads if t.is_alive()]
+            for n in range(len(workers.threads), app.config['JOB_WORKERS']):
+                thread = threading.Thread(target=self._run, args=(app,), name=f'job-worker-{n}', daemon=True)
+                thread.start()
+                workers.threads.append(thread)
+
+    def join(self):
+        for thread in current_app.extensions['job_runner'].threads:
+            thread.join()
+
+    # -- worker side -------------------------------------------------------
+
+    def _claim(self, visibility_timeout):
+        Job = self.model
+        now = datetime.utcnow()
+        visible = (Job.status.in_(('queued', 'running')), Job.run_after <= now)
+        next_id = select(Job.id).where(*visible).order_by(Job.id).limit(1).scalar_subquery()
+
+        with self.db.engine.begin() as conn:
+            return conn.execute(update(Job).where(Job.id == next_id, *visible).values(
+                status='running',
+                attempts=Job.attempts + 1,
+                run_after=now + timedelta(seconds=visibility_timeout)
+            ).returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)).first()
+
+    def _finish(self, job_id, **values):
+        with self.db.engine.begin() as conn:
+            conn.execute(update(self.model).where(self.model.id == job_id).values(**values))
+
+    def _fail(self, app, job, error):
+        self._finish(job.id, status='failed', error=error, finished_at=datetime.utcnow())
+        on_failure = self.failure_handlers.get(job.kind)
+        if on_failure is None:
+            return
+        try:
+            on_failure(json.loads(job.payload), error)
+        except Exception:
+            self.db.session.rollback()
+            app.logger.exception('Failure hook of job %s (%s) failed', job.id, job.kind)
+
+    def _execute(self, app, job):
+        if job.attempts > job.max_attempts:
+            # A worker died while running it on the last attempt
+            self._fail(app, job, 'Visibility timeout expired')
+            return
+
+        try:
+            result = self.handlers[job.kind](json.loads(job.payload))
+        except Exception as e:
+            self.db.session.rollback()
+            app.logger.exception('Job %s (%s) failed', job.id, job.kind)
+            if job.attempts >= job.max_attempts:
+                self._fail(app, job, str(e))
+            else:
+                delay = self.retry_delay * 2 ** (job.attempts - 1)
+                self._finish(job.id, status='queued', error=str(e),
+                             run_after=datetime.utcnow() + timedelta(seconds=delay))
+            return
+
+        self._finish(job.id, status='done', result=json.dumps(result), error=None, finished_at=datetime.utcnow())
+
+    def _run(self, app):
+        workers = app.extensions['job_runner']
+        while True:
+            with app.app_context():
+                try:
+                    job = self._claim(app.config['JOB_VISIBILITY_TIMEOUT'])
+                    if job is not None:
+                        self._execute(app, job)
+                except Exception:
+                    app.logger.exception('Job worker error')
+                    job = None
+
+            if job is None:
+                workers.wake.wait(self.poll_interval)
+                workers.wake.clear()
@@ -0,0 +1,170 @@
+"""
+Rate limiting - token buckets for hot write and auth endpoints.
+
+Each (endpoint, user or client IP) pair owns a bucket that refills at a
+steady rate up to its burst size; a request takes one token or is rejected
+with 429 and a Retry-After header. Auth routes can also be limited per
+submitted username, so one account cannot be guessed at from many
+addresses. Limits for all routes live in one dict
+(app.config['RATE_LIMITS']), one Limit or a tuple of them per endpoint. Bucket state is kept by a backend: in memory
+for a single process, or in a small SQLite file that every worker process
+on the host shares.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from flask_login import current_user
+
+
+class Limit:
+    """requests per period seconds, allowing bursts of up to burst requests.
+
+    key is 'client' (the signed-in user, else the client IP) or 'username'
+    (the username field of the JSON body; requests without one are not
+    counted against this limit).
+    """
+
+    def __init__(self, requests, period, burst=None, methods=('POST',), key='client'):
+        self.rate = requests / period
+        self.burst = burst or requests
+        self.methods = frozenset(methods)
+        self.key = key
+
+
+def _refill(tokens, updated, now, limit):
+    return min(limit.burst, tokens + (now - updated) * limit.rate)
+
+
+def _take(tokens, limit):
+    """Return (allowed, tokens left, seconds until a token is available)."""
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / limit.rate
+
+
+class MemoryBackend:
+    """Buckets in a dict bounded as an LRU; enough for one worker process."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, now=None):
+        now = now or time.time()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.burst, now))
+            allowed, tokens, retry_after = _take(_refill(tokens, updated, now, limit), limit)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                # Least recently used buckets have long refilled anyway
+                self._buckets.popitem(last=False)
+            return allowed, retry_after
+
+
+class SQLiteBackend:
+    """Buckets in a separate SQLite file shared by all worker processes on a host.
+
+    Each take() is one short IMMEDIATE transaction; the file uses WAL and
+    relaxed syncing because losing a few bucket updates in a crash is harmless.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, limit, now=None):
+        now = now or time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM bucket WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(*row, now, limit) if row else limit.burst
+            allowed, tokens, retry_after = _take(tokens, limit)
+            conn.execute('INSERT OR REPLACE INTO bucket (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                # Buckets idle for an hour are full again; dropping them changes nothing
+                conn.execute('DELETE FROM bucket WHERE updated < ?', (now - 3600,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+def bucket_key(endpoint, limit):
+    """Signed-in users are limited per account, everyone else per client IP.
+
+    Returns None when a username limit has no username to count.
+    """
+    if limit.key == 'username':
+        username = (request.get_json(silent=True) or {}).get('username')
+        if not isinstance(username, str) or not username.strip():
+            return None
+        return f"{endpoint}:username:{username.strip().lower()}"
+    if current_user.is_authenticated:
+        return f"{endpoint}:user:{current_user.get_id()}"
+    return f"{endpoint}:ip:{request.remote_addr}"
+
+
+def check_rate_limit():
+    """before_request hook: 429 with Retry-After once one of a route's buckets is empty."""
+    limits = current_app.config['RATE_LIMITS'].get(request.endpoint)
+    if limits is None or not current_app.config['RATE_LIMIT_ENABLED']:
+        return None
+    if isinstance(limits, Limit):
+        limits = (limits,)
+
+    backend = current_app.extensions['rate_limit']
+    retry_after = 0.0
+    for limit in limits:
+        key = bucket_key(request.endpoint, limit) if request.method in limit.methods else None
+        if key is not None:
+            allowed, wait = backend.take(key, limit)
+            if not allowed:
+                retry_after = max(retry_after, wait)
+    if not retry_after:
+        return None
+
+    response = jsonify({'error': 'Too many requests, please slow down'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_rate_limits(app):
+    """Install the limiter; RATE_LIMIT_BACKEND is 'memory' or 'sqlite'."""
+    app.config.setdefault('RATE_LIMITS', {})
+    app.config.setdefault('RATE_LIMIT_ENABLED', True)
+    app.config.setdefault('RATE_LIMIT_BACKEND', 'memory')
+
+    if app.config['RATE_LIMIT_BACKEND'] == 'sqlite':
+        path = app.config.get('RATE_LIMIT_DB') or os.path.join(app.instance_path, 'ratelimit.db')
+        app.extensions['rate_limit'] = SQLiteBackend(path)
+    else:
+        app.extensions['rate_limit'] = MemoryBackend()
+    app.before_request(check_rate_limit)
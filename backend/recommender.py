@@ -0,0 +1,257 @@
+"""
+Skill matching - TF-IDF vectors for students and projects in one class.
+
+Students are described by their skills and interests, projects by their name
+and description. Both share one vocabulary, so cosine similarity between a
+student and a project measures how well the student's profile covers the
+project. Documents are tokenized once when added; the weighted matrices are
+rebuilt in full, with vectorized NumPy operations, on the first query after
+something changed.
+"""
+
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+# Common words that carry no skill information
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have in into is it its of on or our
+    that the their this to using we will with you your via etc
+""".split())
+
+
+def tokenize(text):
+    """Split free text into lowercase terms, keeping tokens such as c++, c# and node.js."""
+    terms = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        token = token.rstrip('.')
+        if token and token not in STOP_WORDS:
+            terms.append(token)
+    return terms
+
+
+class _DocumentSet:
+    """Tokenized documents of one kind (students or projects) stored as term-id arrays."""
+
+    def __init__(self):
+        self.ids = []            # external id per row
+        self.rows = {}           # external id -> row
+        self.terms = []          # per row: np.ndarray of term ids
+        self.counts = []         # per row: np.ndarray of raw term counts
+        self.extra = []          # per row: caller data returned with matches
+
+    def __len__(self):
+        return len(self.ids)
+
+    def put(self, doc_id, term_ids, counts, extra):
+        row = self.rows.get(doc_id)
+        if row is None:
+            self.rows[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self.terms.append(term_ids)
+            self.counts.append(counts)
+            self.extra.append(extra)
+        else:
+            self.terms[row] = term_ids
+            self.counts[row] = counts
+            self.extra[row] = extra
+
+    def pop(self, doc_id):
+        """Remove a document by moving the last row into its slot; return its terms."""
+        row = self.rows.pop(doc_id)
+        old_terms = self.terms[row]
+        last = len(self.ids) - 1
+        if row != last:
+            for column in (self.ids, self.terms, self.counts, self.extra):
+                column[row] = column[last]
+            self.rows[self.ids[row]] = row
+        for column in (self.ids, self.terms, self.counts, self.extra):
+            column.pop()
+        return old_terms
+
+    def weighted_csr(self, idf):
+        """Return (indptr, indices, data) of L2-normalized sublinear TF-IDF rows."""
+        lengths = np.fromiter((len(t) for t in self.terms), dtype=np.int64, count=len(self.terms))
+        indptr = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        if indptr[-1] == 0:
+            return indptr, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        indices = np.concatenate(self.terms)
+        counts = np.concatenate(self.counts)
+        data = (1.0 + np.log(counts)) * idf[indices]
+
+        row_of = np.repeat(np.arange(len(self.terms)), lengths)
+        norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(self.terms)))
+        norms[norms == 0] = 1.0
+        data = (data / norms[row_of]).astype(np.float32)
+        return indptr, indices, data
+
+
+class SkillIndex:
+    """TF-IDF index of one class's students and projects.
+
+    put_student/put_project/remove_* are cheap: they retokenize a single
+    document and adjust document frequencies, releasing the vocabulary slot
+    of a term no document uses any more. Any change alters the IDF of every
+    term, so the next query rebuilds the weighted matrices of the whole
+    class; that rebuild is linear in the number of stored terms.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.vocabulary = {}
+        self.document_frequency = []
+        self._term_of = []       # term id -> term, None for a free slot
+        self._free_ids = []      # term ids released by _forget, reused first
+        self.students = _DocumentSet()
+        self.projects = _DocumentSet()
+        self._dirty = True
+        self._student_csr = None
+        self._project_dense = None
+
+    # -- maintenance -------------------------------------------------------
+
+    def _vectorize(self, text):
+        counter = Counter(tokenize(text))
+        term_ids = []
+        for term in counter:
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                if self._free_ids:
+                    term_id = self._free_ids.pop()
+                    self._term_of[term_id] = term
+                else:
+                    term_id = len(self.document_frequency)
+                    self.document_frequency.append(0)
+                    self._term_of.append(term)
+                self.vocabulary[term] = term_id
+            term_ids.append(term_id)
+        return (np.array(term_ids, dtype=np.int64),
+                np.array(list(counter.values()), dtype=np.float64))
+
+    def _put(self, documents, doc_id, text, extra):
+        with self.lock:
+            if doc_id in documents.rows:
+                self._forget(documents.pop(doc_id))
+            term_ids, counts = self._vectorize(text)
+            for term_id in term_ids:
+                self.document_frequency[term_id] += 1
+            documents.put(doc_id, term_ids, counts, extra)
+            self._dirty = True
+
+    def _remove(self, documents, doc_id):
+        with self.lock:
+            if doc_id in documents.rows:
+                self._forget(documents.pop(doc_id))
+                self._dirty = True
+
+    def _forget(self, term_ids):
+        for term_id in term_ids:
+            self.document_frequency[term_id] -= 1
+            if self.document_frequency[term_id] == 0:
+                del self.vocabulary[self._term_of[term_id]]
+                self._term_of[term_id] = None
+                self._free_ids.append(term_id)
+
+    def put_student(self, student_id, skills, interests, extra=None):
+        self._put(self.students, student_id, f"{skills or ''}, {interests or ''}", extra)
+
+    def put_project(self, project_id, name, description, extra=None):
+        self._put(self.projects, project_id, f"{name or ''}. {description or ''}", extra)
+
+    def remove_student(self, student_id):
+        self._remove(self.students, student_id)
+
+    def remove_project(self, project_id):
+        self._remove(self.projects, project_id)
+
+    def _refresh(self):
+        if not self._dirty:
+            return
+        documents = len(self.students) + len(self.projects)
+        df = np.array(self.document_frequency, dtype=np.float64)
+        idf = np.log((1.0 + documents) / (1.0 + df)) + 1.0
+
+        self._student_csr = self.students.weighted_csr(idf)
+
+        indptr, indices, data = self.projects.weighted_csr(idf)
+        dense = np.zeros((len(self.projects), len(idf)), dtype=np.float32)
+        rows = np.repeat(np.arange(len(self.projects)), np.diff(indptr))
+        dense[rows, indices] = data
+        self._project_dense = dense
+        self._dirty = False
+
+    # -- queries -----------------------------------------------------------
+
+    def _student_vector(self, row):
+        indptr, indices, data = self._student_csr
+        start, end = indptr[row], indptr[row + 1]
+        return indices[start:end], data[start:end]
+
+    @staticmethod
+    def _top(scores, documents, k, exclude=()):
+        for doc_id in exclude:
+            row = documents.rows.get(doc_id)
+            if row is not None:
+                scores[row] = -1.0
+        ids, extra = documents.ids, documents.extra
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(ids[i], float(scores[i]), extra[i]) for i in top if scores[i] > 0]
+
+    def projects_for_student(self, student_id, k=5, exclude=()):
+        """Top-k (project_id, score, extra) for a student, best first."""
+        with self.lock:
+            self._refresh()
+            row = self.students.rows.get(student_id)
+            if row is None or not len(self.projects):
+                return []
+            indices, weights = self._student_vector(row)
+            scores = self._project_dense[:, indices] @ weights
+            return self._top(scores, self.projects, k, exclude)
+
+    def students_for_project(self, project_id, k=10, exclude=()):
+        """Top-k (student_id, score, extra) for a project, best first."""
+        with self.lock:
+            self._refresh()
+            row = self.projects.rows.get(project_id)
+            if row is None or not len(self.students):
+                return []
+            indptr, indices, data = self._student_csr
+            project = self._project_dense[row]
+            row_of = np.repeat(np.arange(len(self.students)), np.diff(indptr))
+            scores = np.bincount(row_of, weights=data * project[indices], minlength=len(self.students))
+            return self._top(scores, self.students, k, exclude)
+
+    def similarity_matrix(self, block_size=2048):
+        """Dense students x projects cosine similarities, computed in student blocks.
+
+        Returns (student_ids, project_ids, matrix).
+        """
+        with self.lock:
+            self._refresh()
+            indptr, indices, data = self._student_csr
+            n_students, n_projects = len(self.students), len(self.projects)
+            vocabulary_size = self._project_dense.shape[1]
+            projects_t = self._project_dense.T
+            matrix = np.zeros((n_students, n_projects), dtype=np.float32)
+
+            for start in range(0, n_students, block_size):
+                end = min(start + block_size, n_students)
+                block = np.zeros((end - start, vocabulary_size), dtype=np.float32)
+                lo, hi = indptr[start], indptr[end]
+                rows = np.repeat(np.arange(end - start), np.diff(indptr[start:end + 1]))
+                block[rows, indices[lo:hi]] = data[lo:hi]
+                matrix[start:end] = block @ projects_t
+
+            return list(self.students.ids), list(self.projects.ids), matrix
+
@@ -0,0 +1,138 @@
+"""
+Due-date reminders - a heap of upcoming deadlines fed by indexed range scans.
+
+ReminderScheduler never scans whole tables. It keeps a min-heap of deadlines
+ordered by reminder time and refills it a slice at a time from a due_date
+range (load_due), plus whatever changed since the last tick (load_changed,
+an updated_at range). Each tick pops everything that is due, drops entries
+that went stale, and hands one batch per user to a sink.
+
+The data access is passed in as callables, so this module knows nothing
+about the models; see app.py for the Task/Milestone wiring and the outbox
+table sink.
+"""
+
+import heapq
+import json
+import os
+import threading
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+# kind is e.g. 'task' or 'milestone'; due is the deadline the reminder was scheduled for
+Deadline = namedtuple('Deadline', 'kind id due')
+
+
+class FileSink:
+    """Append one JSON line per user batch to a local file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, window_end, batches):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for user_id, items in batches.items():
+                f.write(json.dumps({'user_id': user_id, 'window_end': window_end.isoformat(),
+                                    'items': items}, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ReminderScheduler:
+    """Emit reminders lead before each deadline, batched per user per tick.
+
+    load_due(after, until) yields Deadlines with after < due <= until.
+    load_changed(since) returns (deadlines changed after since, new since).
+    resolve(deadlines) returns (user_id, item) pairs for deadlines that are
+    still current, i.e. not completed and not moved.
+    sent_until is the end of the last emitted window; reminders due up to
+    then are not emitted again.
+    """
+
+    def __init__(self, load_due, load_changed, resolve, sink, lead=timedelta(hours=24),
+                 slice_length=timedelta(hours=1), sent_until=None, changed_since=None, on_emitted=None):
+        self.load_due = load_due
+        self.load_changed = load_changed
+        self.resolve = resolve
+        self.sink = sink
+        self.lead = lead
+        self.slice_length = slice_length
+        self.on_emitted = on_emitted
+
+        now = datetime.utcnow()
+        self.sent_until = sent_until or now
+        self.changed_since = changed_since or now
+        # Deadlines with due <= loaded_until are in the heap or were reminded
+        # before a restart; a first start reminds about everything still ahead
+        self.loaded_until = sent_until + lead if sent_until else now
+        self._heap = []
+        self._scheduled = {}    # (kind, id) -> due currently in the heap
+        self._reminded = {}     # (kind, id) -> due already reminded about
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def _push(self, deadline):
+        key = (deadline.kind, deadline.id)
+        if deadline.due in (self._scheduled.get(key), self._reminded.get(key)):
+            return
+        self._scheduled[key] = deadline.due
+        heapq.heappush(self._heap, (deadline.due - self.lead, deadline.kind, deadline.id, deadline.due))
+
+    def _refill(self, now):
+        horizon = now + self.lead + self.slice_length
+        if self.loaded_until < horizon:
+            for deadline in self.load_due(self.loaded_until, horizon):
+                self._push(deadline)
+            self.loaded_until = horizon
+
+        # New or edited rows: only those inside the loaded range matter, the
+        # rest are picked up by a later due_date slice
+        changed, self.changed_since = self.load_changed(self.changed_since)
+        for deadline in changed:
+            if deadline.due is not None and now < deadline.due <= self.loaded_until:
+                self._push(deadline)
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, kind, deadline_id, deadline_due = heapq.heappop(self._heap)
+            # Skip entries superseded by a newer due date for the same row
+            if self._scheduled.get((kind, deadline_id)) == deadline_due:
+                del self._scheduled[(kind, deadline_id)]
+                self._reminded[(kind, deadline_id)] = deadline_due
+                due.append(Deadline(kind, deadline_id, deadline_due))
+
+        # Forget reminders whose deadline has passed; their rows can no longer come back
+        for key in [key for key, deadline_due in self._reminded.items() if deadline_due <= now]:
+            del self._reminded[key]
+        return due
+
+    def tick(self, now=None):
+        """Run one scheduling step; return the number of reminders emitted."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._refill(now)
+            deadlines = self._pop_due(now)
+
+            batches = defaultdict(list)
+            for user_id, item in self.resolve(deadlines) if deadlines else ():
+                batches[user_id].append(item)
+
+            if batches:
+                self.sink.emit(now, dict(batches))
+            self.sent_until = now
+            if self.on_emitted is not None:
+                self.on_emitted(now, self.changed_since)
+            return sum(len(items) for items in batches.values())
+
+    def run(self, interval=60.0, stop=None):
+        """Tick every interval seconds until stop (a threading.Event) is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.tick()
+            stop.wait(interval)
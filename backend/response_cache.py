@@ -0,0 +1,194 @@
+"""
+Response cache - class-wide GET responses cached per CRN, invalidated by version.
+
+Lists such as a class's projects or students are the same for every member
+of a CRN, so their JSON is computed once and reused. Entries are keyed by
+(endpoint, CRN, version, query string). Each CRN has a version number that
+write endpoints bump after they commit; bumping makes every older entry of
+that class unreachable, and unreachable entries age out of the LRU.
+
+Versions and entries live in a backend: in memory for a single process, or
+in a small SQLite file shared by every worker process on the host, so a
+write handled by one worker invalidates the cache for all of them.
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+from flask_login import current_user
+
+
+class MemoryBackend:
+    """Entries in an LRU bounded by total body size; enough for one worker process."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._size = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, crn_code):
+        return self._versions.get(crn_code, 0)
+
+    def bump(self, crn_code):
+        with self._lock:
+            self._versions[crn_code] = self._versions.get(crn_code, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (body, mimetype)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class SQLiteBackend:
+    """Versions and entries in a separate SQLite file shared by all worker processes.
+
+    Hits refresh an entry's last-used time at most once a minute, so reads
+    rarely write; every PRUNE_EVERY stores, the least recently used entries
+    beyond max_bytes are deleted.
+    """
+
+    PRUNE_EVERY = 100
+    TOUCH_AFTER = 60
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stores = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS crn_version (crn_code TEXT PRIMARY KEY, version INTEGER)')
+            conn.execute('CREATE TABLE IF NOT EXISTS entry (key TEXT PRIMARY KEY, body BLOB, mimetype TEXT, '
+                         'size INTEGER, used REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_entry_used ON entry (used)')
+            self._local.conn = conn
+        return conn
+
+    def version(self, crn_code):
+        row = self._connection().execute(
+            'SELECT version FROM crn_version WHERE crn_code = ?', (crn_code,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, crn_code):
+        self._connection().execute(
+            'INSERT INTO crn_version (crn_code, version) VALUES (?, 1) '
+            'ON CONFLICT (crn_code) DO UPDATE SET version = version + 1', (crn_code,)
+        )
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT body, mimetype, used FROM entry WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[2] > self.TOUCH_AFTER:
+            conn.execute('UPDATE entry SET used = ? WHERE key = ?', (now, key))
+        return row[0], row[1]
+
+    def set(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO entry (key, body, mimetype, size, used) VALUES (?, ?, ?, ?, ?)',
+                     (key, body, mimetype, len(body), time.time()))
+        self._stores += 1
+        if self._stores % self.PRUNE_EVERY == 0:
+            self._prune(conn)
+
+    def _prune(self, conn):
+        # Keep the most recently used entries whose sizes add up to max_bytes
+        conn.execute('''
+            DELETE FROM entry WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS running FROM entry
+                ) WHERE running > ?
+            )''', (self.max_bytes,))
+
+
+def cache_key(endpoint, crn_code, version):
+    params = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    return f'{endpoint}|{crn_code}|{version}|{params}'
+
+
+def crn_cached(view):
+    """Serve a GET view's 200 responses from the cache of the caller's CRN.
+
+    Only for views whose output depends on nothing but the CRN and the
+    query string; streamed responses (?stream=) are never cached.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        backend = current_app.extensions.get('response_cache')
+        crn_code = current_user.crn if current_user.is_authenticated else None
+        if backend is None or request.method != 'GET' or not crn_code or 'stream' in request.args:
+            return view(*args, **kwargs)
+
+        key = cache_key(request.endpoint, crn_code, backend.version(crn_code))
+        entry = backend.get(key)
+        if entry is not None:
+            body, mimetype = entry
+            return current_app.response_class(body, mimetype=mimetype, headers={'X-Cache': 'HIT'})
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            backend.set(key, response.get_data(), response.mimetype)
+            response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+def invalidate_crn(*crn_codes):
+    """Bump the version of each CRN so its cached responses are recomputed."""
+    backend = current_app.extensions.get('response_cache')
+    if backend is None:
+        return
+    for crn_code in set(crn_codes):
+        if crn_code:
+            backend.bump(crn_code)
+
+
+def init_response_cache(app):
+    """Install the cache; RESPONSE_CACHE_BACKEND is 'memory' or 'sqlite'."""
+    app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+    app.config.setdefault('RESPONSE_CACHE_BACKEND', 'memory')
+    app.config.setdefault('RESPONSE_CACHE_MAX_MB', 32)
+
+    if not app.config['RESPONSE_CACHE_ENABLED']:
+        return
+    max_bytes = int(app.config['RESPONSE_CACHE_MAX_MB'] * 1024 * 1024)
+    if app.config['RESPONSE_CACHE_BACKEND'] == 'sqlite':
+        path = app.config.get('RESPONSE_CACHE_DB') or os.path.join(app.instance_path, 'response_cache.db')
+        app.extensions['response_cache'] = SQLiteBackend(path, max_bytes)
+    else:
+        app.extensions['response_cache'] = MemoryBackend(max_bytes)
@@ -0,0 +1,189 @@
+"""
+Response layer - fast JSON serialization and negotiated compression.
+
+orjson and brotli are optional: without them the app falls back to the
+standard library json module and gzip-only compression.
+"""
+
+import gzip
+import json
+import zlib
+
+from flask import current_app, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/html',
+    'text/css',
+    'text/csv',
+    'text/plain',
+    'text/calendar',
+    'application/javascript',
+    'text/javascript',
+}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used for jsonify() and request.json."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for stdlib-specific options get the stdlib encoder
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj) + b"\n", mimetype=self.mimetype)
+
+    def _encode(self, obj):
+        option = orjson.OPT_NON_STR_KEYS
+        # Keep Flask's sort_keys default so bodies (and ETags over them) are unchanged by the switch
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+
+def dumps_bytes(obj):
+    """Serialize obj to compact JSON bytes with the fastest available encoder, keys sorted like jsonify()."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, separators=(',', ':'), sort_keys=True,
+                      default=DefaultJSONProvider.default).encode('utf-8')
+
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, app_config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app_config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(data, compresslevel=app_config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: gzip/brotli encode buffered responses above the size threshold."""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if not encoding:
+        return response
+
+    response.set_data(compress(data, encoding, current_app.config))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+STREAM_FORMATS = ('json', 'ndjson')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_format():
+    """Return the ?stream= mode requested by the client ('json', 'ndjson'), or None."""
+    mode = request.args.get('stream', '').lower()
+    if mode in ('1', 'true'):
+        return 'json'
+    return mode if mode in STREAM_FORMATS else None
+
+
+def _json_chunks(rows, serialize, mode):
+    """Encode rows one at a time, yielding output in ~STREAM_CHUNK_SIZE pieces."""
+    buffer = bytearray(b'[' if mode == 'json' else b'')
+    separator = b',' if mode == 'json' else b''
+    terminator = b'' if mode == 'json' else b'\n'
+    first = True
+
+    for row in rows:
+        if not first:
+            buffer += separator
+        buffer += dumps_bytes(serialize(row)) + terminator
+        first = False
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if mode == 'json':
+        buffer += b']'
+    if buffer:
+        yield bytes(buffer)
+
+
+def compress_chunks(chunks, encoding, app_config):
+    """Incrementally gzip/brotli encode a chunk generator."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=app_config['COMPRESS_BR_LEVEL'])
+        for chunk in chunks:
+            out = compressor.process(chunk) + compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+
+    # wbits=31 writes a gzip header/trailer
+    compressor = zlib.compressobj(app_config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_rows(rows, serialize, mode='json'):
+    """Stream an iterable of rows as a JSON array or NDJSON without building the list.
+
+    rows is typically a query using yield_per(), so only one batch of ORM
+    objects is alive at a time. The request context stays active while the
+    body is generated, so serializers may use lazy loads and current_user.
+    """
+    chunks = _json_chunks(rows, serialize, mode)
+
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding:
+        chunks = compress_chunks(chunks, encoding, current_app.config)
+        headers['Content-Encoding'] = encoding
+
+    mimetype = 'application/json' if mode == 'json' else 'application/x-ndjson'
+    return current_app.response_class(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
+def init_responses(app):
+    """Install the fast JSON provider and the compression hook on app."""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BR_LEVEL', 5)
+
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    app.after_request(compress_response)
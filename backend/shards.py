@@ -0,0 +1,154 @@
+"""
+Sharded storage - one SQLite file per class, chosen per request by CRN.
+
+With SHARD_BY_CRN=1 the tables holding a class's work (projects, teams,
+messages, tasks, ...) live in a file of their own under SHARD_DIR, while
+users, the CRN catalog, enrollments and jobs stay in the main database. A
+busy class then only takes the write lock of its own file.
+
+Every shard connection ATTACHes the main database. SQLite looks an
+unqualified table name up in the shard first and then in attached files,
+so the application's SQL runs unchanged: class tables resolve to the shard,
+users and CRNs to the main database, and one transaction covers both.
+ShardedSession.get_bind() sends every statement to the selected shard.
+A request is routed by the route callback given to init_shards() (the
+application's picks the class of the project or task named in the URL),
+falling back to the caller's current CRN; jobs and routes working on
+another class pick it with set_shard() or use_shard().
+"""
+
+import contextlib
+import hashlib
+import os
+import re
+import threading
+
+from flask import current_app, g, has_app_context
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+from sqlalchemy.pool import NullPool
+
+# Schema name of the attached main database inside a shard connection
+MAIN_SCHEMA = 'main_db'
+
+
+def shard_filename(crn_code):
+    """File name of a class's shard; codes that are not filename-safe get a hash suffix."""
+    if re.fullmatch(r'[A-Za-z0-9_-]+', crn_code):
+        return f'crn-{crn_code}.db'
+    slug = re.sub(r'[^A-Za-z0-9_-]', '_', crn_code)
+    return f"crn-{slug}-{hashlib.sha1(crn_code.encode()).hexdigest()[:8]}.db"
+
+
+class ShardRouter:
+    """Engines for the per-class shard files, created on first use.
+
+    prepare(engine) is called once per shard and process with a plain
+    engine on the shard file (nothing attached) and must create or upgrade
+    the class tables idempotently.
+    """
+
+    def __init__(self, directory, main_path, prepare):
+        self.directory = directory
+        self.main_path = main_path
+        self.prepare = prepare
+        self._engines = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, crn_code):
+        return os.path.join(self.directory, shard_filename(crn_code))
+
+    def exists(self, crn_code):
+        return os.path.exists(self.path(crn_code))
+
+    def engine(self, crn_code):
+        with self._lock:
+            engine = self._engines.get(crn_code)
+            if engine is None:
+                url = URL.create('sqlite', database=self.path(crn_code))
+                plain = create_engine(url, poolclass=NullPool)
+                try:
+                    self.prepare(plain)
+                finally:
+                    plain.dispose()
+                engine = self._engines[crn_code] = create_engine(url)
+                event.listen(engine, 'connect', self._attach_main)
+            return engine
+
+    def _attach_main(self, dbapi_connection, connection_record):
+        dbapi_connection.execute(f'ATTACH DATABASE ? AS {MAIN_SCHEMA}', (self.main_path,))
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+
+class ShardedSession(Session):
+    """Flask-SQLAlchemy session that runs every statement on the selected shard, if any."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            crn_code = current_shard()
+            if crn_code:
+                return current_app.extensions['shards'].engine(crn_code)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def current_shard():
+    """CRN code whose shard statements go to, or None for the main database."""
+    if not has_app_context() or 'shards' not in current_app.extensions:
+        return None
+    return g.get('crn_shard')
+
+
+def set_shard(crn_code):
+    """Route the rest of this app context (request, job or command) to crn_code's shard."""
+    g.crn_shard = crn_code
+
+
+@contextlib.contextmanager
+def use_shard(crn_code):
+    """Route statements to crn_code's shard inside the block.
+
+    ORM objects of one shard must not be mixed with another's in the same
+    session: primary keys are only unique within a shard.
+    """
+    previous = g.get('crn_shard')
+    g.crn_shard = crn_code
+    try:
+        yield
+    finally:
+        g.crn_shard = previous
+
+
+def init_shards(app, main_engine, prepare, route=None):
+    """Enable SHARD_BY_CRN: each request is routed to the shard route() returns.
+
+    route runs before every request with the main database selected and
+    returns a CRN code or None; without it requests go to the caller's
+    current class.
+    """
+    app.config.setdefault('SHARD_BY_CRN', False)
+    app.config.setdefault('SHARD_DIR', None)
+
+    if not app.config['SHARD_BY_CRN']:
+        return
+    main_path = main_engine.url.database
+    if not main_path or main_path == ':memory:':
+        raise RuntimeError('SHARD_BY_CRN needs a file-backed main database to attach')
+    directory = app.config['SHARD_DIR'] or os.path.join(app.instance_path, 'shards')
+    app.extensions['shards'] = ShardRouter(directory, main_path, prepare)
+
+    @app.before_request
+    def select_shard():
+        set_shard(route() if route else caller_shard())
+
+
+def caller_shard():
+    """The shard of the logged-in user's current class, or None."""
+    return current_user.crn if current_user.is_authenticated else None
@@ -0,0 +1,118 @@
+"""
+Team formation - capacitated assignment of students to projects.
+
+solve_assignment() maximizes the total benefit of a many-to-one assignment
+(every student to exactly one project, at most capacity[j] students per
+project). It is a min-cost flow solved with successive shortest paths on
+the project side: every project is a single node with capacity[j] places,
+so a shortest augmenting path is found with a Dijkstra over projects only,
+and dual potentials on projects keep all reduced costs non-negative. Students
+whose best project still has a free place are assigned in one vectorized
+pass first; only the contested rest need a path search.
+"""
+
+import numpy as np
+
+
+class InsufficientCapacity(ValueError):
+    pass
+
+
+def preference_benefit(rank, max_rank):
+    """Benefit of a student's rank-th choice (1 = first) on a 0-1 scale."""
+    return (max_rank - rank + 1) / max_rank
+
+
+def _shortest_path(student, cost, potential, load, capacity, members):
+    """Dijkstra from one unassigned student to the closest project with a free place.
+
+    Returns (sink project, predecessor student per project, scanned projects
+    with their distances, distance to the sink).
+    """
+    m = cost.shape[1]
+    row = cost[student] - potential
+    distance = row - row.min()
+    predecessor = np.full(m, student, dtype=np.int64)
+    done = np.zeros(m, dtype=bool)
+    scanned, scanned_distance = [], []
+
+    while True:
+        j = int(np.argmin(distance))
+        d = distance[j]
+        if load[j] < capacity[j]:
+            return j, predecessor, scanned, scanned_distance, d
+
+        scanned.append(j)
+        scanned_distance.append(d)
+        distance[j] = np.inf
+        done[j] = True
+
+        # Moving a member i of project j elsewhere costs its reduced cost there;
+        # (i, j) is tight, so that is cost[i] - potential - (cost[i, j] - potential[j]).
+        held = np.fromiter(members[j], dtype=np.int64, count=len(members[j]))
+        moved = cost[held] - potential - (cost[held, j] - potential[j])[:, None] + d
+        best = np.argmin(moved, axis=0)
+        candidate = moved[best, np.arange(m)]
+        better = (candidate < distance) & ~done
+        distance[better] = candidate[better]
+        predecessor[better] = held[best[better]]
+
+
+def solve_assignment(benefit, capacity):
+    """Assign every row (student) of benefit to a column (project).
+
+    benefit is an (n_students, n_projects) array where higher is better;
+    capacity gives the free places per project. Returns an int array with the
+    chosen project index for each student.
+    """
+    benefit = np.asarray(benefit, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.int64).clip(min=0)
+    n, m = benefit.shape
+
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if m == 0 or capacity.sum() < n:
+        raise InsufficientCapacity(f"{n} students but only {int(capacity.sum())} open places")
+
+    # Minimize cost; projects without free places can never be chosen
+    cost = np.where(capacity > 0, -benefit, np.inf)
+    potential = np.zeros(m)
+    load = np.zeros(m, dtype=np.int64)
+    assignment = np.full(n, -1, dtype=np.int64)
+
+    # Everyone whose favourite still has room is a zero-length augmenting path
+    favourite = np.argmin(cost, axis=1)
+    order = np.argsort(favourite, kind='stable')
+    ranked = favourite[order]
+    starts = np.searchsorted(ranked, np.arange(m))
+    position = np.arange(n) - starts[ranked]
+    accepted = order[position < capacity[ranked]]
+    assignment[accepted] = favourite[accepted]
+    load += np.bincount(favourite[accepted], minlength=m)
+
+    members = [set() for _ in range(m)]
+    for student, project in zip(accepted.tolist(), favourite[accepted].tolist()):
+        members[project].add(student)
+
+    for student in np.flatnonzero(assignment < 0).tolist():
+        sink, predecessor, scanned, scanned_distance, d = _shortest_path(
+            student, cost, potential, load, capacity, members)
+
+        # Projects passed on the way become more expensive to enter, which
+        # makes the path tight and keeps every reduced cost non-negative
+        if scanned:
+            potential[scanned] -= d - np.array(scanned_distance)
+
+        project = sink
+        while True:
+            mover = int(predecessor[project])
+            previous = int(assignment[mover])
+            assignment[mover] = project
+            members[project].add(mover)
+            if mover == student:
+                break
+            members[previous].discard(mover)
+            project = previous
+        load[sink] += 1
+
+    return assignment
@@ -0,0 +1,100 @@
+"""
+Benchmark - deleting a large project: ORM cascade vs set-based statements
+
+Builds one project with many members, messages, tasks and milestones in a
+file-backed SQLite database and deletes it twice: once with
+db.session.delete(), whose delete-orphan cascades load every dependent row
+and delete them one by one, and once with delete_projects(), which issues
+one DELETE ... WHERE project_id IN (...) per table.
+
+Usage: python benchmarks/bench_cascade_delete.py [--messages N] [--tasks N] [--members N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import insert
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app as appmod  # noqa: E402
+
+
+def build_project(args):
+    db = appmod.db
+    faculty = appmod.User(username=f'prof{time.time_ns()}', email=f'{time.time_ns()}@x.edu', password_hash='x',
+                          first_name='P', last_name='F', role='faculty', crn='111')
+    db.session.add(faculty)
+    db.session.flush()
+    project = appmod.Project(name='Big', description='d', capacity=args.members, course='C', creator_id=faculty.id)
+    db.session.add(project)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    db.session.execute(insert(appmod.TeamMember), [
+        {'project_id': project.id, 'student_id': faculty.id, 'joined_at': now} for _ in range(args.members)
+    ])
+    db.session.execute(insert(appmod.Message), [
+        {'project_id': project.id, 'sender_id': faculty.id, 'content': f'message {i} ' * 8,
+         'message_type': 'group', 'created_at': now} for i in range(args.messages)
+    ])
+    db.session.execute(insert(appmod.Task), [
+        {'project_id': project.id, 'title': f'task {i}', 'status': 'pending', 'created_at': now,
+         'updated_at': now, 'version': 1} for i in range(args.tasks)
+    ])
+    db.session.execute(insert(appmod.Milestone), [
+        {'project_id': project.id, 'title': f'milestone {i}', 'due_date': now, 'created_at': now,
+         'updated_at': now} for i in range(args.tasks // 10)
+    ])
+    db.session.commit()
+    return project.id
+
+
+def measure(delete):
+    tracemalloc.start()
+    start = time.perf_counter()
+    delete()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--members', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = appmod.create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                                 'RESPONSE_CACHE_ENABLED': False})
+        with app.app_context():
+            appmod.init_db()
+            db = appmod.db
+
+            def orm_cascade():
+                db.session.delete(db.session.get(appmod.Project, project_id))
+                db.session.commit()
+
+            def set_based():
+                appmod.delete_projects([project_id])
+                db.session.commit()
+
+            print(f"\nproject with {args.messages} messages, {args.tasks} tasks, {args.members} members")
+            print(f"  {'mode':<12} {'ms':>10} {'peak MB':>9}")
+            for label, delete in (('orm cascade', orm_cascade), ('set-based', set_based)):
+                project_id = build_project(args)
+                db.session.expunge_all()
+                elapsed, peak = measure(delete)
+                print(f"  {label:<12} {elapsed:>10.1f} {peak:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
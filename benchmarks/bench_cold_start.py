@@ -0,0 +1,66 @@
+"""
+Benchmark - worker cold start with the application factory
+
+Each run is a fresh Python process, like a newly spawned server worker or a
+test session. It times importing backend/app.py, create_app(), and the
+first request that queries the database (a failed login). "lazy" is the
+default startup; "eager" also runs init_db() in the worker, which is what
+every import used to do before the schema moved to `flask --app app init-db`.
+
+Usage: python benchmarks/bench_cold_start.py [--runs N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import app as appmod
+imported = time.perf_counter()
+app = appmod.create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1], 'RATE_LIMIT_ENABLED': False})
+if sys.argv[2] == 'eager':
+    with app.app_context():
+        appmod.init_db()
+created = time.perf_counter()
+response = app.test_client().post('/api/login', json={'username': 'nobody', 'password': 'x'})
+assert response.status_code == 401, response.status_code
+served = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                  'first_request': served - created, 'total': served - start}))
+'''
+
+
+def run_child(uri, mode):
+    output = subprocess.run([sys.executable, '-c', CHILD, uri, mode], cwd=BACKEND,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'cold_start.db')}"
+        run_child(uri, 'eager')  # create the schema once, and warm the OS file cache
+
+        print(f"\nmedian of {args.runs} fresh processes (ms)")
+        print(f"  {'mode':<8} {'import':>8} {'create_app':>11} {'1st request':>12} {'total':>8}")
+        for mode in ('lazy', 'eager'):
+            runs = [run_child(uri, mode) for _ in range(args.runs)]
+            median = {key: statistics.median(r[key] for r in runs) * 1000 for key in runs[0]}
+            print(f"  {mode:<8} {median['import']:>8.1f} {median['create_app']:>11.1f} "
+                  f"{median['first_request']:>12.1f} {median['total']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
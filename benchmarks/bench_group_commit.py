@@ -0,0 +1,111 @@
+"""
+Benchmark - chat insert throughput with and without group commit
+
+Many threads insert messages into a file-backed SQLite database, like
+concurrent POST /api/projects/<id>/messages requests. "per-insert" commits
+every message on its own (the default path); "group" hands every insert to
+a GroupCommitWriter, which shares one transaction among the messages that
+arrive within the batching window. Both only return after the commit.
+
+Usage: python benchmarks/bench_group_commit.py [--threads N] [--messages N] [--window-ms MS]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, create_engine, insert
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from group_commit import GroupCommitWriter  # noqa: E402
+
+metadata = MetaData()
+message = Table(
+    'message', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('project_id', Integer, nullable=False),
+    Column('sender_id', Integer, nullable=False),
+    Column('content', Text, nullable=False),
+    Column('message_type', String(20)),
+    Column('created_at', DateTime),
+)
+
+
+def make_engine(directory, name, threads):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, name)}",
+                           connect_args={'timeout': 60}, pool_size=threads, max_overflow=0)
+    metadata.create_all(engine)
+    return engine
+
+
+def row(thread, i):
+    return {
+        'project_id': thread % 20 + 1,
+        'sender_id': thread + 1,
+        'content': f"Message {i} from thread {thread}: pushed the fix, please review",
+        'message_type': 'group',
+        'created_at': datetime.utcnow(),
+    }
+
+
+def run(threads, messages, send):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(thread):
+        own = []
+        for i in range(messages):
+            start = time.perf_counter()
+            send(row(thread, i))
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return (threads * messages / elapsed,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--messages', type=int, default=100, help='messages per thread')
+    parser.add_argument('--window-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(directory, 'per_insert.db', args.threads)
+
+        def per_insert(values):
+            with engine.begin() as connection:
+                connection.execute(insert(message).values(**values))
+
+        grouped_engine = make_engine(directory, 'group.db', args.threads)
+        writer = GroupCommitWriter(grouped_engine, window=args.window_ms / 1000)
+
+        def grouped(values):
+            writer.submit(lambda connection: connection.execute(insert(message).values(**values)))
+
+        print(f"\n{args.threads} threads x {args.messages} messages, window {args.window_ms} ms")
+        print(f"  {'mode':<12} {'msg/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, send in (('per-insert', per_insert), ('group', grouped)):
+            rate, p50, p99 = run(args.threads, args.messages, send)
+            print(f"  {label:<12} {rate:>10.0f} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark - skill-matching index build and top-k query latency
+
+Fills a SkillIndex with synthetic students and projects for one large class
+and times the first (cold) matrix build, top-k queries in both directions,
+an incremental profile update, and the full students x projects matrix.
+
+Usage: python benchmarks/bench_recommender.py [--students N] [--projects N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from recommender import SkillIndex  # noqa: E402
+
+SKILLS = """python java javascript typescript react angular vue node.js django flask sql postgresql
+mongodb c++ c# go rust kotlin swift android ios docker kubernetes aws azure gcp linux git
+machine-learning pytorch tensorflow pandas numpy statistics security networking unity
+graphql rest html css figma ux testing ci/cd spark hadoop tableau excel r matlab""".split()
+INTERESTS = """web development data science artificial intelligence cloud computing mobile apps
+games cybersecurity databases devops embedded systems robotics healthcare fintech education
+open source visualization""".split()
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<40} {elapsed:>9.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--projects', type=int, default=500)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    index = SkillIndex()
+    print(f"\n{args.students} students, {args.projects} projects")
+
+    def load():
+        for i in range(args.students):
+            index.put_student(i, ', '.join(rng.sample(SKILLS, 5)), ' '.join(rng.sample(INTERESTS, 3)))
+        for i in range(args.projects):
+            index.put_project(i, f"Project {i}", ' '.join(rng.sample(SKILLS + INTERESTS, 25)))
+
+    timed('tokenize + insert documents', load)
+    timed('cold matrix build + first query', lambda: index.projects_for_student(0, 5))
+    timed('top-5 projects for a student', lambda: index.projects_for_student(rng.randrange(args.students), 5), 200)
+    timed('top-10 students for a project', lambda: index.students_for_project(rng.randrange(args.projects), 10), 200)
+
+    def update_and_query():
+        index.put_student(rng.randrange(args.students), 'rust, go, kubernetes', 'devops')
+        return index.projects_for_student(0, 5)
+
+    timed('profile update + next query', update_and_query, 20)
+    _, _, matrix = timed('full students x projects matrix', index.similarity_matrix)
+    print(f"  matrix shape {matrix.shape}, {matrix.nbytes / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
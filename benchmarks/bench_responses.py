@@ -0,0 +1,96 @@
+"""
+Benchmark - JSON serialization CPU and bytes on the wire for the heaviest routes
+
+Builds payloads shaped like the real responses of
+GET /api/projects/<id>/messages (long chat history) and GET /api/projects
+(CRN-wide project list) and reports encode time and raw/gzip/brotli sizes.
+
+Usage: python benchmarks/bench_responses.py [--messages N] [--projects N]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from responses import brotli, orjson  # noqa: E402
+
+
+def message_history(count):
+    start = datetime(2025, 1, 13, 9, 0)
+    return [{
+        'id': i,
+        'sender': {'id': i % 6 + 1, 'name': f"Student{i % 6} Lastname"},
+        'content': f"Pushed the fix for issue #{i}, can someone review the PR before standup?",
+        'message_type': 'group',
+        'created_at': (start + timedelta(minutes=7 * i)).isoformat()
+    } for i in range(count)]
+
+
+def project_list(count):
+    return [{
+        'id': i,
+        'name': f"Capstone Project {i}",
+        'description': "Build a web application that helps students coordinate team work, "
+                       "track milestones and communicate with faculty advisors. " * 3,
+        'capacity': 4,
+        'course': 'CSC 4351',
+        'status': 'open',
+        'current_members': i % 5,
+        'creator': {'name': 'Thomas Johnson', 'title': 'Professor'},
+        'created_at': datetime(2025, 1, 6, 12, 0).isoformat()
+    } for i in range(count)]
+
+
+def time_encoder(encode, payload, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        data = encode(payload)
+    return (time.perf_counter() - start) / rounds * 1000, data
+
+
+def report(name, payload, rounds):
+    print(f"\n{name} ({len(payload)} rows)")
+    print(f"  {'encoder':<10} {'ms/encode':>10} {'bytes':>10}")
+
+    encoders = [('json', lambda o: json.dumps(o, separators=(',', ':')).encode('utf-8'))]
+    if orjson is not None:
+        encoders.append(('orjson', orjson.dumps))
+    else:
+        print("  (orjson not installed - stdlib only)")
+
+    raw = None
+    for label, encode in encoders:
+        ms, raw = time_encoder(encode, payload, rounds)
+        print(f"  {label:<10} {ms:>10.2f} {len(raw):>10}")
+
+    print(f"  {'encoding':<10} {'ms/compress':>10} {'bytes':>10} {'ratio':>7}")
+    codecs = [('gzip-6', lambda d: gzip.compress(d, compresslevel=6, mtime=0))]
+    if brotli is not None:
+        codecs.append(('br-5', lambda d: brotli.compress(d, quality=5)))
+    else:
+        print("  (brotli not installed - gzip only)")
+
+    for label, codec in codecs:
+        ms, packed = time_encoder(codec, raw, rounds)
+        print(f"  {label:<10} {ms:>10.2f} {len(packed):>10} {len(raw) / len(packed):>6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    report('GET /api/projects/<id>/messages', message_history(args.messages), args.rounds)
+    report('GET /api/projects', project_list(args.projects), args.rounds)
+
+
+if __name__ == '__main__':
+    main()
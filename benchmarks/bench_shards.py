@@ -0,0 +1,98 @@
+"""
+Benchmark - concurrent writes from several classes: one database vs a shard per CRN
+
+Each class gets a writer thread that posts chat messages into one of its
+projects, one commit per message, the way POST /api/projects/<id>/messages
+does. With a single capstone.db every commit takes the same write lock; with
+SHARD_BY_CRN each class commits to its own file.
+
+Usage: python benchmarks/bench_shards.py [--classes N] [--messages N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app as appmod  # noqa: E402
+from shards import set_shard  # noqa: E402
+
+
+def build_classes(count):
+    db = appmod.db
+    faculty = appmod.User(username='prof', email='prof@x.edu', password_hash='x', first_name='P',
+                          last_name='F', role='faculty')
+    db.session.add(faculty)
+    db.session.flush()
+    classes = []
+    for n in range(count):
+        crn = appmod.CRN(crn_code=f'C{n}', course_name=f'Class {n}', faculty_id=faculty.id)
+        db.session.add(crn)
+        db.session.flush()
+        classes.append((crn.crn_code, crn.id))
+    db.session.commit()
+
+    projects = []
+    for crn_code, crn_id in classes:
+        set_shard(crn_code)
+        project = appmod.Project(name='P', description='d', capacity=4, course='C', creator_id=faculty.id,
+                                 crn_id=crn_id)
+        db.session.add(project)
+        db.session.commit()
+        projects.append((crn_code, project.id))
+    set_shard(None)
+    return faculty.id, projects
+
+
+def write_messages(app, crn_code, project_id, sender_id, count):
+    with app.app_context():
+        set_shard(crn_code)
+        for i in range(count):
+            appmod.db.session.add(appmod.Message(project_id=project_id, sender_id=sender_id, content=f'm{i}',
+                                                 message_type='group', created_at=datetime.utcnow()))
+            appmod.db.session.commit()
+
+
+def run(directory, sharded, args):
+    app = appmod.create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        'SHARD_BY_CRN': sharded,
+        'SHARD_DIR': os.path.join(directory, 'shards'),
+        'RESPONSE_CACHE_ENABLED': False,
+    })
+    with app.app_context():
+        appmod.init_db()
+        sender_id, projects = build_classes(args.classes)
+
+    threads = [threading.Thread(target=write_messages, args=(app, crn_code, project_id, sender_id, args.messages))
+               for crn_code, project_id in projects]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--classes', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=300)
+    args = parser.parse_args()
+
+    total = args.classes * args.messages
+    print(f"\n{args.classes} classes x {args.messages} messages, one commit each")
+    print(f"  {'mode':<10} {'s':>8} {'msgs/s':>9}")
+    for label, sharded in (('single db', False), ('sharded', True)):
+        with tempfile.TemporaryDirectory() as directory:
+            elapsed = run(directory, sharded, args)
+        print(f"  {label:<10} {elapsed:>8.2f} {total / elapsed:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,10 @@
 // API Configuration
-const API_URL = 'http://localhost:5001/api';
+// Same origin when the backend serves the frontend (SERVE_FRONTEND=1); only a
+// page opened from disk or from the standalone dev server on :8000 calls the
+// backend on :5001 directly
+const API_URL = window.location.protocol === 'file:' || window.location.port === '8000'
+    ? 'http://localhost:5001/api'
+    : '/api';
 
 // Global State
 let currentUser = null;
@@ -153,6 +158,7 @@ async function handleLogout() {
             credentials: 'include'
         });
         
+        await clearCache();
         currentUser = null;
         localStorage.removeItem('user');
         showPage('login-page');
@@ -252,9 +258,206 @@ function showPage(pageName) {
     document.getElementById(pageName).classList.add('active');
 }
 
+// Local cache
+// Class data is kept in IndexedDB and refreshed from /api/sync, which only
+// sends what changed since the last sync, so returning to a view costs one
+// small request. Views fall back to the regular endpoints without IndexedDB.
+const SYNC_STORES = ['projects', 'team_members', 'tasks', 'milestones', 'messages', 'user_stories'];
+let cacheDB = null;
+let syncInFlight = null;
+
+function cacheName() {
+    return `capstone-sync-${currentUser.id}`;
+}
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function idbTransaction(tx) {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = tx.onabort = () => reject(tx.error);
+    });
+}
+
+async function openCache() {
+    if (!window.indexedDB || !currentUser) {
+        return null;
+    }
+    if (!cacheDB) {
+        const request = indexedDB.open(cacheName(), 1);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            SYNC_STORES.forEach(name => {
+                const store = db.createObjectStore(name, { keyPath: 'id' });
+                if (name !== 'projects') {
+                    store.createIndex('project_id', 'project_id');
+                }
+            });
+            db.createObjectStore('meta');
+        };
+        cacheDB = await idbRequest(request);
+    }
+    return cacheDB;
+}
+
+// Drop every cached row of a project from the given stores
+function deleteProjectRows(tx, stores, projectId) {
+    stores.forEach(name => {
+        const index = tx.objectStore(name).index('project_id');
+        index.openKeyCursor(IDBKeyRange.only(projectId)).onsuccess = (e) => {
+            const cursor = e.target.result;
+            if (cursor) {
+                tx.objectStore(name).delete(cursor.primaryKey);
+                cursor.continue();
+            }
+        };
+    });
+}
+
+async function applyChanges(db, changes) {
+    // Losing one of the caller's memberships hides that project's tasks and messages
+    const removedIds = new Set(changes.deleted.filter(t => t.type === 'team_member').map(t => t.id));
+    const members = removedIds.size > 0 ? await readCache(db, 'team_members') : [];
+    const leftProjects = members
+        .filter(m => removedIds.has(m.id) && m.student_id === currentUser.id)
+        .map(m => m.project_id);
+    
+    // Deletes first, so rows re-sent in this batch (e.g. after rejoining) survive
+    const removal = db.transaction(SYNC_STORES, 'readwrite');
+    if (changes.full) {
+        SYNC_STORES.forEach(name => removal.objectStore(name).clear());
+    }
+    changes.deleted.forEach(t => {
+        const store = `${t.type}s`;
+        if (t.type === 'project') {
+            removal.objectStore('projects').delete(t.id);
+            deleteProjectRows(removal, SYNC_STORES.slice(1), t.id);
+        } else if (SYNC_STORES.includes(store)) {
+            removal.objectStore(store).delete(t.id);
+        }
+    });
+    leftProjects.forEach(projectId => deleteProjectRows(removal, ['tasks', 'messages'], projectId));
+    await idbTransaction(removal);
+    
+    const tx = db.transaction([...SYNC_STORES, 'meta'], 'readwrite');
+    SYNC_STORES.forEach(name => {
+        const store = tx.objectStore(name);
+        changes[name].forEach(row => store.put(row));
+    });
+    tx.objectStore('meta').put({ watermark: changes.watermark, crn_code: changes.crn_code }, 'sync');
+    await idbTransaction(tx);
+}
+
+// Call onEntry with each line of an NDJSON response as it arrives
+async function readNdjson(response, onEntry) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let pending = '';
+    for (;;) {
+        const { done, value } = await reader.read();
+        pending += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = pending.split('\n');
+        pending = lines.pop();
+        lines.filter(line => line).forEach(line => onEntry(JSON.parse(line)));
+        if (done) {
+            return;
+        }
+    }
+}
+
+// A streamed sync as the object applyChanges() takes
+async function readSync(response) {
+    const changes = { deleted: [] };
+    SYNC_STORES.forEach(name => { changes[name] = []; });
+    await readNdjson(response, entry => {
+        if (entry.type === 'sync') {
+            Object.assign(changes, entry.row);
+        } else {
+            changes[entry.type].push(entry.row);
+        }
+    });
+    return changes;
+}
+
+// Bring the cache up to date; concurrent callers share one request
+function syncChanges() {
+    if (!syncInFlight) {
+        syncInFlight = (async () => {
+            const db = await openCache();
+            if (!db) {
+                return null;
+            }
+            const meta = await idbRequest(db.transaction('meta').objectStore('meta').get('sync'));
+            const params = meta
+                ? `&updated_since=${encodeURIComponent(meta.watermark)}&crn_code=${encodeURIComponent(meta.crn_code)}`
+                : '';
+            const response = await fetch(`${API_URL}/sync?stream=ndjson${params}`, {
+                credentials: 'include'
+            });
+            if (!response.ok) {
+                throw new Error(`Sync failed with status ${response.status}`);
+            }
+            await applyChanges(db, await readSync(response));
+            return db;
+        })().finally(() => {
+            syncInFlight = null;
+        });
+    }
+    return syncInFlight;
+}
+
+// Rows of a cached store, optionally only those of one project
+function readCache(db, store, projectId) {
+    const source = db.transaction(store).objectStore(store);
+    const request = projectId === undefined
+        ? source.getAll()
+        : source.index('project_id').getAll(IDBKeyRange.only(projectId));
+    return idbRequest(request);
+}
+
+// Cached rows after a sync, or null when the caller should use the network
+async function cachedRows(store, projectId) {
+    try {
+        const db = await syncChanges();
+        return db ? await readCache(db, store, projectId) : null;
+    } catch (error) {
+        console.error('Error syncing local cache:', error);
+        return null;
+    }
+}
+
+async function clearCache() {
+    if (!window.indexedDB || !currentUser) {
+        return;
+    }
+    if (cacheDB) {
+        cacheDB.close();
+        cacheDB = null;
+    }
+    try {
+        await idbRequest(indexedDB.deleteDatabase(cacheName()));
+    } catch (error) {
+        console.error('Error clearing local cache:', error);
+    }
+}
+
 // Projects
 async function loadProjects(keyword = '') {
     try {
+        // Keyword searches run on the server; the full list comes from the cache
+        const cached = keyword ? null : await cachedRows('projects');
+        if (cached) {
+            projects = cached.sort((a, b) => a.id - b.id);
+            currentPage = 1;
+            displayProjects(projects);
+            return;
+        }
+        
         const url = keyword 
             ? `${API_URL}/projects?keyword=${encodeURIComponent(keyword)}`
             : `${API_URL}/projects`;
@@ -364,16 +567,28 @@ function searchProjects(keyword) {
 
 async function loadMyProjects() {
     try {
-        const response = await fetch(`${API_URL}/projects`, {
-            credentials: 'include'
-        });
-        
-        const allProjects = await response.json();
-        
-        // Filter projects where user is a member
-        const myProjects = allProjects.filter(p => 
-            p.team_members && p.team_members.some(m => m.id === currentUser.id)
-        );
+        let myProjects;
+        const cachedProjects = await cachedRows('projects');
+        const cachedMembers = cachedProjects && await cachedRows('team_members');
+        if (cachedProjects && cachedMembers) {
+            // Filter projects where user is a member
+            const memberOf = new Set(
+                cachedMembers.filter(m => m.student_id === currentUser.id).map(m => m.project_id)
+            );
+            myProjects = cachedProjects.filter(p => memberOf.has(p.id)).sort((a, b) => a.id - b.id);
+        } else {
+            const response = await fetch(`${API_URL}/projects`, {
+                credentials: 'include'
+            });
+            
+            const allProjects = await response.json();
+            
+            // Filter projects where user is a member
+            myProjects = allProjects.filter(p => 
+                p.team_members && p.team_members.some(m => m.id === currentUser.id)
+            );
+        }
+        const unread = await loadUnreadCounts();
         
         document.getElementById('project-count').textContent = myProjects.length;
         
@@ -392,6 +607,7 @@ async function loadMyProjects() {
                         <small>${project.course}</small>
                     </div>
                     <span class="project-status status-${project.status}">${project.status}</span>
+                    ${unread[project.id] ? `<span class="unread-badge">${unread[project.id]}</span>` : ''}
                 </div>
                 <p>${project.description}</p>
             </div>
@@ -401,12 +617,29 @@ async function loadMyProjects() {
     }
 }
 
+// Unread message counts per project id, without loading any messages
+async function loadUnreadCounts() {
+    try {
+        const response = await fetch(`${API_URL}/messages/unread`, {
+            credentials: 'include'
+        });
+        
+        const data = await response.json();
+        return Object.fromEntries(data.projects.map(p => [p.project_id, p.unread]));
+    } catch (error) {
+        console.error('Error loading unread counts:', error);
+        return {};
+    }
+}
+
 // Students
 async function loadStudents(keyword = '') {
     try {
+        // The grid only renders these, so skip interests and other columns server-side
+        const fields = 'fields=id,name,biography,skills';
         const url = keyword 
-            ? `${API_URL}/students?keyword=${encodeURIComponent(keyword)}`
-            : `${API_URL}/students`;
+            ? `${API_URL}/students?keyword=${encodeURIComponent(keyword)}&${fields}`
+            : `${API_URL}/students?${fields}`;
             
         const response = await fetch(url, {
             credentials: 'include'
@@ -689,26 +922,44 @@ async function leaveProject() {
 // Messages
 async function loadMessages(projectId) {
     try {
-        const response = await fetch(`${API_URL}/projects/${projectId}/messages`, {
-            credentials: 'include'
-        });
-        
-        const messages = await response.json();
+        let messages = await cachedRows('messages', projectId);
+        if (messages) {
+            messages.sort((a, b) => a.id - b.id);
+        } else {
+            // Long histories are streamed by the server; the body is still a JSON array
+            const response = await fetch(`${API_URL}/projects/${projectId}/messages?stream=json`, {
+                credentials: 'include'
+            });
+            
+            messages = await response.json();
+        }
         displayMessages(messages);
+        
+        if (messages.length > 0) {
+            markMessagesRead(projectId, messages[messages.length - 1].id);
+        }
     } catch (error) {
         console.error('Error loading messages:', error);
     }
 }
 
-function displayMessages(messages) {
-    const container = document.getElementById('messages-list');
-    
-    if (messages.length === 0) {
-        container.innerHTML = '<div class="empty-state"><h3>No messages yet</h3><p>Start the conversation!</p></div>';
-        return;
+async function markMessagesRead(projectId, messageId) {
+    try {
+        await fetch(`${API_URL}/projects/${projectId}/messages/read`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            credentials: 'include',
+            body: JSON.stringify({ message_id: messageId })
+        });
+    } catch (error) {
+        console.error('Error marking messages read:', error);
     }
-    
-    container.innerHTML = messages.map(msg => `
+}
+
+function renderMessage(msg) {
+    return `
         <div class="message">
             <div class="message-header">
                 <span class="message-sender">${msg.sender.name}</span>
@@ -716,12 +967,54 @@ function displayMessages(messages) {
             </div>
             <div class="message-content">${msg.content}</div>
         </div>
-    `).join('');
+    `;
+}
+
+function displayMessages(messages) {
+    const container = document.getElementById('messages-list');
+    const loadOlder = '<button id="load-older-messages" class="btn btn-sm" onclick="loadOlderMessages()">Load older messages</button>';
+    
+    // Older history may live in the archive even when no recent messages remain
+    olderMessagesBeforeId = messages.length > 0 ? messages[0].id : null;
+    
+    if (messages.length === 0) {
+        container.innerHTML = loadOlder + '<div class="empty-state"><h3>No messages yet</h3><p>Start the conversation!</p></div>';
+        return;
+    }
+    
+    container.innerHTML = loadOlder + messages.map(renderMessage).join('');
     
     // Scroll to bottom
     container.scrollTop = container.scrollHeight;
 }
 
+let olderMessagesBeforeId = null;
+
+async function loadOlderMessages() {
+    try {
+        const params = olderMessagesBeforeId ? `?before_id=${olderMessagesBeforeId}` : '';
+        const response = await fetch(`${API_URL}/projects/${currentProject.id}/messages/archive${params}`, {
+            credentials: 'include'
+        });
+        
+        const page = await response.json();
+        const button = document.getElementById('load-older-messages');
+        
+        if (page.messages.length > 0) {
+            const emptyState = document.querySelector('#messages-list .empty-state');
+            if (emptyState) emptyState.remove();
+            button.insertAdjacentHTML('afterend', page.messages.map(renderMessage).join(''));
+            olderMessagesBeforeId = page.messages[0].id;
+        }
+        
+        if (!page.has_more) {
+            button.remove();
+        }
+    } catch (error) {
+        console.error('Error loading older messages:', error);
+    }
+}
+
 async function sendMessage(e) {
     e.preventDefault();
     
@@ -754,11 +1047,16 @@ async function sendMessage(e) {
 // Tasks
 async function loadTasks(projectId) {
     try {
-        const response = await fetch(`${API_URL}/projects/${projectId}/tasks`, {
-            credentials: 'include'
-        });
-        
-        const tasks = await response.json();
+        let tasks = await cachedRows('tasks', projectId);
+        if (tasks) {
+            tasks.sort((a, b) => a.id - b.id);
+        } else {
+            const response = await fetch(`${API_URL}/projects/${projectId}/tasks`, {
+                credentials: 'include'
+            });
+            
+            tasks = await response.json();
+        }
         displayTasks(tasks);
         
         document.getElementById('task-count').textContent = tasks.filter(t => t.status !== 'completed').length;
@@ -793,11 +1091,16 @@ function displayTasks(tasks) {
 // Milestones
 async function loadMilestones(projectId) {
     try {
-        const response = await fetch(`${API_URL}/projects/${projectId}/milestones`, {
-            credentials: 'include'
-        });
-        
-        const milestones = await response.json();
+        let milestones = await cachedRows('milestones', projectId);
+        if (milestones) {
+            milestones.sort((a, b) => a.due_date.localeCompare(b.due_date));
+        } else {
+            const response = await fetch(`${API_URL}/projects/${projectId}/milestones`, {
+                credentials: 'include'
+            });
+            
+            milestones = await response.json();
+        }
         displayMilestones(milestones);
     } catch (error) {
         console.error('Error loading milestones:', error);
@@ -987,6 +1290,12 @@ async function handleCreateMilestone(e) {
 
 async function loadUserStories() {
     try {
+        const cached = await cachedRows('user_stories');
+        if (cached) {
+            displayUserStories(cached.sort((a, b) => b.created_at.localeCompare(a.created_at)));
+            return;
+        }
+        
         const response = await fetch(`${API_URL}/user-stories`, {
             credentials: 'include'
         });
@@ -6,7 +6,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from backend.app import app, db, User
+from app import Project, User, create_app, db, init_db
 from werkzeug.security import generate_password_hash
 
 # Project data
@@ -89,10 +89,11 @@ projects_data = [
 ]
 
 def seed_database():
+    app = create_app()
     with app.app_context():
         # Clear existing data
         db.drop_all()
-        db.create_all()
+        init_db()
         
         print("Creating test users...")
         
@@ -205,7 +206,6 @@ def seed_database():
         faculty1 = faculty_users[0]
         
         for i, project_data in enumerate(projects_data):
-            from app import Project
             project = Project(
                 name=project_data['name'],
                 description=project_data['description'],
@@ -0,0 +1,50 @@
+"""
+Shared fixtures - every test gets its own application on a private in-memory database.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app as appmod  # noqa: E402
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'SECRET_KEY': 'test',
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+    'RATE_LIMIT_ENABLED': False,
+}
+
+
+def make_app(**config):
+    """A fresh application with its schema created; config overrides TEST_CONFIG."""
+    app = appmod.create_app({**TEST_CONFIG, **config})
+    with app.app_context():
+        appmod.init_db()
+    return app
+
+
+@pytest.fixture
+def app():
+    app = make_app()
+    yield app
+    with app.app_context():
+        appmod.db.engine.dispose()
+
+
+@pytest.fixture
+def signup(app):
+    """signup(username, role='student', **fields) registers a user and returns a logged-in client."""
+    def signup(username, role='student', **fields):
+        client = app.test_client()
+        response = client.post('/api/register', json={
+            'username': username, 'email': f'{username}@example.edu', 'password': 'pw',
+            'first_name': username.title(), 'last_name': 'Test', 'role': role, **fields
+        })
+        assert response.status_code == 201, response.get_json()
+        assert client.post('/api/login', json={'username': username, 'password': 'pw'}).status_code == 200
+        return client
+    return signup
@@ -0,0 +1,55 @@
+import app as appmod
+from conftest import make_app
+
+
+def test_import_creates_no_application():
+    assert not hasattr(appmod, 'app')
+
+
+def test_each_app_has_its_own_in_memory_database(app, signup):
+    signup('alice')
+    other = make_app()
+    with app.app_context():
+        assert appmod.User.query.count() == 1
+    with other.app_context():
+        assert appmod.User.query.count() == 0
+
+
+def test_init_db_can_run_twice(app):
+    with app.app_context():
+        appmod.init_db()
+        assert appmod.db.session.scalar(appmod.select(appmod.func.count()).select_from(appmod.User)) == 0
+
+
+def test_register_login_and_create_project(signup):
+    faculty = signup('prof', role='faculty')
+    assert faculty.post('/api/crns', json={'crn_code': '111', 'course_name': 'Capstone'}).status_code == 201
+    response = faculty.post('/api/projects', json={'name': 'P', 'description': 'd', 'capacity': 3, 'course': 'C'})
+    assert response.status_code == 201
+
+    student = signup('sam', crn='111')
+    projects = student.get('/api/projects').get_json()
+    assert [p['name'] for p in projects] == ['P']
+
+
+def test_config_overrides_defaults():
+    app = make_app(MESSAGE_RETENTION_DAYS=7)
+    assert app.config['MESSAGE_RETENTION_DAYS'] == 7
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == 'sqlite://'
+
+
+def test_upgrade_adds_autoincrement_to_old_message_tables(app):
+    with app.app_context():
+        with appmod.db.engine.begin() as conn:
+            conn.exec_driver_sql('DROP TABLE message')
+            conn.exec_driver_sql('CREATE TABLE message (id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL, '
+                                 'sender_id INTEGER NOT NULL, content TEXT NOT NULL)')
+            conn.exec_driver_sql("INSERT INTO message (id, project_id, sender_id, content) VALUES (7, 1, 1, 'old')")
+        appmod.init_db()
+
+        with appmod.db.engine.connect() as conn:
+            ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'message'").scalar()
+            indexes = {index['name'] for index in appmod.inspect(conn).get_indexes('message')}
+        assert 'AUTOINCREMENT' in ddl
+        assert 'ix_message_recipient' in indexes
+        assert appmod.db.session.get(appmod.Message, 7).content == 'old'
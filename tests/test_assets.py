@@ -0,0 +1,47 @@
+import gzip
+import json
+
+import pytest
+
+from assets import IMMUTABLE, build_assets
+from conftest import make_app
+
+
+@pytest.fixture
+def built(tmp_path):
+    source = tmp_path / 'frontend'
+    source.mkdir()
+    (source / 'app.js').write_text('console.log(1);')
+    (source / 'styles.css').write_text('body { margin: 0; }')
+    (source / 'index.html').write_text('<link href="styles.css"><script src="./app.js"></script>')
+    build = tmp_path / 'dist'
+    return build_assets(str(source), str(build)), source, build
+
+
+def test_build_fingerprints_and_rewrites_index(built):
+    manifest, source, build = built
+    assert manifest['app.js'].startswith('app.') and manifest['app.js'].endswith('.js')
+    html = (build / 'index.html').read_text()
+    assert f'src="/assets/{manifest["app.js"]}"' in html and f'href="/assets/{manifest["styles.css"]}"' in html
+    assert gzip.decompress((build / (manifest['app.js'] + '.gz')).read_bytes()) == b'console.log(1);'
+    assert json.loads((build / 'manifest.json').read_text()) == manifest
+
+    # Unchanged content keeps its name; changed content gets a new one
+    assert build_assets(str(source), str(build)) == manifest
+    (source / 'app.js').write_text('console.log(2);')
+    assert build_assets(str(source), str(build))['app.js'] != manifest['app.js']
+
+
+def test_hashed_files_are_immutable_and_index_revalidates(built):
+    manifest, _, build = built
+    client = make_app(SERVE_FRONTEND=True, FRONTEND_BUILD_DIR=str(build)).test_client()
+
+    asset = client.get(f'/assets/{manifest["app.js"]}', headers={'Accept-Encoding': 'gzip'})
+    assert asset.status_code == 200
+    assert asset.headers['Cache-Control'] == IMMUTABLE
+    assert asset.headers['Content-Encoding'] == 'gzip'
+
+    index = client.get('/')
+    assert index.headers['Cache-Control'] == 'no-cache'
+    assert client.get('/', headers={'If-None-Match': index.headers['ETag']}).status_code == 304
+    assert client.get('/assets/manifest.json').status_code == 404
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import ical
+import pytest
+
+
+@pytest.fixture
+def feed(signup):
+    faculty = signup('prof', role='faculty')
+    faculty.post('/api/crns', json={'crn_code': '111', 'course_name': 'Capstone'})
+    project_id = faculty.post('/api/projects', json={
+        'name': 'Old name', 'description': 'd', 'capacity': 3, 'course': 'C'
+    }).get_json()['project_id']
+    faculty.post(f'/api/projects/{project_id}/milestones', json={
+        'title': 'Demo', 'due_date': '2030-05-01T15:00:00'
+    })
+    student = signup('sam', crn='111')
+    assert student.post(f'/api/projects/{project_id}/join').status_code == 200
+    url = student.get('/api/calendar/feed-token').get_json()['feed_url']
+    return faculty, student, project_id, url.split('localhost', 1)[1]
+
+
+def test_feed_revalidates_with_etag(feed):
+    _, student, _, path = feed
+    first = student.get(path)
+    assert first.status_code == 200
+    assert 'Old name' in first.get_data(as_text=True)
+    assert student.get(path, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+
+def test_renaming_a_project_changes_the_etag(feed):
+    faculty, student, project_id, path = feed
+    etag = student.get(path).headers['ETag']
+    faculty.put(f'/api/projects/{project_id}', json={'name': 'New name'})
+    response = student.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'New name' in response.get_data(as_text=True)
+
+
+def test_editing_a_milestone_changes_the_etag(app, feed):
+    import app as appmod
+    _, student, _, path = feed
+    etag = student.get(path).headers['ETag']
+    with app.app_context():
+        milestone = appmod.Milestone.query.one()
+        milestone.title = 'Final demo'
+        appmod.db.session.commit()
+    assert student.get(path, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_events_have_no_zero_length_dtend():
+    block = ical.event('task-1', 'Due', datetime(2030, 1, 1, 9, 30))
+    assert 'DTSTART:20300101T093000\r\n' in block
+    assert 'DTEND' not in block
+
+
+@pytest.mark.parametrize('text', ['one\r\ntwo', 'one\ntwo', 'one\rtwo'])
+def test_every_line_break_is_escaped(text):
+    assert ical.escape_text(text) == 'one\\ntwo'
+    assert '\r' not in ical.escape_text(text + '\r')
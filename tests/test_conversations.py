@@ -0,0 +1,47 @@
+import pytest
+
+import app as appmod
+from test_enrollment import create_class, create_project
+
+
+@pytest.fixture
+def dms(app, signup):
+    """Three direct messages from a student to the project creator, archived, then one more."""
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    project_id = create_project(faculty, 'Chat')
+    student = signup('sam', crn='111')
+    student.post(f'/api/projects/{project_id}/join')
+    with app.app_context():
+        faculty_id = appmod.User.query.filter_by(username='prof').one().id
+
+    def send(content):
+        response = student.post(f'/api/projects/{project_id}/messages',
+                                json={'content': content, 'recipient_id': faculty_id})
+        assert response.status_code == 201
+
+    for content in ('one', 'two', 'three'):
+        send(content)
+    with app.app_context():
+        assert appmod.archive_crn('111') == 3
+    return faculty, student, project_id, faculty_id, send
+
+
+def test_archived_conversations_stay_in_the_inbox(dms):
+    faculty, student, project_id, faculty_id, _ = dms
+    conversations = faculty.get('/api/conversations').get_json()['conversations']
+    assert [(c['project_id'], c['last_message']['content']) for c in conversations] == [(project_id, 'three')]
+    assert student.get('/api/conversations').get_json()['conversations'][0]['user']['id'] == faculty_id
+
+
+def test_threads_page_from_recent_into_archived_messages(dms):
+    _, student, project_id, faculty_id, send = dms
+    send('four')
+    url = f'/api/projects/{project_id}/conversations/{faculty_id}'
+
+    first = student.get(url, query_string={'limit': 2}).get_json()
+    assert [m['content'] for m in first['messages']] == ['three', 'four']
+    assert first['has_more']
+    second = student.get(url, query_string={'limit': 2, 'before_id': first['next_before_id']}).get_json()
+    assert [m['content'] for m in second['messages']] == ['one', 'two']
+    assert not second['has_more']
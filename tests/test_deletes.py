@@ -0,0 +1,60 @@
+import pytest
+
+import app as appmod
+from test_enrollment import create_class, create_project
+
+
+@pytest.fixture
+def filled_project(app, signup):
+    """A project with a member, preference, messages (one archived), task, milestone and story."""
+    faculty = signup('prof', role='faculty')
+    crn_id = create_class(faculty, '111')
+    project_id = create_project(faculty, 'Doomed')
+    kept = create_project(faculty, 'Kept')
+    student = signup('sam', crn='111')
+    student.post(f'/api/projects/{project_id}/join')
+    student.put('/api/project-preferences', json={'project_ids': [project_id, kept]})
+    student.post(f'/api/projects/{project_id}/messages', json={'content': 'old'})
+    with app.app_context():
+        appmod.archive_crn('111')
+    student.post(f'/api/projects/{project_id}/messages', json={'content': 'new'})
+    faculty.post(f'/api/projects/{project_id}/tasks', json={'title': 'Scope'})
+    faculty.post(f'/api/projects/{project_id}/milestones', json={'title': 'Demo', 'due_date': '2030-01-01'})
+    student.post('/api/user-stories', json={'title': 'T', 'content': 'c', 'project_id': project_id})
+    return faculty, crn_id, project_id, kept
+
+
+def project_rows(project_id):
+    return {model.__tablename__: model.query.filter_by(project_id=project_id).count()
+            for model in appmod.PROJECT_CHILD_MODELS}
+
+
+def test_deleting_a_project_removes_its_rows_and_leaves_a_tombstone(app, filled_project):
+    faculty, _, project_id, kept = filled_project
+    with app.app_context():
+        assert all(project_rows(project_id).values())
+
+    assert faculty.delete(f'/api/projects/{project_id}').status_code == 200
+    with app.app_context():
+        assert not any(project_rows(project_id).values())
+        assert appmod.db.session.get(appmod.Project, project_id) is None
+        # The other project's preference is untouched
+        assert appmod.ProjectPreference.query.filter_by(project_id=kept).count() == 1
+        tombstones = [(t.kind, t.row_id) for t in appmod.Tombstone.query.filter_by(project_id=project_id)]
+        assert ('project', project_id) in tombstones
+
+
+def test_deleting_a_class_removes_every_project(app, filled_project):
+    faculty, crn_id, project_id, kept = filled_project
+    with app.app_context():
+        student_id = appmod.User.query.filter_by(username='sam').one().id
+    student = app.test_client()
+    student.post('/api/login', json={'username': 'sam', 'password': 'pw'})
+    student.post('/api/leave-class', json={'crn_code': '111'})
+
+    assert faculty.delete(f'/api/crns/{crn_id}').status_code == 200
+    with app.app_context():
+        for pid in (project_id, kept):
+            assert not any(project_rows(pid).values())
+        assert appmod.Project.query.count() == 0
+        assert appmod.db.session.get(appmod.User, student_id) is not None
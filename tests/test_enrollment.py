@@ -0,0 +1,81 @@
+import pytest
+
+import app as appmod
+
+
+def create_class(faculty, code):
+    assert faculty.post('/api/crns', json={'crn_code': code, 'course_name': f'Class {code}'}).status_code == 201
+    return next(c['id'] for c in faculty.get('/api/crns').get_json() if c['crn_code'] == code)
+
+
+def create_project(faculty, name, capacity=3):
+    return faculty.post('/api/projects', json={
+        'name': name, 'description': 'd', 'capacity': capacity, 'course': 'C'
+    }).get_json()['project_id']
+
+
+@pytest.fixture
+def two_classes(signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First', capacity=1)
+    student = signup('sam', crn='111')
+    assert student.post(f'/api/projects/{first}/join').status_code == 200
+    assert student.put('/api/project-preferences', json={'project_ids': [first]}).status_code == 200
+
+    create_class(faculty, '222')
+    second = create_project(faculty, 'Second')
+    assert student.post('/api/join-class', json={'crn_code': '222'}).status_code == 200
+    assert student.post(f'/api/projects/{second}/join').status_code == 200
+    return faculty, student, first, second
+
+
+def test_leaving_a_class_leaves_its_teams(app, two_classes):
+    _, student, first, second = two_classes
+    response = student.post('/api/leave-class', json={'crn_code': '111'})
+    assert response.status_code == 200
+    assert response.get_json()['crn_code'] == '222'
+
+    with app.app_context():
+        teams = appmod.db.session.query(appmod.TeamMember.project_id).all()
+        assert [project_id for (project_id,) in teams] == [second]
+        assert appmod.ProjectPreference.query.count() == 0
+        assert appmod.db.session.get(appmod.Project, first).status == 'open'
+
+
+def test_class_left_by_its_last_student_can_be_deleted(app, two_classes):
+    faculty, student, first, _ = two_classes
+    crn_id = next(c['id'] for c in faculty.get('/api/crns').get_json() if c['crn_code'] == '111')
+    assert faculty.delete(f'/api/crns/{crn_id}').status_code == 400
+
+    student.post('/api/leave-class', json={'crn_code': '111'})
+    assert faculty.delete(f'/api/crns/{crn_id}').status_code == 200
+    with app.app_context():
+        assert appmod.db.session.get(appmod.Project, first) is None
+
+
+def test_deleting_the_current_class_falls_back_to_another(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    current = create_class(faculty, '222')
+    assert faculty.get('/api/user/profile').get_json()['crn'] == '222'
+
+    assert faculty.delete(f'/api/crns/{current}').status_code == 200
+    assert faculty.get('/api/user/profile').get_json()['crn'] == '111'
+
+
+def test_reviewing_checks_the_proposer_is_in_the_class(signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    other = signup('other', role='faculty')
+    create_class(other, '222')
+
+    outsider = signup('out', crn='222').post('/api/custom-projects', json={
+        'name': 'X', 'description': 'd', 'course': 'C', 'capacity': 3
+    }).get_json()['proposal_id']
+    insider = signup('in', crn='111').post('/api/custom-projects', json={
+        'name': 'Y', 'description': 'd', 'course': 'C', 'capacity': 3
+    }).get_json()['proposal_id']
+
+    assert faculty.post(f'/api/custom-projects/{outsider}/review', json={'action': 'deny'}).status_code == 403
+    assert faculty.post(f'/api/custom-projects/{insider}/review', json={'action': 'deny'}).status_code == 200
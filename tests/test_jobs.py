@@ -0,0 +1,81 @@
+import pytest
+
+import app as appmod
+from conftest import make_app
+
+
+@pytest.fixture
+def app():
+    # No worker threads: tests run queued jobs themselves with run_queued()
+    app = make_app(JOB_WORKERS=0)
+    yield app
+    with app.app_context():
+        appmod.db.engine.dispose()
+
+
+def run_queued(app):
+    with app.app_context():
+        while (job := appmod.job_runner._claim(60)) is not None:
+            appmod.job_runner._execute(app, job)
+
+
+@pytest.fixture
+def proposal(signup):
+    faculty = signup('prof', role='faculty')
+    faculty.post('/api/crns', json={'crn_code': '111', 'course_name': 'Capstone'})
+    student = signup('sam', crn='111')
+    proposal_id = student.post('/api/custom-projects', json={
+        'name': 'Idea', 'description': 'd', 'course': 'C', 'capacity': 3
+    }).get_json()['proposal_id']
+    return faculty, proposal_id
+
+
+def proposal_state(app, proposal_id):
+    with app.app_context():
+        proposal = appmod.db.session.get(appmod.CustomProject, proposal_id)
+        return proposal.approval_status, proposal.approved_project_id
+
+
+def test_async_approval_is_approving_until_the_job_runs(app, proposal):
+    faculty, proposal_id = proposal
+    response = faculty.post(f'/api/custom-projects/{proposal_id}/review?async=1', json={'action': 'approve'})
+    assert response.status_code == 202
+    assert proposal_state(app, proposal_id) == ('approving', None)
+    assert faculty.post(f'/api/custom-projects/{proposal_id}/review', json={'action': 'deny'}).status_code == 400
+
+    run_queued(app)
+    status, project_id = proposal_state(app, proposal_id)
+    assert status == 'approved' and project_id is not None
+
+
+def test_failed_approval_job_reopens_the_proposal(app, proposal, monkeypatch):
+    faculty, proposal_id = proposal
+
+    def broken(proposal, reviewer):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(appmod, 'approve_proposal', broken)
+    monkeypatch.setattr(appmod.job_runner, 'retry_delay', 0)
+    job_url = faculty.post(f'/api/custom-projects/{proposal_id}/review?async=1',
+                           json={'action': 'approve'}).headers['Location']
+    run_queued(app)
+
+    job = faculty.get(job_url).get_json()
+    assert (job['status'], job['attempts']) == ('failed', 3)
+    assert proposal_state(app, proposal_id) == ('pending', None)
+
+    monkeypatch.undo()
+    response = faculty.post(f'/api/custom-projects/{proposal_id}/review', json={'action': 'approve'})
+    assert response.status_code == 200
+
+
+def test_enqueue_error_reopens_the_proposal(app, proposal, monkeypatch):
+    faculty, proposal_id = proposal
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError('queue unavailable')
+
+    monkeypatch.setattr(appmod.job_runner, 'enqueue', unavailable)
+    with pytest.raises(RuntimeError):
+        faculty.post(f'/api/custom-projects/{proposal_id}/review?async=1', json={'action': 'approve'})
+    assert proposal_state(app, proposal_id) == ('pending', None)
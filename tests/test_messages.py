@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import app as appmod
+from conftest import make_app
+from group_commit import GroupCommitWriter
+from test_enrollment import create_class, create_project
+
+
+@pytest.fixture
+def chat(signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    project_id = create_project(faculty, 'Chat')
+    students = [signup(name, crn='111') for name in ('ann', 'bob')]
+    for student in students:
+        student.post(f'/api/projects/{project_id}/join')
+    return faculty, students, project_id
+
+
+def unread(client, project_id):
+    counts = client.get('/api/messages/unread').get_json()
+    return {p['project_id']: p['unread'] for p in counts['projects']}.get(project_id, 0)
+
+
+def test_unread_counters_follow_messages_and_reads(chat):
+    faculty, (ann, bob), project_id = chat
+    for content in ('one', 'two'):
+        ann.post(f'/api/projects/{project_id}/messages', json={'content': content})
+
+    assert unread(ann, project_id) == 0
+    assert unread(bob, project_id) == 2 and unread(faculty, project_id) == 2
+
+    first_id = bob.get(f'/api/projects/{project_id}/messages').get_json()[0]['id']
+    assert bob.post(f'/api/projects/{project_id}/messages/read', json={'message_id': first_id}).get_json()[
+        'unread_count'] == 1
+    bob.post(f'/api/projects/{project_id}/messages/read')
+    assert unread(bob, project_id) == 0 and unread(faculty, project_id) == 2
+
+
+def test_direct_messages_only_count_for_their_recipient(app, chat):
+    faculty, (ann, bob), project_id = chat
+    with app.app_context():
+        bob_id = appmod.User.query.filter_by(username='bob').one().id
+    ann.post(f'/api/projects/{project_id}/messages', json={'content': 'psst', 'recipient_id': bob_id})
+    assert unread(bob, project_id) == 1
+    assert unread(faculty, project_id) == 0
+
+
+def test_group_committed_messages_are_counted(tmp_path):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'main.db'}", MESSAGE_GROUP_COMMIT=True)
+    clients = {}
+    for name, role in (('prof', 'faculty'), ('ann', 'student')):
+        client = clients[name] = app.test_client()
+        client.post('/api/register', json={'username': name, 'email': f'{name}@example.edu', 'password': 'pw',
+                                           'first_name': name, 'last_name': 'T', 'role': role,
+                                           'crn': '111' if role == 'student' else None})
+        client.post('/api/login', json={'username': name, 'password': 'pw'})
+        if role == 'faculty':
+            create_class(client, '111')
+            project_id = create_project(client, 'Chat')
+    clients['ann'].post(f'/api/projects/{project_id}/join')
+
+    threads = [threading.Thread(target=clients['ann'].post, args=(f'/api/projects/{project_id}/messages',),
+                                kwargs={'json': {'content': str(i)}}) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(clients['prof'].get(f'/api/projects/{project_id}/messages').get_json()) == 5
+    assert unread(clients['prof'], project_id) == 5
+
+
+@pytest.fixture
+def writer(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gc.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)'))
+    yield GroupCommitWriter(engine, window=0.05), engine
+    engine.dispose()
+
+
+def test_group_commit_returns_each_result_after_commit(writer):
+    writer, engine = writer
+    results = [None] * 8
+
+    def add(i):
+        results[i] = writer.submit(
+            lambda conn: conn.execute(text('INSERT INTO item (value) VALUES (:v)'), {'v': i}).lastrowid
+        )
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == list(range(1, 9))
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT count(*) FROM item')).scalar() == 8
+
+
+def test_a_failing_write_does_not_fail_its_batch(writer):
+    writer, engine = writer
+    outcomes = {}
+
+    def run(name, work):
+        try:
+            outcomes[name] = writer.submit(work)
+        except Exception as e:
+            outcomes[name] = type(e).__name__
+
+    good = lambda conn: conn.execute(text('INSERT INTO item (value) VALUES (1)')).rowcount
+    bad = lambda conn: conn.execute(text('INSERT INTO item (value) VALUES (NULL)'))
+    threads = [threading.Thread(target=run, args=(name, work))
+               for name, work in (('a', good), ('bad', bad), ('b', good))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outcomes == {'a': 1, 'bad': 'IntegrityError', 'b': 1}
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT count(*) FROM item')).scalar() == 2
@@ -0,0 +1,74 @@
+import hashlib
+
+import pytest
+from flask_login import login_user
+
+import app as appmod
+
+
+@pytest.fixture
+def team(signup):
+    faculty = signup('prof', role='faculty')
+    faculty.post('/api/crns', json={'crn_code': '111', 'course_name': 'Capstone'})
+    project_id = faculty.post('/api/projects', json={
+        'name': 'P', 'description': 'd', 'capacity': 3, 'course': 'C'
+    }).get_json()['project_id']
+    student = signup('sam', crn='111')
+    student.post(f'/api/projects/{project_id}/join')
+    student.post(f'/api/projects/{project_id}/messages', json={'content': 'hello'})
+    return student, project_id
+
+
+@pytest.mark.parametrize('query', ['', '?stream=json', '?stream=ndjson'])
+def test_unchanged_messages_answer_304(team, query):
+    student, project_id = team
+    url = f'/api/projects/{project_id}/messages{query}'
+    first = student.get(url)
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/')
+
+    again = student.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+
+def test_new_message_changes_the_streamed_etag(team):
+    student, project_id = team
+    url = f'/api/projects/{project_id}/messages?stream=json'
+    etag = student.get(url).headers['ETag']
+    student.post(f'/api/projects/{project_id}/messages', json={'content': 'again'})
+
+    response = student.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [m['content'] for m in response.get_json()] == ['hello', 'again']
+    assert response.headers['ETag'] != etag
+
+
+def test_stream_and_buffered_etags_differ(team):
+    student, project_id = team
+    buffered = student.get(f'/api/projects/{project_id}/messages').headers['ETag']
+    streamed = student.get(f'/api/projects/{project_id}/messages?stream=json').headers['ETag']
+    assert buffered != streamed
+
+
+@pytest.mark.parametrize('resource', ['messages', 'tasks'])
+def test_outsiders_get_403_even_with_the_current_etag(app, team, signup, resource):
+    _, project_id = team
+    outsider = signup('otto', crn='111')
+    url = f'/api/projects/{project_id}/{resource}'
+    with app.test_request_context(url):
+        login_user(appmod.User.query.filter_by(username='otto').one())
+        etag = appmod.project_etag(project_id)
+
+    response = outsider.get(url, headers={'If-None-Match': f'W/"{etag}"'})
+    assert response.status_code == 403
+
+
+def test_etags_are_keyed_with_the_secret_key(app, team):
+    student, project_id = team
+    etag = student.get(f'/api/projects/{project_id}/messages').headers['ETag']
+    with app.app_context():
+        user_id = appmod.User.query.filter_by(username='sam').one().id
+        version = appmod.db.session.get(appmod.Project, project_id).version
+    key = f"api.project_messages|None|{project_id}|{version}|{user_id}|"
+    assert hashlib.sha1(key.encode()).hexdigest() not in etag
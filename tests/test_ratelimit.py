@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import make_app
+from ratelimit import Limit, MemoryBackend
+
+
+@pytest.fixture
+def app():
+    return make_app(RATE_LIMIT_ENABLED=True, RATE_LIMITS={
+        'api.login': (Limit(100, 60), Limit(3, 300, key='username')),
+    })
+
+
+def login(client, username, ip):
+    return client.post('/api/login', json={'username': username, 'password': 'wrong'},
+                       environ_base={'REMOTE_ADDR': ip})
+
+
+def test_bucket_refills_at_its_rate():
+    backend, limit = MemoryBackend(), Limit(2, 10)
+    assert backend.take('k', limit, now=100.0)[0]
+    assert backend.take('k', limit, now=100.0)[0]
+    allowed, retry_after = backend.take('k', limit, now=100.0)
+    assert not allowed and retry_after == pytest.approx(5.0)
+    assert backend.take('k', limit, now=105.0)[0]
+
+
+def test_login_is_limited_per_username_across_ips(app):
+    client = app.test_client()
+    for n in range(3):
+        assert login(client, 'alice', f'10.0.0.{n}').status_code == 401
+    response = login(client, 'alice', '10.0.0.99')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+
+    # Other accounts from the same addresses are unaffected
+    assert login(client, 'bob', '10.0.0.1').status_code == 401
+
+
+def test_username_limit_ignores_case_and_whitespace(app):
+    client = app.test_client()
+    for username in ('Alice', 'alice ', 'ALICE'):
+        login(client, username, '10.0.0.1')
+    assert login(client, 'alice', '10.0.0.2').status_code == 429
+
+
+def test_client_limit_still_applies():
+    app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMITS={'api.login': Limit(2, 60)})
+    client = app.test_client()
+    assert login(client, 'a', '10.0.0.1').status_code == 401
+    assert login(client, 'b', '10.0.0.1').status_code == 401
+    assert login(client, 'c', '10.0.0.1').status_code == 429
+    assert login(client, 'd', '10.0.0.2').status_code == 401
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from recommender import SkillIndex, tokenize
+
+STUDENTS = {1: 'Python, SQL, machine learning', 2: 'JavaScript, React, CSS', 3: 'C++, embedded systems'}
+PROJECTS = {10: 'Data pipeline in Python and SQL', 11: 'React dashboard with CSS', 12: 'Embedded C++ firmware'}
+
+
+def build(students, projects):
+    index = SkillIndex()
+    for student_id, skills in students.items():
+        index.put_student(student_id, skills, '')
+    for project_id, description in projects.items():
+        index.put_project(project_id, '', description)
+    return index
+
+
+def scores(index):
+    student_ids, project_ids, matrix = index.similarity_matrix()
+    return {(s, p): float(matrix[i, j])
+            for i, s in enumerate(student_ids) for j, p in enumerate(project_ids)}
+
+
+def test_tokenize_keeps_language_names():
+    assert tokenize('C++, C# and Node.js.') == ['c++', 'c#', 'node.js']
+
+
+def test_best_match_first():
+    index = build(STUDENTS, PROJECTS)
+    assert index.projects_for_student(1, k=1)[0][0] == 10
+    assert index.students_for_project(11, k=1)[0][0] == 2
+
+
+def test_removals_and_edits_match_a_fresh_index():
+    index = build(STUDENTS, PROJECTS)
+    index.put_student(4, 'Rust, WebAssembly', '')
+    index.put_project(13, '', 'Rust compiler plugin')
+    index.remove_student(4)
+    index.remove_project(13)
+    index.put_student(2, 'Python, Flask', '')
+    index.projects_for_student(1)
+
+    expected = {**STUDENTS, 2: 'Python, Flask'}
+    assert scores(index) == pytest.approx(scores(build(expected, PROJECTS)), abs=1e-6)
+
+
+def test_unused_terms_leave_the_vocabulary():
+    index = build(STUDENTS, PROJECTS)
+    index.put_student(4, 'Haskell', '')
+    assert 'haskell' in index.vocabulary
+    size = len(index.document_frequency)
+
+    index.remove_student(4)
+    assert 'haskell' not in index.vocabulary
+    assert min(index.document_frequency) >= 0
+
+    # The freed slot is reused instead of growing the matrices
+    index.put_student(5, 'Elixir', '')
+    assert len(index.document_frequency) == size
+    assert np.count_nonzero(index.document_frequency) == len(index.vocabulary)
+
+
+def test_recommended_projects_endpoint(signup):
+    faculty = signup('prof', role='faculty')
+    faculty.post('/api/crns', json={'crn_code': '111', 'course_name': 'Capstone'})
+    for name, description in (('Pipeline', 'Python SQL data'), ('Dashboard', 'React CSS frontend')):
+        faculty.post('/api/projects', json={'name': name, 'description': description, 'capacity': 3, 'course': 'C'})
+    student = signup('sam', crn='111', skills='React, CSS')
+
+    response = student.get('/api/recommended-projects')
+    assert response.status_code == 200
+    assert response.get_json()[0]['name'] == 'Dashboard'
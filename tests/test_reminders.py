@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from reminders import Deadline, ReminderScheduler
+
+NOW = datetime(2026, 3, 2, 9, 0)
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    def emit(self, window_end, batches):
+        self.batches.append(batches)
+
+
+class FakeTable:
+    """Deadlines by (kind, id), with the load/resolve callables the scheduler takes."""
+
+    def __init__(self):
+        self.rows = {}
+        self.changed = []
+        self.done = set()
+
+    def put(self, kind, row_id, due):
+        self.rows[(kind, row_id)] = due
+        self.changed.append(Deadline(kind, row_id, due))
+
+    def load_due(self, after, until):
+        return [Deadline(kind, row_id, due) for (kind, row_id), due in self.rows.items() if after < due <= until]
+
+    def load_changed(self, since):
+        changed, self.changed = self.changed, []
+        return changed, since
+
+    def resolve(self, deadlines):
+        # Reminders go to user 1; completed or moved deadlines are dropped
+        return [(1, (d.kind, d.id)) for d in deadlines
+                if (d.kind, d.id) not in self.done and self.rows.get((d.kind, d.id)) == d.due]
+
+
+@pytest.fixture
+def scheduler():
+    table, sink = FakeTable(), ListSink()
+    scheduler = ReminderScheduler(table.load_due, table.load_changed, table.resolve, sink,
+                                  lead=timedelta(hours=24), sent_until=NOW, changed_since=NOW)
+    return scheduler, table, sink
+
+
+def test_reminds_once_when_the_deadline_enters_the_lead(scheduler):
+    scheduler, table, sink = scheduler
+    table.rows[('task', 1)] = NOW + timedelta(hours=25)
+    table.rows[('task', 2)] = NOW + timedelta(hours=30)
+
+    assert scheduler.tick(NOW + timedelta(minutes=30)) == 0
+    assert scheduler.tick(NOW + timedelta(hours=1, minutes=1)) == 1
+    assert scheduler.tick(NOW + timedelta(hours=1, minutes=2)) == 0
+    assert scheduler.tick(NOW + timedelta(hours=6, minutes=1)) == 1
+    assert sink.batches == [{1: [('task', 1)]}, {1: [('task', 2)]}]
+
+
+def test_a_restart_does_not_repeat_reminders(scheduler):
+    scheduler, table, sink = scheduler
+    # Within sent_until + lead: reminded before the restart
+    table.rows[('task', 1)] = NOW + timedelta(hours=2)
+    assert scheduler.tick(NOW + timedelta(hours=1)) == 0
+
+
+def test_moved_deadlines_are_reminded_at_their_new_time(scheduler):
+    scheduler, table, sink = scheduler
+    table.rows[('task', 1)] = NOW + timedelta(hours=25)
+    scheduler.tick(NOW)
+    table.put('task', 1, NOW + timedelta(hours=40))
+
+    assert scheduler.tick(NOW + timedelta(hours=2)) == 0
+    assert scheduler.tick(NOW + timedelta(hours=16, minutes=1)) == 1
+
+
+def test_new_and_completed_deadlines(scheduler):
+    scheduler, table, sink = scheduler
+    table.rows[('milestone', 5)] = NOW + timedelta(hours=24, minutes=30)
+    table.done.add(('milestone', 5))
+    scheduler.tick(NOW)
+    table.put('task', 9, NOW + timedelta(hours=1))
+
+    assert scheduler.tick(NOW + timedelta(minutes=31)) == 1
+    assert sink.batches == [{1: [('task', 9)]}]
+    assert len(scheduler) == 0
@@ -0,0 +1,41 @@
+from test_enrollment import create_class, create_project
+
+
+def test_project_list_is_cached_until_the_class_changes(signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    create_project(faculty, 'First')
+    student = signup('sam', crn='111')
+
+    assert student.get('/api/projects').headers['X-Cache'] == 'MISS'
+    cached = student.get('/api/projects')
+    assert cached.headers['X-Cache'] == 'HIT'
+    assert [p['name'] for p in cached.get_json()] == ['First']
+
+    create_project(faculty, 'Second')
+    fresh = student.get('/api/projects')
+    assert fresh.headers['X-Cache'] == 'MISS'
+    assert sorted(p['name'] for p in fresh.get_json()) == ['First', 'Second']
+
+
+def test_profile_edits_refresh_the_student_list(signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    student = signup('sam', crn='111')
+    faculty.get('/api/students')
+
+    assert student.put('/api/user/profile', json={'skills': 'rust'}).status_code == 200
+    response = faculty.get('/api/students')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [s['skills'] for s in response.get_json()] == ['rust']
+
+
+def test_classes_have_separate_caches(signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    create_project(faculty, 'First')
+    create_class(faculty, '222')
+    create_project(faculty, 'Second')
+
+    assert [p['name'] for p in signup('ann', crn='111').get('/api/projects').get_json()] == ['First']
+    assert [p['name'] for p in signup('bob', crn='222').get('/api/projects').get_json()] == ['Second']
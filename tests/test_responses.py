@@ -0,0 +1,24 @@
+import json
+
+import pytest
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from responses import OrjsonProvider, dumps_bytes, orjson
+
+BODY = {'zeta': 1, 'alpha': {'y': 2, 'b': [3, {'d': 4, 'c': 5}]}}
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson not installed')
+def test_orjson_responses_match_flask_key_order(app):
+    assert isinstance(app.json, OrjsonProvider)
+    with app.app_context():
+        fast = jsonify(BODY).get_data()
+        app.json = DefaultJSONProvider(app)
+        standard = jsonify(BODY).get_data()
+    assert fast == standard
+    assert fast.startswith(b'{"alpha":{"b":')
+
+
+def test_streamed_rows_are_key_sorted():
+    assert dumps_bytes(BODY) == json.dumps(BODY, separators=(',', ':'), sort_keys=True).encode()
@@ -0,0 +1,106 @@
+import pytest
+
+import app as appmod
+from conftest import make_app
+from test_enrollment import create_class, create_project
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A sharded application: SHARD_BY_CRN needs a file-backed main database."""
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'main.db'}",
+                   SHARD_BY_CRN=True, SHARD_DIR=str(tmp_path / 'shards'))
+    yield app
+    with app.app_context():
+        app.extensions['shards'].dispose()
+        appmod.db.engine.dispose()
+
+
+def test_faculty_reach_projects_of_an_earlier_class(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+    create_class(faculty, '222')
+    second = create_project(faculty, 'Second')
+    assert first != second
+
+    assert faculty.get(f'/api/projects/{first}').get_json()['name'] == 'First'
+    response = faculty.post(f'/api/projects/{first}/tasks', json={'title': 'Scope'})
+    assert response.status_code == 201
+    task_id = response.get_json()['task_id']
+    assert faculty.put(f'/api/tasks/{task_id}', json={'status': 'completed'}).status_code == 200
+    assert faculty.post('/api/tasks/bulk', json={
+        'updates': [{'id': task_id, 'title': 'Scope v2'}]
+    }).get_json()['results'][0]['status'] == 'updated'
+
+    with app.app_context():
+        with appmod.use_shard('111'):
+            assert appmod.db.session.get(appmod.Task, task_id).title == 'Scope v2'
+        with appmod.use_shard('222'):
+            assert appmod.db.session.get(appmod.Task, task_id) is None
+
+
+def test_students_keep_their_team_after_joining_another_section(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+    student = signup('sam', crn='111')
+    assert student.post(f'/api/projects/{first}/join').status_code == 200
+    assert student.post(f'/api/projects/{first}/messages', json={'content': 'hi'}).status_code == 201
+
+    create_class(faculty, '222')
+    assert student.post('/api/join-class', json={'crn_code': '222'}).status_code == 200
+    response = student.get(f'/api/projects/{first}/messages')
+    assert response.status_code == 200
+    assert [m['content'] for m in response.get_json()] == ['hi']
+
+
+def test_deleted_class_projects_are_no_longer_routed(app, signup):
+    faculty = signup('prof', role='faculty')
+    crn_id = create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+    create_class(faculty, '222')
+    assert faculty.delete(f'/api/crns/{crn_id}').status_code == 200
+
+    assert faculty.get(f'/api/projects/{first}').status_code == 404
+    with app.app_context():
+        assert appmod.db.session.get(appmod.ProjectShard, first) is None
+    # Ids are never handed out again
+    assert create_project(faculty, 'Third') > first
+
+
+def test_split_copies_each_class_into_its_shard(tmp_path):
+    config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'main.db'}"}
+    plain = make_app(**config)
+    faculty = plain.test_client()
+    faculty.post('/api/register', json={'username': 'prof', 'email': 'p@example.edu', 'password': 'pw',
+                                        'first_name': 'P', 'last_name': 'T', 'role': 'faculty'})
+    faculty.post('/api/login', json={'username': 'prof', 'password': 'pw'})
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+    faculty.post(f'/api/projects/{first}/tasks', json={'title': 'Scope'})
+    create_class(faculty, '222')
+    second = create_project(faculty, 'Second')
+    with plain.app_context():
+        appmod.db.engine.dispose()
+
+    sharded = make_app(**config, SHARD_BY_CRN=True, SHARD_DIR=str(tmp_path / 'shards'))
+    with sharded.app_context():
+        assert appmod.split_into_shards() == {'111': 2, '222': 1}
+        assert appmod.split_into_shards() == {'111': 0, '222': 0}
+        assert {row.id: row.crn_code for row in appmod.ProjectShard.query} == {first: '111', second: '222'}
+
+        appmod.split_into_shards(prune=True)
+        assert appmod.Project.query.count() == 0 and appmod.Task.query.count() == 0
+        with appmod.use_shard('111'):
+            assert [p.name for p in appmod.Project.query] == ['First']
+            assert appmod.Task.query.one().title == 'Scope'
+
+    faculty = sharded.test_client()
+    faculty.post('/api/login', json={'username': 'prof', 'password': 'pw'})
+    assert faculty.get(f'/api/projects/{first}').get_json()['name'] == 'First'
+    assert faculty.get(f'/api/projects/{first}/tasks').get_json()[0]['title'] == 'Scope'
+    assert create_project(faculty, 'Third') > second
+    with sharded.app_context():
+        sharded.extensions['shards'].dispose()
+        appmod.db.engine.dispose()
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime, timedelta
+
+import app as appmod
+from test_enrollment import create_class, create_project
+
+
+def sync(client, previous=None, **params):
+    if previous is not None:
+        params.update(updated_since=previous['watermark'], crn_code=previous['crn_code'])
+    response = client.get('/api/sync', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def backdate(app, model, row_id, minutes=10):
+    """Move a row's updated_at out of the next sync's overlap window."""
+    with app.app_context():
+        appmod.db.session.get(model, row_id).updated_at = datetime.utcnow() - timedelta(minutes=minutes)
+        appmod.db.session.commit()
+
+
+def test_full_snapshot_then_changes_only(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+    faculty.post(f'/api/projects/{first}/tasks', json={'title': 'Scope'})
+
+    snapshot = sync(faculty)
+    assert snapshot['full'] and snapshot['crn_code'] == '111'
+    assert [p['name'] for p in snapshot['projects']] == ['First']
+    assert [t['title'] for t in snapshot['tasks']] == ['Scope']
+
+    backdate(app, appmod.Project, first)
+    second = create_project(faculty, 'Second')
+    delta = sync(faculty, snapshot)
+    assert not delta['full']
+    assert [p['id'] for p in delta['projects']] == [second]
+
+
+def test_watermark_overlaps_writes_just_before_the_sync(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+
+    snapshot = sync(faculty)
+    watermark = datetime.fromisoformat(snapshot['watermark'])
+    assert datetime.utcnow() - watermark >= appmod.SYNC_OVERLAP
+    # Written inside the overlap, so sent again rather than possibly missed
+    assert [p['id'] for p in sync(faculty, snapshot)['projects']] == [first]
+
+
+def test_deletions_arrive_as_tombstones(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+    second = create_project(faculty, 'Second')
+    student = signup('sam', crn='111')
+    student.post(f'/api/projects/{first}/join')
+    story_id = faculty.post('/api/user-stories', json={'title': 'Hi', 'content': 'c'}).get_json()['story_id']
+
+    faculty_snapshot, student_snapshot = sync(faculty), sync(student)
+    member_id = student_snapshot['team_members'][0]['id']
+    assert student.post(f'/api/projects/{first}/leave').status_code == 200
+    assert faculty.delete(f'/api/user-stories/{story_id}').status_code == 200
+    assert faculty.delete(f'/api/projects/{second}').status_code == 200
+
+    deleted = sync(student, student_snapshot)['deleted']
+    assert {'type': 'team_member', 'id': member_id, 'project_id': first} in deleted
+    assert {'type': 'user_story', 'id': story_id, 'project_id': None} in deleted
+    assert {'type': 'project', 'id': second, 'project_id': second} in deleted
+    assert len(sync(faculty, faculty_snapshot)['deleted']) == 3
+
+
+def test_story_tombstones_go_to_the_authors_classes_only(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    create_class(faculty, '222')
+    other = signup('olga', role='faculty')
+    create_class(other, '333')
+    student = signup('sam', crn='111')
+    outsider = signup('otto', crn='333')
+    story_id = faculty.post('/api/user-stories', json={'title': 'Hi', 'content': 'c'}).get_json()['story_id']
+
+    student_snapshot, outsider_snapshot = sync(student), sync(outsider)
+    faculty.delete(f'/api/user-stories/{story_id}')
+
+    assert [t['id'] for t in sync(student, student_snapshot)['deleted']] == [story_id]
+    assert sync(outsider, outsider_snapshot)['deleted'] == []
+    with app.app_context():
+        crn_codes = appmod.db.session.scalars(
+            appmod.select(appmod.CRN.crn_code).join(appmod.Tombstone, appmod.Tombstone.crn_id == appmod.CRN.id)
+        ).all()
+        assert sorted(crn_codes) == ['111', '222']
+
+
+def test_changing_class_resends_everything(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    create_project(faculty, 'First')
+    snapshot = sync(faculty)
+    create_class(faculty, '222')
+    second = create_project(faculty, 'Second')
+
+    changed = sync(faculty, snapshot)
+    assert changed['full'] and changed['crn_code'] == '222'
+    assert [p['id'] for p in changed['projects']] == [second]
+
+
+def test_callers_without_a_class_get_nothing(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_project(faculty, 'Unassigned')
+    student = signup('sam')
+
+    snapshot = sync(student)
+    assert snapshot['full'] and snapshot['crn_code'] is None
+    assert snapshot['projects'] == [] and snapshot['deleted'] == []
+
+
+def test_streamed_sync_matches_the_buffered_one(app, signup):
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    first = create_project(faculty, 'First')
+    for title in ('Scope', 'Build'):
+        faculty.post(f'/api/projects/{first}/tasks', json={'title': title})
+
+    buffered = sync(faculty)
+    response = faculty.get('/api/sync?stream=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    entries = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert entries[0] == {'type': 'sync', 'row': {
+        'full': True, 'crn_code': '111', 'watermark': entries[0]['row']['watermark']
+    }}
+    for name in appmod.SYNC_SERIALIZERS:
+        assert [e['row'] for e in entries if e['type'] == name] == buffered[name]
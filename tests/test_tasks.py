@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import event
+
+import app as appmod
+from test_enrollment import create_class, create_project
+
+
+@pytest.fixture
+def board(app, signup):
+    """A project with two tasks, its creator, a team member and a student outside it."""
+    faculty = signup('prof', role='faculty')
+    create_class(faculty, '111')
+    project_id = create_project(faculty, 'Board')
+    member = signup('sam', crn='111')
+    assert member.post(f'/api/projects/{project_id}/join').status_code == 200
+    outsider = signup('otto', crn='111')
+    task_ids = [faculty.post(f'/api/projects/{project_id}/tasks', json={'title': title}).get_json()['task_id']
+                for title in ('Scope', 'Build')]
+    return faculty, member, outsider, task_ids
+
+
+def user_id(app, username):
+    with app.app_context():
+        return appmod.User.query.filter_by(username=username).one().id
+
+
+def task_titles(app, task_ids):
+    with app.app_context():
+        return [appmod.db.session.get(appmod.Task, task_id).title for task_id in task_ids]
+
+
+def test_only_the_team_and_creator_edit_a_task(app, board):
+    faculty, member, outsider, (task_id, _) = board
+    assert outsider.put(f'/api/tasks/{task_id}', json={'title': 'Mine'}).status_code == 403
+    assert task_titles(app, [task_id]) == ['Scope']
+
+    response = member.put(f'/api/tasks/{task_id}', json={'title': 'Scope v2', 'version': 1})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 2
+    stale = faculty.put(f'/api/tasks/{task_id}', json={'title': 'Late', 'version': 1})
+    assert stale.status_code == 409 and stale.get_json()['version'] == 2
+
+
+@pytest.mark.parametrize('body', [
+    {'due_date': 'next week'},
+    {'title': 5},
+    {'description': ['x']},
+    {'status': 'done'},
+])
+def test_invalid_task_edits_are_rejected(app, board, body):
+    faculty, _, _, (task_id, _) = board
+    assert faculty.put(f'/api/tasks/{task_id}', json=body).status_code == 400
+
+
+def test_tasks_are_assigned_within_the_project(app, board):
+    faculty, _, _, (task_id, _) = board
+    results = faculty.post('/api/tasks/bulk', json={'updates': [
+        {'id': task_id, 'assignee_id': user_id(app, 'otto')},
+        {'id': task_id, 'assignee_id': 9999},
+    ]}).get_json()['results']
+    assert [r['status'] for r in results] == ['invalid', 'invalid']
+
+    response = faculty.put(f'/api/tasks/{task_id}', json={'assignee_id': user_id(app, 'sam')})
+    assert response.status_code == 200
+
+
+def test_bulk_update_reports_each_entry(app, board):
+    faculty, _, outsider, (first, second) = board
+    response = faculty.post('/api/tasks/bulk', json={'updates': [
+        {'id': first, 'version': 1, 'status': 'in_progress'},
+        {'id': second, 'version': 7, 'status': 'completed'},
+        {'id': 9999, 'status': 'completed'},
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['status'] for r in results] == ['updated', 'conflict', 'not_found']
+    assert results[0]['version'] == 2 and results[1]['version'] == 1
+
+    forbidden = outsider.post('/api/tasks/bulk', json={'updates': [{'id': first, 'title': 'Mine'}]})
+    assert forbidden.get_json()['results'][0]['status'] == 'forbidden'
+
+
+def test_atomic_bulk_update_writes_nothing_on_any_failure(app, board):
+    faculty, _, _, (first, second) = board
+    response = faculty.post('/api/tasks/bulk', json={'atomic': True, 'updates': [
+        {'id': first, 'title': 'Renamed'},
+        {'id': second, 'title': ''},
+    ]})
+    assert response.status_code == 409
+    assert task_titles(app, [first, second]) == ['Scope', 'Build']
+
+
+def test_bulk_update_versions_need_no_refresh(app, board):
+    faculty, _, _, task_ids = board
+    statements = []
+    with app.app_context():
+        engine = appmod.db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = faculty.post('/api/tasks/bulk', json={
+            'updates': [{'id': task_id, 'status': 'completed'} for task_id in task_ids]
+        })
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert [r['version'] for r in response.get_json()['results']] == [2, 2]
+    task_selects = [s for s in statements if s.startswith('SELECT') and 'FROM task' in s]
+    assert len(task_selects) == 1
@@ -0,0 +1,68 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import app as appmod
+from teams import InsufficientCapacity, solve_assignment
+from test_enrollment import create_class, create_project
+
+
+def best_total(benefit, capacity):
+    """Exhaustive optimum, for checking the solver on small instances."""
+    n, m = benefit.shape
+    totals = [sum(benefit[i, j] for i, j in enumerate(choice))
+              for choice in itertools.product(range(m), repeat=n)
+              if all(choice.count(j) <= capacity[j] for j in range(m))]
+    return max(totals)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_assignment_is_optimal_within_capacity(seed):
+    rng = np.random.default_rng(seed)
+    n, m = rng.integers(1, 7), rng.integers(1, 4)
+    capacity = rng.integers(0, 4, size=m)
+    capacity[0] += max(0, n - capacity.sum())
+    benefit = rng.random((n, m)).round(2)
+
+    choice = solve_assignment(benefit, capacity)
+    assert (np.bincount(choice, minlength=m) <= capacity).all()
+    assert benefit[np.arange(n), choice].sum() == pytest.approx(best_total(benefit, capacity))
+
+
+def test_too_few_places_are_reported():
+    with pytest.raises(InsufficientCapacity):
+        solve_assignment(np.ones((3, 2)), [1, 1])
+
+
+def test_form_teams_respects_capacity_and_preferences(app, signup):
+    faculty = signup('prof', role='faculty')
+    crn_id = create_class(faculty, '111')
+    small = create_project(faculty, 'Small', capacity=1)
+    large = create_project(faculty, 'Large', capacity=2)
+    students = {name: signup(name, crn='111') for name in ('ann', 'bob', 'cy')}
+    # Everyone would rather be in Small, which has one place; Ann ranks it alone
+    students['ann'].put('/api/project-preferences', json={'project_ids': [small]})
+    for name in ('bob', 'cy'):
+        students[name].put('/api/project-preferences', json={'project_ids': [large, small]})
+
+    response = faculty.post(f'/api/crns/{crn_id}/form-teams', json={'skill_weight': 0})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['assigned'] == 3 and body['first_choice'] == 3
+
+    with app.app_context():
+        teams = {project_id: sorted(appmod.User.query.get(m.student_id).username
+                                    for m in appmod.TeamMember.query.filter_by(project_id=project_id))
+                 for project_id in (small, large)}
+        assert teams == {small: ['ann'], large: ['bob', 'cy']}
+        assert appmod.db.session.get(appmod.Project, small).status == 'full'
+
+
+def test_form_teams_refuses_more_students_than_places(app, signup):
+    faculty = signup('prof', role='faculty')
+    crn_id = create_class(faculty, '111')
+    create_project(faculty, 'Tiny', capacity=1)
+    for name in ('ann', 'bob'):
+        signup(name, crn='111')
+    assert faculty.post(f'/api/crns/{crn_id}/form-teams', json={}).status_code == 400